@@ -2,30 +2,53 @@
 AI Agent using Ollama for itinerary generation
 """
 from __future__ import annotations
-import json
-from typing import Any, Dict, List
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import os
 
+from pydantic import ValidationError
+
+from app.core.day_planner import plan_days
+from app.core.geo_utils import _build_categories_from_prefs
+from app.core.json_repair import coerce_day, coerce_itinerary, extract_json
+from app.core.json_stream import JSONArrayStreamParser
+from app.core.prompt_codec import PROMPT_TOKEN_BUDGET, encode_places, estimate_tokens
+from app.core.schema import DayPlan
+from app.core.llm_executor import llm_executor, LLMOverloadedError
+from app.core.model_router import ModelRouter, tiers_from_env
+
+# Ollama models, cheapest first; output that fails validation is escalated
+# to the next model (e.g. "qwen2.5:3b,mistral")
+MODEL_TIERS = tiers_from_env(os.getenv("OLLAMA_MODEL_TIERS", "mistral"))
+MIN_ACTIVITIES_PER_DAY = 3
+
 # Try to use Ollama, fallback to simple template if not available
 try:
     from langchain_community.llms import Ollama
-    from langchain_core.prompts import PromptTemplate
     
     # Initialize Ollama (running on localhost:11434)
     OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-    llm = Ollama(model="mistral", base_url=OLLAMA_HOST, temperature=0.7)
+    # The strongest tier also serves streaming
+    llm = Ollama(model=MODEL_TIERS[-1], base_url=OLLAMA_HOST, temperature=0.7)
+    tier_llms = {tier: Ollama(model=tier, base_url=OLLAMA_HOST, temperature=0.7) for tier in MODEL_TIERS[:-1]}
     OLLAMA_AVAILABLE = True
 except ImportError:
     print("⚠️ Ollama not available, using template-based generation")
     OLLAMA_AVAILABLE = False
     llm = None
+    tier_llms = {}
+
+itinerary_router = ModelRouter("ollama_itinerary", MODEL_TIERS)
+day_router = ModelRouter("ollama_day", MODEL_TIERS)
 
 PROMPT_TMPL = """
 Bạn là chuyên gia du lịch Việt Nam 🇻🇳.
 Hãy tạo lịch trình {days} ngày tại {region}, ngân sách {budget},
 phong cách {theme}, phương tiện {transport}, dành cho {people} người.
 
-Dữ liệu địa điểm gần đây (đã lọc theo khoảng cách & loại hình):
+Dữ liệu địa điểm gần đây (đã lọc theo khoảng cách & loại hình; bảng
+id|tên|loại|km|rating, mã loại giải thích ở dòng "Loại"):
 {nearby_places}
 
 YÊU CẦU:
@@ -50,16 +73,103 @@ YÊU CẦU:
 """
 
 
+# Trips this long are clustered into one place group per day and generated
+# with one small prompt per day instead of one prompt for the whole trip
+DAY_PLANNER_MIN_DAYS = int(os.getenv("DAY_PLANNER_MIN_DAYS", "4"))
+
+DAY_PROMPT_TMPL = """
+Bạn là chuyên gia du lịch Việt Nam 🇻🇳.
+Hãy lập lịch trình NGÀY {day}/{days} của chuyến đi tại {region}, ngân sách {budget},
+phong cách {theme}, phương tiện {transport}, dành cho {people} người.
+
+Các địa điểm dành cho ngày này (cùng một khu vực; bảng id|tên|loại|km|rating,
+mã loại giải thích ở dòng "Loại"):
+{day_places}
+
+YÊU CẦU:
+- 5–8 hoạt động (thời gian, địa điểm, mô tả ngắn), có bữa trưa và bữa tối.
+- Chỉ dùng các địa điểm trong danh sách trên cho hoạt động tham quan.
+- Trả về JSON **hợp lệ** theo đúng schema sau:
+
+{{
+  "day": {day},
+  "title": "Tên ngày/điểm nhấn",
+  "activities": [
+    {{"time": "08:00", "place": "Tên địa điểm", "desc": "Mô tả ngắn"}}
+  ],
+  "cost_estimate": 1500000
+}}
+"""
+
+
+def _compact_places(
+    user_prefs: Dict[str, Any],
+    places: List[Dict[str, Any]],
+    prompt_without_places: str,
+    top_k: Optional[int] = None,
+) -> str:
+    """Places table sized so the whole prompt stays within PROMPT_TOKEN_BUDGET"""
+    budget = max(PROMPT_TOKEN_BUDGET - estimate_tokens(prompt_without_places), 100)
+    wanted = _build_categories_from_prefs(user_prefs).split(",")
+    table, stats = encode_places(places, wanted, top_k=top_k, max_tokens=budget)
+    if stats["places_out"] < stats["places_in"]:
+        print(f"Prompt compaction: kept {stats['places_out']}/{stats['places_in']} places (~{stats['tokens']} tokens)")
+    return table
+
+
 def _extract_json(text: str) -> Dict[str, Any]:
-    """Extract JSON from model output"""
-    start = text.find("{")
-    if start == -1:
-        raise ValueError("Không tìm thấy JSON trong output")
-    snippet = text[start:]
-    end = snippet.rfind("}")
-    if end != -1:
-        snippet = snippet[:end + 1]
-    return json.loads(snippet)
+    """Extract JSON from model output (repairs trailing commas and truncation)"""
+    return extract_json(text)
+
+
+def _invoke_tier(prompt: str):
+    def call(tier: str):
+        return llm_executor.run(tier_llms.get(tier, llm).invoke, prompt)
+    return call
+
+
+def _check_activities(schedule: List[Dict[str, Any]]) -> None:
+    thin = [d.get("day") for d in schedule if len(d.get("activities") or []) < MIN_ACTIVITIES_PER_DAY]
+    if thin:
+        raise ValueError(f"ngày {thin} có ít hơn {MIN_ACTIVITIES_PER_DAY} hoạt động")
+
+
+def _validate_itinerary(raw: str, days: int) -> Dict[str, Any]:
+    """Parsed plan coerced into ``Itinerary`` if it covers every day, else ValueError"""
+    plan = coerce_itinerary(_extract_json(raw))
+    if len(plan["schedule"]) < days:
+        raise ValueError(f"chỉ có {len(plan['schedule'])}/{days} ngày")
+    _check_activities(plan["schedule"])
+    return plan
+
+
+def _validate_day(raw: str, day: int) -> Dict[str, Any]:
+    day_plan = coerce_day(_extract_json(raw), day)
+    day_plan["day"] = day
+    _check_activities([day_plan])
+    return day_plan
+
+
+def _template_day(day: int, region: str, day_places: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """One templated day; sightseeing slots use the day's clustered places when known"""
+    names = [p.get("name") for p in (day_places or []) if p.get("name")]
+    morning = names[0] if names else f"Hoạt động buổi sáng ngày {day}"
+    afternoon = names[1] if len(names) > 1 else f"Hoạt động buổi chiều ngày {day}"
+    return {
+        "day": day,
+        "title": f"Ngày {day} - {region}",
+        "fallback": True,
+        "activities": [
+            {"time": "08:00", "place": morning, "desc": "Khám phá buổi sáng"},
+            {"time": "12:00", "place": f"Ăn trưa ngày {day}", "desc": "Thưởng thức ẩm thực địa phương"},
+            {"time": "14:00", "place": afternoon, "desc": "Tham quan chiều"},
+            {"time": "18:00", "place": f"Ăn tối ngày {day}", "desc": "Dùng bữa tối"},
+        ],
+    }
+
+
+def _format_vnd(amount: float) -> str:
+    return f"{int(round(amount)):,}đ".replace(",", ".")
 
 
 def generate_itinerary_template(user_prefs: Dict[str, Any], nearby_places: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -69,54 +179,224 @@ def generate_itinerary_template(user_prefs: Dict[str, Any], nearby_places: List[
     days = user_prefs.get("days", 3)
     region = user_prefs.get("region", "Unknown")
     
-    # Build simple schedule
-    schedule = []
-    for day in range(1, days + 1):
-        activities = [
-            {"time": "08:00", "place": f"Hoạt động buổi sáng ngày {day}", "desc": "Khám phá buổi sáng"},
-            {"time": "12:00", "place": f"Ăn trưa ngày {day}", "desc": "Thưởng thức ẩm thực địa phương"},
-            {"time": "14:00", "place": f"Hoạt động buổi chiều ngày {day}", "desc": "Tham quan chiều"},
-            {"time": "18:00", "place": f"Ăn tối ngày {day}", "desc": "Dùng bữa tối"},
-        ]
-        schedule.append({
-            "day": day,
-            "title": f"Ngày {day} - {region}",
-            "activities": activities
-        })
+    # Build simple schedule: one geographic cluster of nearby places per day
+    day_plans = plan_days(nearby_places, days, start=nearby_places[0] if nearby_places else None)
+    schedule = [_template_day(plan["day"], region, plan["places"]) for plan in day_plans]
     
     return {
         "overview": f"Chuyến đi {days} ngày tại {region} với ngân sách {user_prefs.get('budget', 'Trung bình')}",
         "schedule": schedule,
-        "total_cost_estimate": "2.000.000đ"
+        "total_cost_estimate": "2.000.000đ",
+        "fallback": True,
     }
 
 
-def generate_itinerary(user_prefs: Dict[str, Any], nearby_places: List[Dict[str, Any]]) -> Dict[str, Any]:
+def is_fallback(plan: Dict[str, Any]) -> bool:
+    """Whether any part of ``plan`` is templated instead of model output (such plans are not cached)"""
+    return bool(plan.get("fallback")) or any(day.get("fallback") for day in plan.get("schedule", []))
+
+
+async def _iter_days(user_prefs: Dict[str, Any], nearby_places: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
     """
-    Generate itinerary using AI (Ollama if available, otherwise template)
+    Long trips: cluster places per day, then one small prompt per day.
+    Days are yielded as they finish (not in day order).
+
+    At most ``llm_executor.max_workers`` day prompts of this request run at
+    once; a day whose output cannot be parsed falls back to a templated day
+    built from its own cluster.
     """
-    if not OLLAMA_AVAILABLE:
-        return generate_itinerary_template(user_prefs, nearby_places)
-    
-    try:
-        from langchain_core.prompts import PromptTemplate as LangPromptTemplate
-        prompt = LangPromptTemplate(
-            template=PROMPT_TMPL,
-            input_variables=["days", "region", "budget", "theme", "transport", "people", "nearby_places"],
-        )
-        
-        full_prompt = prompt.format(
-            days=user_prefs.get("days"),
-            region=user_prefs.get("region"),
+    days = user_prefs.get("days", 1)
+    region = user_prefs.get("region", "Unknown")
+    # nearby_places are nearest first, so the trip starts around the first one
+    day_plans = plan_days(nearby_places, days, start=nearby_places[0])
+    slots = asyncio.Semaphore(llm_executor.max_workers)
+
+    async def one_day(plan: Dict[str, Any]) -> Dict[str, Any]:
+        fields = dict(
+            day=plan["day"],
+            days=days,
+            region=region,
             budget=user_prefs.get("budget"),
             theme=user_prefs.get("theme"),
             transport=user_prefs.get("transport"),
             people=user_prefs.get("people"),
-            nearby_places=json.dumps(nearby_places, ensure_ascii=False, indent=2),
         )
+        day_places = _compact_places(
+            user_prefs, plan["places"], DAY_PROMPT_TMPL.format(day_places="", **fields), top_k=len(plan["places"])
+        )
+        prompt = DAY_PROMPT_TMPL.format(day_places=day_places, **fields)
+        try:
+            async with slots:
+                day_plan, _ = await day_router.run(_invoke_tier(prompt), lambda raw: _validate_day(raw, plan["day"]))
+            return day_plan
+        except ValueError as e:
+            print(f"Day {plan['day']} output unusable, using template: {e}")
+            return _template_day(plan["day"], region, plan["places"])
+
+    tasks = [asyncio.ensure_future(one_day(plan)) for plan in day_plans]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _assemble_days(user_prefs: Dict[str, Any], schedule: List[Dict[str, Any]]) -> Dict[str, Any]:
+    days = user_prefs.get("days", 1)
+    region = user_prefs.get("region", "Unknown")
+    schedule = sorted(schedule, key=lambda d: d["day"])
+    costs = [d.pop("cost_estimate", None) for d in schedule]
+    total = sum(c for c in costs if isinstance(c, (int, float)))
+    return {
+        "overview": f"Chuyến đi {days} ngày tại {region} với ngân sách {user_prefs.get('budget', 'Trung bình')}",
+        "schedule": schedule,
+        "total_cost_estimate": _format_vnd(total) if total else "Chưa ước lượng",
+    }
+
+
+async def _generate_by_day(user_prefs: Dict[str, Any], nearby_places: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return _assemble_days(user_prefs, [day async for day in _iter_days(user_prefs, nearby_places)])
+
+
+def _full_prompt(user_prefs: Dict[str, Any], nearby_places: List[Dict[str, Any]]) -> str:
+    fields = dict(
+        days=user_prefs.get("days"),
+        region=user_prefs.get("region"),
+        budget=user_prefs.get("budget"),
+        theme=user_prefs.get("theme"),
+        transport=user_prefs.get("transport"),
+        people=user_prefs.get("people"),
+    )
+    # Compact table (top-K, coded categories) instead of indented JSON
+    places_table = _compact_places(user_prefs, nearby_places, PROMPT_TMPL.format(nearby_places="", **fields))
+    return PROMPT_TMPL.format(nearby_places=places_table, **fields)
+
+
+_STREAM_END = object()
+
+
+async def _stream_llm(prompt: str) -> AsyncIterator[str]:
+    """
+    Token chunks of ``llm.stream(prompt)``. The blocking iteration runs on
+    the LLM executor (same admission control as ``invoke``) and chunks are
+    handed to the event loop; closing the generator stops the producer.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for chunk in llm.stream(prompt):
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _STREAM_END)
+
+    task = asyncio.ensure_future(llm_executor.run(produce))
+    try:
+        while True:
+            if task.done() and queue.empty():
+                task.result()  # admission / timeout errors before any chunk
+                return
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                continue
+            chunk = getter.result()
+            if chunk is _STREAM_END:
+                await task
+                return
+            yield chunk
+    finally:
+        stop.set()
 
-        raw = llm.invoke(full_prompt)
-        return _extract_json(raw)
+
+def _valid_day(day: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """``day`` if it matches ``DayPlan`` (extra keys such as coordinates are kept)"""
+    try:
+        DayPlan(**day)
+        return day
+    except ValidationError as e:
+        print(f"Streamed day rejected: {e.errors()[:1]}")
+        return None
+
+
+async def stream_itinerary(
+    user_prefs: Dict[str, Any], nearby_places: List[Dict[str, Any]]
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    ``("day", day)`` for every day as soon as it is generated and validated
+    against ``DayPlan``, then ``("done", plan)`` with the full itinerary.
+    ``LLMOverloadedError`` propagates like in ``generate_itinerary``.
+    """
+    if not OLLAMA_AVAILABLE:
+        plan = generate_itinerary_template(user_prefs, nearby_places)
+        for day in plan["schedule"]:
+            yield "day", day
+        yield "done", plan
+        return
+
+    if (user_prefs.get("days") or 0) >= DAY_PLANNER_MIN_DAYS and nearby_places:
+        days = []
+        async for day in _iter_days(user_prefs, nearby_places):
+            day = _valid_day(day) or _template_day(day.get("day", len(days) + 1), user_prefs.get("region", "Unknown"))
+            days.append(day)
+            yield "day", day
+        yield "done", _assemble_days(user_prefs, days)
+        return
+
+    parser = JSONArrayStreamParser("schedule")
+    emitted: List[Dict[str, Any]] = []
+    try:
+        async for chunk in _stream_llm(_full_prompt(user_prefs, nearby_places)):
+            for item in parser.feed(chunk):
+                day = _valid_day(item)
+                if day is not None:
+                    emitted.append(day)
+                    yield "day", day
+        plan = _extract_json(parser.document)
+        plan["schedule"] = emitted or plan.get("schedule", [])
+    except LLMOverloadedError:
+        raise
+    except Exception as e:
+        print(f"Error streaming from Ollama: {e}")
+        plan = generate_itinerary_template(user_prefs, nearby_places)
+        if emitted:
+            # Keep what the client already has; template only the remaining days
+            done = {d["day"] for d in emitted}
+            plan["schedule"] = emitted + [d for d in plan["schedule"] if d["day"] not in done]
+        for day in plan["schedule"]:
+            if day not in emitted:
+                yield "day", day
+    yield "done", plan
+
+
+async def generate_itinerary(user_prefs: Dict[str, Any], nearby_places: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Generate itinerary using AI (Ollama if available, otherwise template)
+
+    The blocking Ollama call runs on the bounded LLM executor; when its queue
+    is full ``LLMOverloadedError`` is raised so the router can answer 503.
+    Models are tried in MODEL_TIERS order until one returns a valid plan.
+    """
+    if not OLLAMA_AVAILABLE:
+        return generate_itinerary_template(user_prefs, nearby_places)
+    
+    try:
+        if (user_prefs.get("days") or 0) >= DAY_PLANNER_MIN_DAYS and nearby_places:
+            return await _generate_by_day(user_prefs, nearby_places)
+
+        days = user_prefs.get("days") or 1
+        plan, _ = await itinerary_router.run(
+            _invoke_tier(_full_prompt(user_prefs, nearby_places)), lambda raw: _validate_itinerary(raw, days)
+        )
+        return plan
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         print(f"Error using Ollama: {e}")
         return generate_itinerary_template(user_prefs, nearby_places)
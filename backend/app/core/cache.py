@@ -0,0 +1,172 @@
+"""
+In-process caches shared by the provider services
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def approx_size(value: Any) -> int:
+    """Approximate memory footprint of a cached value, in bytes"""
+    try:
+        return len(json.dumps(value, default=str, ensure_ascii=False).encode("utf-8"))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire ``ttl`` seconds after insert.
+
+    Bounded by entry count (``maxsize``) and optionally by approximate byte
+    size (``max_bytes``). Expired entries are dropped on read and by
+    ``purge_expired()``, which the background janitor calls periodically.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or approx_size
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            if count:
+                self.misses += 1
+            return default
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            if count:
+                self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        if count:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        size = self._sizeof(value)
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (value, expires_at, size)
+        self.bytes += size
+        while len(self._data) > self.maxsize or (
+            self.max_bytes is not None and self.bytes > self.max_bytes and len(self._data) > 1
+        ):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def incr(self, key: Hashable, ttl: Optional[float] = None) -> int:
+        """Increment a counter, keeping the expiry set when it was created"""
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            self.set(key, 1, ttl=ttl)
+            return 1
+        value, expires_at, size = entry
+        self._data[key] = (value + 1, expires_at, size)
+        return value + 1
+
+    def delete(self, key: Hashable) -> None:
+        if key in self._data:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.bytes = 0
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry; returns how many were removed"""
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at, _) in self._data.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._data.pop(key)
+        self.bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# Named caches reported by the admin cache-stats endpoint
+_registry: Dict[str, Any] = {}
+
+
+def register_cache(name: str, cache: Any) -> Any:
+    """Register a cache (anything with ``stats()``) under a name"""
+    _registry[name] = cache
+    return cache
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+def purge_expired_caches() -> int:
+    """Purge expired entries from every registered cache that supports it"""
+    removed = 0
+    for name, cache in list(_registry.items()):
+        purge = getattr(cache, "purge_expired", None)
+        if purge is None:
+            continue
+        try:
+            removed += purge()
+        except Exception as e:
+            logger.warning(f"Cache purge failed for '{name}': {e}")
+    return removed
+
+
+async def run_cache_janitor(interval: float = 60.0):
+    """Background task (started in the lifespan) that expires cache entries"""
+    while True:
+        await asyncio.sleep(interval)
+        removed = purge_expired_caches()
+        if removed:
+            logger.info(f"Cache janitor expired {removed} entries")
@@ -0,0 +1,279 @@
+"""
+Pluggable cache backends shared by the place, geocode, route and
+suggestion caches.
+
+``MemoryCacheBackend`` keeps entries in the worker process (``TTLCache``);
+``RedisCacheBackend`` stores msgpack-encoded entries in Redis so every
+uvicorn worker and node shares warm data. ``get_cache_backend()`` picks one
+from ``CACHE_BACKEND`` (``memory`` by default, ``redis`` uses ``REDIS_URL``).
+"""
+from __future__ import annotations
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    aioredis = None
+    REDIS_AVAILABLE = False
+
+_DATETIME_EXT = 1
+
+
+class CacheBackend(ABC):
+    """Async key/value cache with per-entry TTL"""
+
+    name = "base"
+
+    def __init__(self, namespace: str, ttl: float):
+        self.namespace = namespace
+        self.ttl = ttl
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        """Cached value or None"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Drop every entry of this namespace"""
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: float) -> Optional[int]:
+        """Increment a counter that expires ``ttl`` seconds after creation (None if the backend is down)"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+    async def get_many(self, keys: Iterable[str]) -> List[Any]:
+        """Values for ``keys`` in order (None for misses)"""
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, items: Mapping[str, Any], ttl: Optional[float] = None) -> None:
+        for key, value in items.items():
+            await self.set(key, value, ttl=ttl)
+
+    def purge_expired(self) -> int:
+        return 0
+
+
+class MemoryCacheBackend(CacheBackend):
+    name = "memory"
+
+    def __init__(self, namespace: str, ttl: float = 3600, maxsize: int = 1024, max_bytes: Optional[int] = None):
+        super().__init__(namespace, ttl)
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl, max_bytes=max_bytes)
+
+    async def get(self, key: str) -> Any:
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.cache.set(key, value, ttl=ttl)
+
+    async def delete(self, key: str) -> None:
+        self.cache.delete(key)
+
+    async def clear(self) -> None:
+        self.cache.clear()
+
+    async def incr(self, key: str, ttl: float) -> int:
+        return self.cache.incr(key, ttl=ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self.cache.stats()}
+
+    def purge_expired(self) -> int:
+        return self.cache.purge_expired()
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_DATETIME_EXT, obj.isoformat().encode())
+    # ObjectId, Decimal, ... are stored as their string form
+    return str(obj)
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _DATETIME_EXT:
+        return datetime.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def packb(value: Any) -> bytes:
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis-backed cache. Errors are logged and treated as misses so a Redis
+    outage degrades to provider calls instead of failed requests.
+    """
+
+    name = "redis"
+
+    def __init__(self, namespace: str, client: Any, ttl: float = 3600, prefix: str = "travel"):
+        super().__init__(namespace, ttl)
+        self.client = client
+        self.prefix = f"{prefix}:{namespace}:"
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    async def get(self, key: str) -> Any:
+        try:
+            data = await self.client.get(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis get failed ({self.namespace}): {e}")
+            data = None
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return unpackb(data)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        try:
+            await self.client.set(self._key(key), packb(value), px=int(ttl * 1000))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis set failed ({self.namespace}): {e}")
+
+    async def get_many(self, keys: Iterable[str]) -> List[Any]:
+        keys = list(keys)
+        if not keys:
+            return []
+        try:
+            values = await self.client.mget([self._key(key) for key in keys])
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis mget failed ({self.namespace}): {e}")
+            values = [None] * len(keys)
+        found = sum(1 for v in values if v is not None)
+        self.hits += found
+        self.misses += len(keys) - found
+        return [unpackb(v) if v is not None else None for v in values]
+
+    async def set_many(self, items: Mapping[str, Any], ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or not items:
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(self._key(key), packb(value), px=int(ttl * 1000))
+                await pipe.execute()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis set_many failed ({self.namespace}): {e}")
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self.client.delete(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis delete failed ({self.namespace}): {e}")
+
+    async def clear(self) -> None:
+        try:
+            keys = [k async for k in self.client.scan_iter(match=self.prefix + "*", count=500)]
+            if keys:
+                await self.client.delete(*keys)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis clear failed ({self.namespace}): {e}")
+
+    async def incr(self, key: str, ttl: float) -> Optional[int]:
+        full_key = self._key(key)
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.incr(full_key)
+                pipe.expire(full_key, int(ttl), nx=True)
+                count, _ = await pipe.execute()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis incr failed ({self.namespace}): {e}")
+            return None
+        return int(count)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "errors": self.errors,
+        }
+
+
+_redis_client = None
+
+
+def redis_cache_enabled() -> bool:
+    return os.getenv("CACHE_BACKEND", "memory").lower() == "redis"
+
+
+def get_redis_client():
+    """Shared asyncio Redis client (None when Redis is not configured)"""
+    global _redis_client
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url or not REDIS_AVAILABLE:
+        return None
+    if _redis_client is None:
+        _redis_client = aioredis.from_url(redis_url, socket_timeout=1.0, socket_connect_timeout=1.0)
+    return _redis_client
+
+
+async def close_redis_client():
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.close()
+        _redis_client = None
+
+
+def get_cache_backend(
+    namespace: str,
+    ttl: float = 3600,
+    maxsize: int = 1024,
+    max_bytes: Optional[int] = None,
+) -> CacheBackend:
+    """
+    Backend for a cache namespace: Redis when ``CACHE_BACKEND=redis``,
+    otherwise in-process memory.
+    """
+    if redis_cache_enabled():
+        client = get_redis_client()
+        if client is not None:
+            return RedisCacheBackend(namespace, client, ttl=ttl)
+        logger.warning(f"Redis cache requested for '{namespace}' but unavailable; using memory")
+    return MemoryCacheBackend(namespace, ttl=ttl, maxsize=maxsize, max_bytes=max_bytes)
@@ -0,0 +1,106 @@
+"""
+Multi-day planning: split candidate places into one geographic cluster per day.
+
+Balanced k-means on a local metric projection of lat/lon: every day gets
+``n // days`` or one more place, so long trips do not end up with one packed
+day and several empty ones. Days are ordered so each day's cluster is the
+nearest remaining one to the previous (starting from the trip location).
+"""
+from __future__ import annotations
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.geo import EARTH_RADIUS_M, coords_array
+
+MAX_ITERATIONS = 25
+
+
+def _project(lats: np.ndarray, lons: np.ndarray, lat0: float) -> np.ndarray:
+    """Equirectangular projection to meters; accurate enough within a region"""
+    x = np.radians(lons) * EARTH_RADIUS_M * math.cos(math.radians(lat0))
+    y = np.radians(lats) * EARTH_RADIUS_M
+    return np.column_stack([x, y])
+
+
+def _init_centers(xy: np.ndarray, k: int) -> np.ndarray:
+    """Deterministic farthest-point seeding (first seed: farthest from the mean)"""
+    seeds = [int(np.argmax(((xy - xy.mean(axis=0)) ** 2).sum(axis=1)))]
+    nearest = ((xy - xy[seeds[0]]) ** 2).sum(axis=1)
+    while len(seeds) < k:
+        seeds.append(int(np.argmax(nearest)))
+        nearest = np.minimum(nearest, ((xy - xy[seeds[-1]]) ** 2).sum(axis=1))
+    return xy[seeds].copy()
+
+
+def _assign_balanced(xy: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """
+    Closest-pair-first assignment. Every cluster gets ``n // k`` points and
+    ``n % k`` of them one more, so sizes differ by at most one.
+    """
+    k = len(centers)
+    low, extra = divmod(len(xy), k)
+    d = ((xy[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    labels = np.full(len(xy), -1)
+    sizes = np.zeros(k, dtype=int)
+    above_low = 0  # clusters already holding low + 1 points
+    for flat in np.argsort(d, axis=None, kind="stable"):
+        point, cluster = divmod(int(flat), k)
+        if labels[point] != -1:
+            continue
+        if sizes[cluster] < low or (sizes[cluster] == low and above_low < extra):
+            labels[point] = cluster
+            sizes[cluster] += 1
+            if sizes[cluster] > low:
+                above_low += 1
+    return labels
+
+
+def balanced_kmeans(xy: np.ndarray, k: int) -> np.ndarray:
+    """Cluster label per point; cluster sizes differ by at most one"""
+    centers = _init_centers(xy, k)
+    labels = _assign_balanced(xy, centers)
+    for _ in range(MAX_ITERATIONS):
+        centers = np.array([xy[labels == c].mean(axis=0) for c in range(k)])
+        new_labels = _assign_balanced(xy, centers)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+    return labels
+
+
+def plan_days(
+    places: List[Dict[str, Any]],
+    days: int,
+    start: Optional[Dict[str, float]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    ``[{"day", "center", "places"}]`` for each of ``days`` days.
+
+    Places without coordinates are dropped; with fewer located places than
+    days the trailing days get no places. Within a day, places keep their
+    input order (callers pass them ranked).
+    """
+    located = [p for p in places if p.get("lat") is not None and p.get("lon", p.get("lng")) is not None]
+    plans = [{"day": d + 1, "center": None, "places": []} for d in range(days)]
+    if not located or days <= 0:
+        return plans
+
+    lats, lons = coords_array(located)
+    lat0 = float(start["lat"]) if start else float(lats.mean())
+    xy = _project(lats, lons, lat0)
+    k = min(days, len(located))
+    labels = balanced_kmeans(xy, k)
+
+    centers = np.array([xy[labels == c].mean(axis=0) for c in range(k)])
+    current = _project(np.array([start["lat"]]), np.array([start["lon"]]), lat0)[0] if start else centers[0]
+    remaining = list(range(k))
+    for plan in plans[:k]:
+        cluster = min(remaining, key=lambda c: float(((centers[c] - current) ** 2).sum()))
+        remaining.remove(cluster)
+        current = centers[cluster]
+        members = np.flatnonzero(labels == cluster)
+        plan["places"] = [located[i] for i in members]
+        plan["center"] = {"lat": float(lats[members].mean()), "lon": float(lons[members].mean())}
+    return plans
@@ -0,0 +1,162 @@
+"""
+Geo helpers: haversine distance, NumPy distance kernels and geohash tiling.
+
+Scoring code that ranks many candidates should use the vectorized kernels
+(``distances_from``, ``distance_matrix_m``, ``bbox_mask``) instead of
+calling ``haversine_m`` in a loop.
+"""
+from __future__ import annotations
+from math import radians, cos, sin, asin, sqrt
+from typing import Any, Dict, Iterable, Iterator, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = 111320.0
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {c: i for i, c in enumerate(_BASE32)}
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters"""
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat, dlon = lat2 - lat1, lon2 - lon1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * asin(sqrt(min(1.0, a)))
+
+
+def haversine_np(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Broadcasting haversine in meters over arrays of degrees"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def coords_array(places: Iterable[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(lats, lons) arrays from place dicts; accepts "lon" or "lng", missing -> NaN"""
+    lats, lons = [], []
+    for place in places:
+        lon = place.get("lon", place.get("lng"))
+        lats.append(np.nan if place.get("lat") is None else place["lat"])
+        lons.append(np.nan if lon is None else lon)
+    return np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+
+
+def distances_from(lat: float, lon: float, lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+    """Meters from one point to each of ``lats``/``lons`` (NaN where unknown)"""
+    return haversine_np(lat, lon, lats, lons)
+
+
+def distance_matrix_m(
+    lats1: Sequence[float], lons1: Sequence[float], lats2: Sequence[float], lons2: Sequence[float],
+    dtype=np.float64,
+) -> np.ndarray:
+    """Many-to-many distances in meters, shape (len(lats1), len(lats2))"""
+    lats1, lons1 = np.asarray(lats1, dtype=np.float64), np.asarray(lons1, dtype=np.float64)
+    return haversine_np(lats1[:, None], lons1[:, None], lats2, lons2).astype(dtype, copy=False)
+
+
+def iter_distance_blocks(
+    lats1: Sequence[float], lons1: Sequence[float], lats2: Sequence[float], lons2: Sequence[float],
+    chunk_rows: int = 1024,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    ``(row_offset, block)`` slices of the distance matrix, for point sets too
+    large to materialize at once (10k x 10k float64 is 800 MB).
+    """
+    lats1, lons1 = np.asarray(lats1, dtype=np.float64), np.asarray(lons1, dtype=np.float64)
+    lats2, lons2 = np.asarray(lats2, dtype=np.float64), np.asarray(lons2, dtype=np.float64)
+    for start in range(0, len(lats1), chunk_rows):
+        stop = start + chunk_rows
+        yield start, distance_matrix_m(lats1[start:stop], lons1[start:stop], lats2, lons2)
+
+
+def bbox_around(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) enclosing a circle of ``radius_m``"""
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    dlon = radius_m / (METERS_PER_DEGREE_LAT * max(cos(radians(lat)), 1e-6))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def bbox_mask(lat: float, lon: float, radius_m: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Cheap prefilter: True for points inside the bounding box of the circle"""
+    min_lat, max_lat, min_lon, max_lon = bbox_around(lat, lon, radius_m)
+    return (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+
+
+def within_radius(lat: float, lon: float, radius_m: float, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(indices, distances) of points within ``radius_m``, nearest first"""
+    candidates = np.flatnonzero(bbox_mask(lat, lon, radius_m, lats, lons))
+    d = distances_from(lat, lon, lats[candidates], lons[candidates])
+    keep = d <= radius_m
+    candidates, d = candidates[keep], d[keep]
+    order = np.argsort(d, kind="stable")
+    return candidates[order], d[order]
+
+
+def geohash_encode(lat: float, lon: float, precision: int = 6) -> str:
+    """Encode a coordinate as a geohash cell of ``precision`` characters"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                bits = (bits << 1) | 1
+                lon_lo = mid
+            else:
+                bits <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def geohash_decode(cell: str) -> Tuple[float, float, float, float]:
+    """Decode a geohash into (center_lat, center_lon, lat_half_size, lon_half_size)"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+    for c in cell:
+        value = _BASE32_INDEX[c]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                if bit:
+                    lon_lo = mid
+                else:
+                    lon_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+    return (
+        (lat_lo + lat_hi) / 2,
+        (lon_lo + lon_hi) / 2,
+        (lat_hi - lat_lo) / 2,
+        (lon_hi - lon_lo) / 2,
+    )
+
+
+def geohash_cell_radius_m(cell: str) -> float:
+    """Distance from the cell center to its farthest corner, in meters"""
+    lat, lon, dlat, dlon = geohash_decode(cell)
+    return haversine_m(lat, lon, lat + dlat, lon + dlon)
@@ -0,0 +1,106 @@
+"""
+Geo-tiled cache for nearby-place lookups.
+
+Queries are snapped to a geohash cell: the provider is asked once for the
+superset of places around the cell center (radius bucket + cell radius), and
+every query inside that cell is answered by filtering the cached superset by
+exact distance from the real query point.
+"""
+from __future__ import annotations
+import bisect
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, List
+
+from app.core.cache import register_cache
+from app.core.cache_backend import CacheBackend, get_cache_backend
+from app.core.geo import coords_array, geohash_encode, geohash_decode, geohash_cell_radius_m, within_radius
+
+RADIUS_BUCKETS = [500, 1000, 2000, 3000, 5000, 8000, 10000, 15000, 20000, 30000, 50000]
+
+# fetch(center_lat, center_lon, radius_m, limit) -> places with "lat"/"lon"
+FetchFn = Callable[[float, float, int, int], Awaitable[List[Dict[str, Any]]]]
+
+
+def radius_bucket(radius: float) -> int:
+    """Smallest bucket that covers ``radius`` (meters)"""
+    i = bisect.bisect_left(RADIUS_BUCKETS, radius)
+    return RADIUS_BUCKETS[i] if i < len(RADIUS_BUCKETS) else int(radius)
+
+
+class NearbyPlacesCache:
+    def __init__(
+        self,
+        name: str,
+        precision: int = 6,
+        maxsize: int = 2048,
+        ttl: float = 3600,
+        superset_limit: int = 100,
+    ):
+        self.precision = precision
+        self.superset_limit = superset_limit
+        self.cache: CacheBackend = get_cache_backend(name, ttl=ttl, maxsize=maxsize)
+        self.provider_calls = 0
+        register_cache(name, self)
+
+    def key(self, lat: float, lon: float, categories: Iterable[str], radius: float) -> str:
+        cell = geohash_encode(lat, lon, self.precision)
+        cats = ",".join(sorted(set(categories)))
+        return f"{cell}|{cats}|{radius_bucket(radius)}"
+
+    async def get_or_fetch(
+        self,
+        lat: float,
+        lon: float,
+        categories: Iterable[str],
+        radius: float,
+        limit: int,
+        fetch: FetchFn,
+    ) -> List[Dict[str, Any]]:
+        """Places within ``radius`` of (lat, lon), nearest first, at most ``limit``"""
+        categories = list(categories)
+        key = self.key(lat, lon, categories, radius)
+        entry = await self.cache.get(key)
+
+        if entry is None or (limit > entry["fetch_limit"] and entry["truncated"]):
+            cell = key.split("|", 1)[0]
+            center_lat, center_lon, _, _ = geohash_decode(cell)
+            fetch_radius = int(radius_bucket(radius) + geohash_cell_radius_m(cell))
+            fetch_limit = max(limit, self.superset_limit)
+            self.provider_calls += 1
+            places = await fetch(center_lat, center_lon, fetch_radius, fetch_limit)
+            entry = {
+                "places": places,
+                "fetch_limit": fetch_limit,
+                "truncated": len(places) >= fetch_limit,
+            }
+            await self.cache.set(key, entry)
+
+        return self.filter(entry["places"], lat, lon, radius, limit)
+
+    @staticmethod
+    def filter(
+        places: List[Dict[str, Any]], lat: float, lon: float, radius: float, limit: int
+    ) -> List[Dict[str, Any]]:
+        if not places:
+            return []
+        lats, lons = coords_array(places)
+        idx, dist = within_radius(lat, lon, radius, lats, lons)
+        return [{**places[i], "distance_m": round(float(d), 1)} for i, d in zip(idx[:limit], dist[:limit])]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.cache.stats(), "provider_calls": self.provider_calls}
+
+    async def clear(self) -> None:
+        await self.cache.clear()
+
+    def purge_expired(self) -> int:
+        return self.cache.purge_expired()
+
+
+def nearby_cache_from_env(name: str) -> NearbyPlacesCache:
+    return NearbyPlacesCache(
+        name,
+        precision=int(os.getenv("NEARBY_CACHE_PRECISION", "6")),
+        maxsize=int(os.getenv("NEARBY_CACHE_SIZE", "2048")),
+        ttl=float(os.getenv("NEARBY_CACHE_TTL", "3600")),
+    )
@@ -0,0 +1,118 @@
+"""
+In-memory spatial index for "nearest known point within N meters" lookups.
+
+Points are bucketed on a uniform lat/lon grid; a query only scans the cells
+that can contain a point within the search radius, so lookups stay cheap as
+the index grows. Bounded by ``maxsize`` (least recently used points are
+evicted first); with ``ttl`` points also expire, like the cache entries
+they mirror.
+"""
+from __future__ import annotations
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from app.core.geo import haversine_m
+
+METERS_PER_DEGREE = 111320.0
+
+Cell = Tuple[int, int]
+
+
+class GridIndex:
+    def __init__(self, cell_m: float = 100.0, maxsize: int = 50000, ttl: Optional[float] = None):
+        self.cell_deg = cell_m / METERS_PER_DEGREE
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (lat, lon, cell, value, expires_at), least recently used first
+        self._points: "OrderedDict[Hashable, Tuple[float, float, Cell, Any, float]]" = OrderedDict()
+        self._cells: Dict[Cell, Set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def add(self, key: Hashable, lat: float, lon: float, value: Any) -> None:
+        """Insert or replace the point stored under ``key``"""
+        if key in self._points:
+            self._remove(key)
+        cell = self._cell(lat, lon)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else math.inf
+        self._points[key] = (lat, lon, cell, value, expires_at)
+        self._cells.setdefault(cell, set()).add(key)
+        while len(self._points) > self.maxsize:
+            self._remove(next(iter(self._points)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, cell, _, _ = self._points.pop(key)
+        bucket = self._cells[cell]
+        bucket.discard(key)
+        if not bucket:
+            del self._cells[cell]
+
+    def nearest(self, lat: float, lon: float, max_distance_m: float) -> Optional[Tuple[float, Any]]:
+        """``(distance_m, value)`` of the closest point within range, or None"""
+        best: Optional[Tuple[float, Any]] = None
+        best_key: Optional[Hashable] = None
+        now = time.monotonic()
+        for key in self._candidates(lat, lon, max_distance_m):
+            p_lat, p_lon, _, value, expires_at = self._points[key]
+            if expires_at <= now:
+                self._remove(key)
+                self.expired += 1
+                continue
+            d = haversine_m(lat, lon, p_lat, p_lon)
+            if d <= max_distance_m and (best is None or d < best[0]):
+                best, best_key = (d, value), key
+        if best is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._points.move_to_end(best_key)
+        return best
+
+    def _candidates(self, lat: float, lon: float, radius_m: float) -> List[Hashable]:
+        row, col = self._cell(lat, lon)
+        d_rows = math.ceil(radius_m / (self.cell_deg * METERS_PER_DEGREE))
+        # Longitude cells shrink towards the poles
+        cos_lat = max(math.cos(math.radians(lat)), 0.01)
+        d_cols = math.ceil(radius_m / (self.cell_deg * METERS_PER_DEGREE * cos_lat))
+        keys: List[Hashable] = []
+        for r in range(row - d_rows, row + d_rows + 1):
+            for c in range(col - d_cols, col + d_cols + 1):
+                keys.extend(self._cells.get((r, c), ()))
+        return keys
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        expired = [key for key, point in self._points.items() if point[4] <= now]
+        for key in expired:
+            self._remove(key)
+        self.expired += len(expired)
+        return len(expired)
+
+    def clear(self) -> None:
+        self._points.clear()
+        self._cells.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._points),
+            "maxsize": self.maxsize,
+            "cells": len(self._cells),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "ttl": self.ttl,
+        }
@@ -2,11 +2,19 @@
 Geo utilities for getting nearby places using Geoapify
 """
 from __future__ import annotations
+import asyncio
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 import httpx
 
+from app.http_client import get_http_client
+from app.core.geo_cache import nearby_cache_from_env
+
 GEOAPIFY_KEY = os.getenv("GEOAPIFY_KEY", "e21572c819734004b50cce6f8b52e171")
+# Tổng thời gian tối đa (giây) cho một lần tra cứu địa điểm lân cận
+NEARBY_TIMEOUT_BUDGET = float(os.getenv("NEARBY_TIMEOUT_BUDGET", "8"))
+
+nearby_cache = nearby_cache_from_env("itinerary_nearby")
 
 
 def _build_categories_from_prefs(prefs: Dict) -> str:
@@ -29,42 +37,77 @@ def _build_categories_from_prefs(prefs: Dict) -> str:
     return ",".join(base)
 
 
-def get_nearby_places(lat: float, lon: float, prefs: Dict, radius: int = 8000, limit: int = 20) -> List[Dict]:
+async def get_nearby_places(
+    lat: float,
+    lon: float,
+    prefs: Dict,
+    radius: int = 8000,
+    limit: int = 20,
+    timeout: Optional[float] = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> List[Dict]:
     """
-    Lấy danh sách địa điểm gần user bằng Geoapify.
+    Lấy danh sách địa điểm gần user bằng Geoapify (không chặn event loop).
+
+    Toàn bộ lần gọi bị giới hạn bởi ``timeout`` giây (mặc định
+    NEARBY_TIMEOUT_BUDGET); hết giờ thì request bị huỷ và trả về [].
     """
     if not GEOAPIFY_KEY:
         return []
 
+    budget = NEARBY_TIMEOUT_BUDGET if timeout is None else timeout
+    cats = _build_categories_from_prefs(prefs)
+
+    async def fetch(center_lat: float, center_lon: float, fetch_radius: int, fetch_limit: int):
+        return await _fetch_nearby_places(center_lat, center_lon, cats, fetch_radius, fetch_limit, client)
+
     try:
-        cats = _build_categories_from_prefs(prefs)
-        url = (
-            "https://api.geoapify.com/v2/places?"
-            f"categories={cats}&filter=circle:{lon},{lat},{radius}"
-            f"&bias=proximity:{lon},{lat}&limit={limit}&apiKey={GEOAPIFY_KEY}"
+        return await asyncio.wait_for(
+            nearby_cache.get_or_fetch(lat, lon, cats.split(","), radius, limit, fetch),
+            timeout=budget,
         )
-
-        with httpx.Client(timeout=15.0) as client:
-            res = client.get(url)
-            res.raise_for_status()
-            features = res.json().get("features", [])
-            
-            # Transform to simple format
-            places = []
-            for feature in features:
-                props = feature.get("properties", {})
-                coords = feature.get("geometry", {}).get("coordinates", [])
-                places.append({
-                    "name": props.get("name", "Unknown"),
-                    "address": props.get("address_line1", "") + ", " + props.get("address_line2", ""),
-                    "category": ",".join(props.get("categories", [])),
-                    "rating": props.get("rating", 0),
-                    "lat": coords[1] if len(coords) > 1 else lat,
-                    "lon": coords[0] if len(coords) > 0 else lon,
-                })
-            
-            return places
+    except asyncio.TimeoutError:
+        print(f"Nearby places lookup exceeded {budget:.1f}s budget, cancelled")
+        return []
     except Exception as e:
         print(f"Error fetching nearby places: {e}")
         return []
 
+
+async def _fetch_nearby_places(
+    lat: float,
+    lon: float,
+    cats: str,
+    radius: int,
+    limit: int,
+    client: Optional[httpx.AsyncClient] = None,
+) -> List[Dict]:
+    url = "https://api.geoapify.com/v2/places"
+    params = {
+        "categories": cats,
+        "filter": f"circle:{lon},{lat},{radius}",
+        "bias": f"proximity:{lon},{lat}",
+        "limit": limit,
+        "apiKey": GEOAPIFY_KEY,
+    }
+
+    cli = client or get_http_client("geoapify")
+    res = await cli.get(url, params=params)
+    res.raise_for_status()
+    features = res.json().get("features", [])
+
+    # Transform to simple format
+    places = []
+    for feature in features:
+        props = feature.get("properties", {})
+        coords = feature.get("geometry", {}).get("coordinates", [])
+        places.append({
+            "name": props.get("name", "Unknown"),
+            "address": props.get("address_line1", "") + ", " + props.get("address_line2", ""),
+            "category": ",".join(props.get("categories", [])),
+            "rating": props.get("rating", 0),
+            "lat": coords[1] if len(coords) > 1 else lat,
+            "lon": coords[0] if len(coords) > 0 else lon,
+        })
+
+    return places
@@ -0,0 +1,135 @@
+"""
+Result cache for generated itineraries.
+
+Requests are keyed on their normalized preferences (case, spacing and
+diacritics do not matter) plus the geohash tile of the trip location, so
+"3 ngày Đà Nẵng, ẩm thực" from two users a few hundred meters apart shares
+one LLM generation.
+
+- Each key keeps up to ``variants`` plans; a hit returns a random one, and
+  while the pool is not full a hit is turned into a regeneration with
+  probability ``refresh_prob`` so popular requests do not all get the same plan.
+- An entry remembers the fingerprint of the places it was generated from;
+  once the nearby-place data behind it changes the entry is dropped.
+"""
+from __future__ import annotations
+import copy
+import hashlib
+import os
+import random
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from app.core.cache import register_cache
+from app.core.cache_backend import CacheBackend, get_cache_backend
+from app.core.geo import geohash_encode
+from app.core.route_optimizer import _normalize
+
+KEY_FIELDS = ("region", "days", "budget", "theme", "transport", "people")
+
+
+def places_fingerprint(places: Iterable[Mapping[str, Any]]) -> str:
+    """Order-independent hash of the place names and coordinates"""
+    items = sorted(
+        f"{_normalize(p.get('name', ''))}@{float(p.get('lat') or 0):.4f},{float(p.get('lon', p.get('lng')) or 0):.4f}"
+        for p in places
+    )
+    return hashlib.sha1("\n".join(items).encode("utf-8")).hexdigest()[:16]
+
+
+def _field(value: Any) -> str:
+    value = getattr(value, "value", value)  # enums
+    if isinstance(value, (list, tuple, set)):
+        return ",".join(sorted(_normalize(str(v)) for v in value))
+    return _normalize(str(value)) if value is not None else ""
+
+
+class ItineraryCache:
+    def __init__(
+        self,
+        name: str,
+        ttl: float = 6 * 3600,
+        maxsize: int = 512,
+        variants: int = 3,
+        refresh_prob: float = 0.2,
+        precision: int = 5,
+    ):
+        self.variants = max(1, variants)
+        self.refresh_prob = refresh_prob
+        self.precision = precision
+        self.cache: CacheBackend = get_cache_backend(name, ttl=ttl, maxsize=maxsize)
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.refreshes = 0
+        register_cache(name, self)
+
+    def key(
+        self,
+        prefs: Mapping[str, Any],
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+        fields: Iterable[str] = KEY_FIELDS,
+    ) -> str:
+        """Cache key for ``prefs`` (only ``fields`` count) at the given location"""
+        parts = [f"{f}={_field(prefs.get(f))}" for f in fields]
+        if lat is not None and lon is not None:
+            parts.append(f"cell={geohash_encode(lat, lon, self.precision)}")
+        return "|".join(parts)
+
+    async def get(self, key: str, fingerprint: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """A cached plan (a copy), or None when the caller should generate one"""
+        entry = await self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry["fingerprint"] != fingerprint:
+            # Place data changed since generation: the plan may name places we no longer return
+            self.stale += 1
+            self.misses += 1
+            await self.cache.delete(key)
+            return None
+        if len(entry["variants"]) < self.variants and random.random() < self.refresh_prob:
+            self.refreshes += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(random.choice(entry["variants"]))
+
+    async def put(self, key: str, plan: Dict[str, Any], fingerprint: Optional[str] = None) -> None:
+        """Store ``plan`` as one more variant for ``key``"""
+        entry = await self.cache.get(key)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            entry = {"fingerprint": fingerprint, "variants": []}
+        entry["variants"] = (entry["variants"] + [plan])[-self.variants:]
+        await self.cache.set(key, entry)
+
+    async def invalidate(self, key: str) -> None:
+        await self.cache.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            **self.cache.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "stale": self.stale,
+            "refreshes": self.refreshes,
+            "variants": self.variants,
+        }
+
+    async def clear(self) -> None:
+        await self.cache.clear()
+
+    def purge_expired(self) -> int:
+        return self.cache.purge_expired()
+
+
+def itinerary_cache_from_env(name: str) -> ItineraryCache:
+    return ItineraryCache(
+        name,
+        ttl=float(os.getenv("ITINERARY_CACHE_TTL", str(6 * 3600))),
+        maxsize=int(os.getenv("ITINERARY_CACHE_SIZE", "512")),
+        variants=int(os.getenv("ITINERARY_CACHE_VARIANTS", "3")),
+        refresh_prob=float(os.getenv("ITINERARY_CACHE_REFRESH", "0.2")),
+    )
@@ -0,0 +1,210 @@
+"""
+In-process background jobs for work too slow for one HTTP request
+(e.g. AI travel plan generation).
+
+``submit`` returns immediately with a ``pending`` job; a small pool of
+asyncio workers runs the registered handler for the job's kind. Handlers
+report progress through a callback and every state change is passed to the
+subscribed listeners (the websocket ``ConnectionManager`` forwards them to
+the job's owner). Workers start lazily on the first submit, so the queue
+also works without the application lifespan (tests, scripts).
+
+Jobs are not persisted: a restart drops queued and running jobs, so
+handlers must leave their own durable state (e.g. the trip status) in a
+form a startup/periodic sweep can recover from.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are waiting; routers map it to HTTP 503"""
+
+    def __init__(self, queue_depth: int, retry_after: int = 10):
+        super().__init__(f"Job queue full: {queue_depth} jobs waiting")
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, job_id: str, kind: str, payload: Dict[str, Any], owner: Optional[str] = None):
+        self.id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.owner = owner
+        self.status = PENDING
+        self.stage = "queued"
+        self.progress = 0.0
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 2),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# report(stage, progress 0..1)
+Reporter = Callable[[str, float], Awaitable[None]]
+Handler = Callable[[Job, Reporter], Awaitable[Any]]
+Listener = Callable[[Job], Awaitable[None]]
+
+
+class JobQueue:
+    def __init__(self, workers: int = 2, maxsize: int = 100, keep: int = 1000):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.keep = keep  # finished jobs remembered for status lookups
+        self._handlers: Dict[str, Handler] = {}
+        self._listeners: List[Listener] = []
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def register(self, kind: str, handler: Handler) -> Handler:
+        self._handlers[kind] = handler
+        return handler
+
+    def subscribe(self, listener: Listener) -> Listener:
+        self._listeners.append(listener)
+        return listener
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        """Start the workers on the running loop (no-op if already running)"""
+        loop = asyncio.get_running_loop()
+        if self._tasks and all(t.get_loop() is loop and not t.done() for t in self._tasks):
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    async def submit(
+        self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None, owner: Optional[str] = None
+    ) -> Job:
+        """Queue a job; raises JobQueueFullError instead of waiting for room"""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        self.start()
+        job = Job(job_id or uuid.uuid4().hex, kind, payload, owner)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise JobQueueFullError(self._queue.qsize())
+        self.submitted += 1
+        self._remember(job)
+        await self._emit(job)
+        return job
+
+    def _remember(self, job: Job) -> None:
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.keep:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status in (PENDING, RUNNING):
+                break
+            del self._jobs[oldest_id]
+
+    async def _emit(self, job: Job) -> None:
+        for listener in self._listeners:
+            try:
+                await listener(job)
+            except Exception as e:
+                logger.warning(f"Job listener failed for {job.id}: {e}")
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        async def report(stage: str, progress: float) -> None:
+            job.stage, job.progress = stage, max(0.0, min(1.0, progress))
+            await self._emit(job)
+
+        job.status, job.started_at = RUNNING, time.time()
+        await report("started", 0.0)
+        try:
+            job.result = await self._handlers[job.kind](job, report)
+            job.status, job.stage, job.progress = DONE, "done", 1.0
+            self.completed += 1
+        except asyncio.CancelledError:
+            job.status, job.error = FAILED, "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.status, job.error = FAILED, str(e)
+            self.failed += 1
+        finally:
+            job.finished_at = time.time()
+            if job.status != RUNNING:
+                await self._emit(job)
+
+    async def join(self) -> None:
+        """Wait until every queued job has finished"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        running = sum(1 for job in self._jobs.values() if job.status == RUNNING)
+        return {
+            "workers": len(self._tasks),
+            "maxsize": self.maxsize,
+            "queue_depth": self.queue_depth,
+            "running": running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+job_queue = JobQueue(
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    maxsize=int(os.getenv("JOB_QUEUE_SIZE", "100")),
+)
+
+
+def get_job_stats() -> Dict[str, Any]:
+    """Queue depth and outcome counters of the background job queue"""
+    return job_queue.stats()
@@ -0,0 +1,248 @@
+"""
+JSON extraction and repair for LLM outputs.
+
+Models wrap JSON in prose or code fences, leave trailing commas and get cut
+off at the token limit. Instead of discarding such a generation:
+
+1. the whole ``{...}`` span is tried as-is (fast path, same as before);
+2. otherwise every balanced top-level object is found with a compiled
+   tokenizer (strings are skipped whole, so braces inside text do not
+   count) and the largest one that parses wins, after dropping trailing
+   commas if needed;
+3. a truncated object is cut back to its last complete value and the open
+   arrays/objects are closed.
+
+``coerce_itinerary`` / ``coerce_day`` then map common key variants onto
+``core/schema`` (``days`` -> ``schedule``, ``name`` -> ``place``, numeric
+times and costs, ...) and validate the result.
+"""
+from __future__ import annotations
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.core.schema import DayPlan, Itinerary
+
+# A whole string literal (closing quote in group 1, empty if cut off) or a structural char
+_TOKENS = re.compile(r'"(?:[^"\\]|\\.)*("?)|[{}\[\],]', re.S)
+_TRAILING_COMMA = re.compile(r'("(?:[^"\\]|\\.)*")|,(\s*[}\]])', re.S)
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _scan(text: str, start: int) -> Tuple[Optional[int], int, List[str]]:
+    """
+    Scan the object opened at ``start``: ``(end, safe, open)`` where ``end``
+    is the index of its closing brace (None if it never closes), ``safe`` the
+    last offset at which it can be cut and ``open`` the closers needed there.
+    """
+    stack: List[str] = []
+    safe, safe_stack = start + 1, ["}"]
+    for m in _TOKENS.finditer(text, start):
+        token = m.group()
+        if token[0] == '"':
+            if not m.group(1):
+                break  # string cut off
+            continue
+        i = m.start()
+        if token in _CLOSERS:
+            stack.append(_CLOSERS[token])
+            safe, safe_stack = i + 1, stack[:]
+        elif token == ",":
+            safe, safe_stack = i, stack[:]
+        else:
+            if not stack or stack[-1] != token:
+                break  # mismatched bracket: treat the rest as garbage
+            stack.pop()
+            if not stack:
+                return i, i + 1, []
+            safe, safe_stack = i + 1, stack[:]
+    return None, safe, safe_stack
+
+
+def strip_trailing_commas(text: str) -> str:
+    return _TRAILING_COMMA.sub(lambda m: m.group(1) or m.group(2), text)
+
+
+def _loads(snippet: str) -> Optional[Any]:
+    for candidate in (snippet, strip_trailing_commas(snippet)):
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+def close_truncated(text: str, start: int = 0) -> str:
+    """The object starting at ``start`` cut to its last complete value and closed"""
+    _, safe, open_closers = _scan(text, start)
+    return strip_trailing_commas(text[start:safe].rstrip().rstrip(",") + "".join(reversed(open_closers)))
+
+
+def extract_json(text: str) -> Dict[str, Any]:
+    """The JSON object in an LLM answer, repaired when possible; ValueError otherwise"""
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("Không tìm thấy JSON trong output")
+
+    end = text.rfind("}")
+    if end > start:
+        try:
+            return json.loads(text[start:end + 1])
+        except ValueError:
+            pass
+
+    best: Optional[Dict[str, Any]] = None
+    best_len = 0
+    pos = start
+    while pos != -1:
+        end, _, _ = _scan(text, pos)
+        if end is None:
+            # Output cut off inside this object: keep what is complete
+            if best is None:
+                best = _loads(close_truncated(text, pos))
+            break
+        parsed = _loads(text[pos:end + 1])
+        if isinstance(parsed, dict) and end + 1 - pos > best_len:
+            best, best_len = parsed, end + 1 - pos
+        pos = text.find("{", end + 1)
+
+    if not isinstance(best, dict):
+        raise ValueError("JSON trong output không hợp lệ")
+    return best
+
+
+def _first(data: Dict[str, Any], names: Tuple[str, ...], default: Any = None) -> Any:
+    for name in names:
+        if data.get(name) not in (None, ""):
+            return data[name]
+    return default
+
+
+_HOUR = re.compile(r"(\d{1,2})\s*[hHg](\d{2})?")  # "8h", "8h30", "14g"
+
+
+def _coerce_time(value: Any) -> str:
+    if isinstance(value, (int, float)):
+        return f"{int(value):02d}:00"
+    text = str(value or "").strip()
+    m = _HOUR.fullmatch(text)
+    return f"{int(m.group(1)):02d}:{m.group(2) or '00'}" if m else text
+
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_CURRENCY = re.compile(r"vn[dđ]|usd|đồng|[đ₫$€]")
+_UNITS = re.compile(r"(?:\s*(?:trăm|nghìn|ngàn|triệu|tỷ|tr|k)(?!\w))*")
+_MULTIPLIERS = {"trăm": 1e2, "nghìn": 1e3, "ngàn": 1e3, "k": 1e3, "triệu": 1e6, "tr": 1e6, "tỷ": 1e9}
+_FREE = re.compile(r"miễn phí|free")
+
+
+def _parse_number(token: str) -> Optional[float]:
+    """``4.500.000`` / ``1,234.5`` / ``12.50`` / ``1,5`` -> float; None if the separators do not add up"""
+    if "." in token and "," in token:
+        point = max(token.rfind("."), token.rfind(","))  # the last separator is the decimal one
+        whole = _thousands(token[:point], "," if token[point] == "." else ".")
+        return None if whole is None else float(f"{whole}.{token[point + 1:]}")
+    for sep in ".,":
+        parts = token.split(sep)
+        if len(parts) == 2 and len(parts[1]) != 3:
+            return float(f"{parts[0]}.{parts[1]}")
+        if len(parts) > 1:
+            whole = _thousands(token, sep)
+            return None if whole is None else float(whole)
+    return float(token)
+
+
+def _thousands(token: str, sep: str) -> Optional[str]:
+    """Digits of a thousand-separated number ("4.500.000"), None unless every later group has three"""
+    parts = token.split(sep)
+    return "".join(parts) if all(p.isdigit() for p in parts) and all(len(p) == 3 for p in parts[1:]) else None
+
+
+def _coerce_cost(value: Any) -> Optional[float]:
+    """
+    Amount in a cost string: "4.500.000đ", "$12.50", "1,5 triệu", "200k".
+    None for ranges and anything else with more than one number, rather
+    than a made-up figure.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = _CURRENCY.sub(" ", str(value or "").lower())
+    numbers = _NUMBER.findall(text)
+    if not numbers:
+        return 0.0 if _FREE.search(text) else None
+    if len(numbers) > 1:  # ranges ("2-3 trăm nghìn"), "1 triệu 500 nghìn", ...
+        return None
+    number = _NUMBER.search(text)
+    amount = _parse_number(number.group())
+    if amount is None:
+        return None
+    for unit in re.findall(r"\w+", _UNITS.match(text, number.end()).group()):
+        amount *= _MULTIPLIERS[unit]
+    return amount
+
+
+def coerce_activity(activity: Any) -> Optional[Dict[str, Any]]:
+    """Activity in ``schema.Activity`` shape, or None if it names no place"""
+    if isinstance(activity, str):
+        activity = {"place": activity}
+    if not isinstance(activity, dict):
+        return None
+    place = _first(activity, ("place", "name", "location", "title", "activity"))
+    if place is None:
+        return None
+    coerced = dict(activity)
+    coerced["place"] = str(place)
+    coerced["time"] = _coerce_time(_first(activity, ("time", "start", "start_time", "time_slot"), ""))
+    coerced["desc"] = str(_first(activity, ("desc", "description", "note", "details"), ""))
+    if "cost" in activity:
+        coerced["cost"] = _coerce_cost(activity["cost"])
+    return coerced
+
+
+def coerce_day(day: Any, number: int) -> Dict[str, Any]:
+    """Day in ``schema.DayPlan`` shape (``number`` when the day has none); ValueError if invalid"""
+    if isinstance(day, list):
+        day = {"activities": day}
+    if not isinstance(day, dict):
+        raise ValueError(f"ngày {number} không phải object")
+    coerced = dict(day)
+    try:
+        coerced["day"] = int(_first(day, ("day", "day_number", "ngay"), number))
+    except (TypeError, ValueError):
+        coerced["day"] = number
+    coerced["title"] = str(_first(day, ("title", "theme", "name", "summary"), f"Ngày {coerced['day']}"))
+    activities = _first(day, ("activities", "items", "schedule", "plan"), [])
+    coerced["activities"] = [a for a in map(coerce_activity, activities if isinstance(activities, list) else []) if a]
+    try:
+        DayPlan(**coerced)
+    except ValidationError as e:
+        raise ValueError(f"sai schema: {e.errors()[:1]}")
+    return coerced
+
+
+def coerce_itinerary(data: Any) -> Dict[str, Any]:
+    """Plan in ``schema.Itinerary`` shape; ValueError if it cannot be made valid"""
+    if isinstance(data, list):
+        data = {"schedule": data}
+    if not isinstance(data, dict):
+        raise ValueError("itinerary không phải object")
+    schedule = _first(data, ("schedule", "days", "itinerary", "plan"), [])
+    if isinstance(schedule, dict):
+        schedule = list(schedule.values())
+    if not isinstance(schedule, list):
+        raise ValueError("thiếu schedule")
+
+    plan = dict(data)
+    plan["schedule"] = [coerce_day(day, i) for i, day in enumerate(schedule, start=1)]
+    plan["overview"] = str(_first(data, ("overview", "summary", "description", "title"), ""))
+    cost = _first(data, ("total_cost_estimate", "total_cost", "estimated_cost"), "")
+    if isinstance(cost, (int, float)):
+        cost = f"{int(round(cost)):,}đ".replace(",", ".")
+    plan["total_cost_estimate"] = str(cost)
+    try:
+        Itinerary(**plan)
+    except ValidationError as e:
+        raise ValueError(f"sai schema: {e.errors()[:1]}")
+    return plan
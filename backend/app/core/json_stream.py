@@ -0,0 +1,94 @@
+"""
+Incremental JSON parsing over an LLM token stream.
+
+``JSONArrayStreamParser`` is fed text chunks as they arrive and returns every
+element of a top-level array (e.g. ``"schedule"``) as soon as its closing
+brace has been seen, so the first day can be shown long before the model
+has finished the whole itinerary. Text before the first ``{`` (chatty
+preambles) is ignored.
+"""
+from __future__ import annotations
+import json
+from typing import Any, Dict, List, Optional
+
+
+class JSONArrayStreamParser:
+    def __init__(self, array_key: str = "schedule"):
+        self.array_key = array_key
+        self.buffer = ""
+        self._pos = 0
+        self._root: Optional[int] = None  # index of the root "{"
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._array_depth: Optional[int] = None  # stack depth inside the target array
+        self._item_start: Optional[int] = None
+        self.items_emitted = 0
+        self.errors = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Add text; returns the array elements completed by it"""
+        self.buffer += chunk
+        completed = []
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf):
+            c = buf[i]
+            if self._root is None:
+                if c == "{":
+                    self._root = i
+                    self._stack.append("{")
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = buf[self._string_start:i]
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif c in "{[":
+                if (
+                    c == "["
+                    and len(self._stack) == 1
+                    and self._array_depth is None
+                    and self._last_string == self.array_key
+                ):
+                    self._array_depth = 2
+                elif c == "{" and self._array_depth is not None and len(self._stack) == self._array_depth:
+                    self._item_start = i
+                self._stack.append(c)
+            elif c in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if c == "}" and self._item_start is not None and len(self._stack) == self._array_depth:
+                    item = self._parse_item(buf[self._item_start:i + 1])
+                    if item is not None:
+                        completed.append(item)
+                    self._item_start = None
+                elif c == "]" and self._array_depth is not None and len(self._stack) == 1:
+                    self._array_depth = -1  # array finished; ignore later arrays with the same key
+            i += 1
+        self._pos = i
+        return completed
+
+    def _parse_item(self, text: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(text)
+        except ValueError:
+            self.errors += 1
+            return None
+        self.items_emitted += 1
+        return item if isinstance(item, dict) else None
+
+    @property
+    def document(self) -> str:
+        """Text from the root ``{`` on (for parsing the full object at the end)"""
+        return self.buffer[self._root:] if self._root is not None else ""
@@ -0,0 +1,124 @@
+"""
+Bounded off-loop execution for blocking LLM calls (Ollama via LangChain)
+"""
+from __future__ import annotations
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class LLMOverloadedError(Exception):
+    """Raised when the LLM queue is full; routers map it to HTTP 503"""
+
+    def __init__(self, queue_depth: int, retry_after: int = 5):
+        super().__init__(f"LLM busy: {queue_depth} requests queued")
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+
+
+class LLMExecutor:
+    """
+    Runs blocking ``llm.invoke`` calls on a fixed worker pool.
+
+    At most ``max_workers`` calls run at once and at most ``max_queue`` more
+    wait for a worker; anything beyond that is rejected immediately with
+    ``LLMOverloadedError`` instead of stalling the event loop.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 8, timeout: Optional[float] = None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self._pending = 0  # queued + running
+        self._running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._queue_wait_total = 0.0
+        self._run_time_total = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._pending - self._running
+
+    def _call(self, fn: Callable[..., Any], args: tuple, kwargs: dict, enqueued_at: float) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self._queue_wait_total += started - enqueued_at
+        try:
+            result = fn(*args, **kwargs)
+            with self._lock:
+                self.completed += 1
+            return result
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._run_time_total += time.perf_counter() - started
+
+    def _release(self, _future) -> None:
+        # Runs when the work finishes or is cancelled before it started
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the pool, raising LLMOverloadedError when full"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise LLMOverloadedError(self._pending - self._running)
+            self._pending += 1
+
+        future = self._pool.submit(self._call, fn, args, kwargs, time.perf_counter())
+        future.add_done_callback(self._release)
+
+        budget = self.timeout if timeout is None else timeout
+        try:
+            # Cancelling the wrapper also drops the job if it is still queued
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=budget)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": self._pending - self._running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "avg_queue_wait": (self._queue_wait_total / started) if started else 0.0,
+                "avg_run_time": (self._run_time_total / started) if started else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+llm_executor = LLMExecutor(
+    max_workers=int(os.getenv("LLM_MAX_WORKERS", "2")),
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "8")),
+    timeout=float(os.getenv("LLM_TIMEOUT", "120")),
+)
+
+
+def get_llm_stats() -> Dict[str, Any]:
+    """Queue depth and throughput of the shared LLM executor"""
+    return llm_executor.stats()
@@ -0,0 +1,218 @@
+"""
+Process-wide scheduler for hosted LLM calls (OpenAI-compatible APIs).
+
+- at most ``max_concurrency`` calls in flight; waiting calls are served by
+  priority lane (interactive before batch), FIFO within a lane, and anything
+  beyond ``max_queue`` waiting calls is rejected with ``LLMOverloadedError``
+- a token bucket per model keeps requests under the provider's rate limit
+- retryable errors (429, 5xx, connection) are retried with full-jitter
+  exponential backoff, honoring ``Retry-After`` when the provider sends one
+"""
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from app.core.llm_executor import LLMOverloadedError
+
+INTERACTIVE, BATCH = 0, 1
+LANES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+
+class TokenBucket:
+    """``rate`` requests per second with bursts of up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Take one token, waiting for it if needed; returns the seconds waited"""
+        waited = 0.0
+        async with self._lock:  # FIFO among waiters
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    """``"gpt-4=60,gpt-3.5-turbo=300"`` -> requests per minute by model"""
+    limits = {}
+    for part in spec.split(","):
+        if "=" in part:
+            model, rpm = part.split("=", 1)
+            limits[model.strip()] = float(rpm)
+    return limits
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class GenerationScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_queue: int = 32,
+        rate_limits: Optional[Dict[str, float]] = None,
+        default_rpm: float = 60,
+        retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.rate_limits = rate_limits or {}
+        self.default_rpm = default_rpm
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._running = 0
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+        self.rate_wait_total = 0.0
+        self._lanes = {
+            name: {"submitted": 0, "completed": 0, "queue_wait_total": 0.0, "queue_wait_max": 0.0}
+            for name in LANES.values()
+        }
+
+    def bucket(self, model: str) -> TokenBucket:
+        if model not in self._buckets:
+            rpm = self.rate_limits.get(model, self.default_rpm)
+            # Burst of a few seconds' worth of requests, at least one
+            self._buckets[model] = TokenBucket(rpm / 60.0, max(1.0, rpm / 20.0))
+        return self._buckets[model]
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    async def _acquire_slot(self, priority: int) -> None:
+        if self._running < self.max_concurrency and not self.queue_depth:
+            self._running += 1
+            return
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise LLMOverloadedError(self.queue_depth)
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release_slot()  # slot was handed over just before the cancel
+            raise
+
+    def _release_slot(self) -> None:
+        # Hand the slot to the best waiter, skipping ones that gave up
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._running -= 1
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    async def submit(
+        self,
+        model: str,
+        fn: Callable[[], Awaitable[Any]],
+        priority: int = INTERACTIVE,
+        retry_on: Tuple[Type[BaseException], ...] = (),
+    ) -> Any:
+        """
+        Run ``await fn()`` (one API request to ``model``) under the limits.
+        Errors in ``retry_on`` are retried; others propagate immediately.
+        """
+        lane = self._lanes[LANES[priority]]
+        lane["submitted"] += 1
+        enqueued = time.perf_counter()
+        await self._acquire_slot(priority)
+        waited = time.perf_counter() - enqueued
+        lane["queue_wait_total"] += waited
+        lane["queue_wait_max"] = max(lane["queue_wait_max"], waited)
+        try:
+            for attempt in range(self.retries + 1):
+                self.rate_wait_total += await self.bucket(model).acquire()
+                try:
+                    result = await fn()
+                    lane["completed"] += 1
+                    return result
+                except retry_on as e:
+                    if attempt == self.retries:
+                        raise
+                    self.retried += 1
+                    await asyncio.sleep(self._backoff(attempt, e))
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._release_slot()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "running": self._running,
+            "queue_depth": self.queue_depth,
+            "retried": self.retried,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "rate_wait_total": round(self.rate_wait_total, 3),
+            "rate_limits_rpm": {m: b.rate * 60 for m, b in self._buckets.items()},
+            "lanes": {
+                name: {
+                    "submitted": lane["submitted"],
+                    "completed": lane["completed"],
+                    "avg_queue_wait": (lane["queue_wait_total"] / lane["submitted"]) if lane["submitted"] else 0.0,
+                    "max_queue_wait": lane["queue_wait_max"],
+                }
+                for name, lane in self._lanes.items()
+            },
+        }
+
+
+generation_scheduler = GenerationScheduler(
+    max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "4")),
+    max_queue=int(os.getenv("OPENAI_MAX_QUEUE", "32")),
+    rate_limits=parse_rate_limits(os.getenv("OPENAI_RATE_LIMITS", "gpt-4=60,gpt-3.5-turbo=300")),
+    default_rpm=float(os.getenv("OPENAI_DEFAULT_RPM", "60")),
+    retries=int(os.getenv("OPENAI_RETRIES", "3")),
+)
+
+
+def get_generation_stats() -> Dict[str, Any]:
+    """Concurrency, lane queue times and retries of the hosted-LLM scheduler"""
+    return generation_scheduler.stats()
@@ -0,0 +1,108 @@
+"""
+Model-tier cascade for LLM generation.
+
+Tiers are ordered cheapest/fastest first. A request goes to the first tier;
+if the output fails validation (schema or quality checks) or the call
+errors, it is escalated to the next tier. Per-tier latency and the
+escalation rate are kept so the tier list can be tuned for cost and speed.
+"""
+from __future__ import annotations
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+from app.core.llm_executor import LLMOverloadedError
+
+# call(tier) -> raw model output; validate(raw) -> result, raises ValueError when unusable
+CallFn = Callable[[str], Awaitable[str]]
+ValidateFn = Callable[[str], Any]
+
+
+class CascadeExhaustedError(ValueError):
+    """No tier produced a valid result"""
+
+    def __init__(self, reasons: Dict[str, str]):
+        super().__init__("; ".join(f"{tier}: {reason}" for tier, reason in reasons.items()))
+        self.reasons = reasons
+
+
+def tiers_from_env(value: str) -> List[str]:
+    """``"qwen2.5:3b, mistral"`` -> ["qwen2.5:3b", "mistral"]"""
+    return [tier.strip() for tier in value.split(",") if tier.strip()]
+
+
+class ModelRouter:
+    def __init__(self, name: str, tiers: Sequence[str]):
+        if not tiers:
+            raise ValueError(f"Model router '{name}' needs at least one tier")
+        self.name = name
+        self.tiers = list(tiers)
+        self.requests = 0
+        self.escalations = 0  # requests that needed more than the first tier
+        self.exhausted = 0
+        self._tiers = {
+            tier: {"calls": 0, "accepted": 0, "rejected": 0, "errors": 0, "latency_total": 0.0, "latency_max": 0.0}
+            for tier in self.tiers
+        }
+        _routers[name] = self
+
+    async def run(self, call: CallFn, validate: ValidateFn) -> Tuple[Any, str]:
+        """``(result, tier)`` from the first tier whose output validates"""
+        self.requests += 1
+        reasons: Dict[str, str] = {}
+        for i, tier in enumerate(self.tiers):
+            if i == 1:
+                self.escalations += 1
+            metrics = self._tiers[tier]
+            metrics["calls"] += 1
+            started = time.perf_counter()
+            try:
+                raw = await call(tier)
+            except LLMOverloadedError:
+                raise
+            except Exception as e:
+                metrics["errors"] += 1
+                reasons[tier] = f"error: {e}"
+                continue
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics["latency_total"] += elapsed
+                metrics["latency_max"] = max(metrics["latency_max"], elapsed)
+            try:
+                result = validate(raw)
+            except ValueError as e:
+                metrics["rejected"] += 1
+                reasons[tier] = f"invalid: {e}"
+                continue
+            metrics["accepted"] += 1
+            return result, tier
+        self.exhausted += 1
+        raise CascadeExhaustedError(reasons)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tiers": self.tiers,
+            "requests": self.requests,
+            "escalations": self.escalations,
+            "escalation_rate": (self.escalations / self.requests) if self.requests else 0.0,
+            "exhausted": self.exhausted,
+            "per_tier": {
+                tier: {
+                    "calls": m["calls"],
+                    "accepted": m["accepted"],
+                    "rejected": m["rejected"],
+                    "errors": m["errors"],
+                    "acceptance_rate": (m["accepted"] / m["calls"]) if m["calls"] else 0.0,
+                    "avg_latency": (m["latency_total"] / m["calls"]) if m["calls"] else 0.0,
+                    "max_latency": m["latency_max"],
+                }
+                for tier, m in self._tiers.items()
+            },
+        }
+
+
+_routers: Dict[str, ModelRouter] = {}
+
+
+def get_model_router_stats() -> Dict[str, Any]:
+    """Per-tier latency and escalation rates of every model router"""
+    return {name: router.stats() for name, router in _routers.items()}
@@ -0,0 +1,120 @@
+"""
+Compact encoding of nearby places for LLM prompts.
+
+Prompt length is the main driver of local Ollama latency, so instead of
+pretty-printed JSON the places are sent as a small table:
+
+    Loại: C1=sights C2=restaurant C3=park
+    id|tên|loại|km|rating
+    1|Eo Gió|C1|1.2|4.5
+
+Only the best ``top_k`` places (theme relevance, rating, distance) are kept,
+and rows are dropped once the estimated token count would exceed the budget.
+"""
+from __future__ import annotations
+import math
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+PROMPT_TOP_K = int(os.getenv("PROMPT_TOP_K", "25"))
+# Distance beyond which a place gets no proximity bonus (meters)
+PROXIMITY_RANGE_M = 8000
+
+_WORD = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough BPE token count: one token per ~4 UTF-8 bytes of each word, one per
+    punctuation mark. Vietnamese diacritics take 2-3 bytes, which matches
+    the higher token cost of accented text in Mistral/Llama vocabularies.
+    """
+    return sum(max(1, math.ceil(len(w.encode("utf-8")) / 4)) for w in _WORD.findall(text))
+
+
+def place_categories(place: Dict[str, Any]) -> List[str]:
+    cats = place.get("categories") or place.get("category") or []
+    if isinstance(cats, str):
+        cats = cats.split(",")
+    return [c.strip() for c in cats if c and c.strip()]
+
+
+def primary_category(place: Dict[str, Any]) -> str:
+    """Most specific category ("catering.cafe" -> "cafe"); "" if unknown"""
+    cats = place_categories(place)
+    if not cats:
+        return ""
+    best = max(cats, key=lambda c: c.count("."))
+    return best.rsplit(".", 1)[-1]
+
+
+def relevance(place: Dict[str, Any], wanted: Iterable[str]) -> float:
+    """Theme match (0-2) + rating (0-1) + proximity (0-1)"""
+    cats = place_categories(place)
+    match = sum(1 for w in wanted if any(c == w or c.startswith(w + ".") for c in cats))
+    rating = float(place.get("rating") or 0)
+    rating = rating / 5 if rating <= 5 else 0.0  # Geoapify "rank" values are not ratings
+    distance = place.get("distance_m")
+    proximity = 0.0 if distance is None else max(0.0, 1 - distance / PROXIMITY_RANGE_M)
+    return min(match, 2) + rating + proximity
+
+
+def select_top_k(places: List[Dict[str, Any]], k: int, wanted: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """The ``k`` most relevant places; ties keep input (distance) order"""
+    wanted = list(wanted)
+    ranked = sorted(enumerate(places), key=lambda item: (-relevance(item[1], wanted), item[0]))
+    return [place for _, place in ranked[:k]]
+
+
+def _cell(value: Any) -> str:
+    return str(value).replace("|", "/").replace("\n", " ").strip()
+
+
+def encode_places(
+    places: List[Dict[str, Any]],
+    wanted: Iterable[str] = (),
+    top_k: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> Tuple[str, Dict[str, int]]:
+    """
+    ``(table, stats)`` for the prompt. ``wanted`` are the Geoapify categories
+    the trip theme asks for; ``max_tokens`` bounds the whole table.
+    """
+    top_k = PROMPT_TOP_K if top_k is None else top_k
+    selected = select_top_k(places, top_k, wanted)
+
+    codes: Dict[str, str] = {}
+    for place in selected:
+        category = primary_category(place)
+        if category and category not in codes:
+            codes[category] = f"C{len(codes) + 1}"
+
+    header = "id|tên|loại|km|rating"
+    lines: List[str] = []
+    used: Dict[str, str] = {}
+    for i, place in enumerate(selected, start=1):
+        category = primary_category(place)
+        distance = place.get("distance_m")
+        rating = float(place.get("rating") or 0)
+        line = "|".join([
+            str(i),
+            _cell(place.get("name", "")),
+            codes.get(category, ""),
+            f"{distance / 1000:.1f}" if distance is not None else "",
+            f"{rating:g}" if 0 < rating <= 5 else "",
+        ])
+        with_row = {**used, category: codes[category]} if category else used
+        if max_tokens is not None and lines and estimate_tokens(_render(with_row, header, lines + [line])) > max_tokens:
+            break
+        lines.append(line)
+        used = with_row
+
+    table = _render(used, header, lines) if lines else "(không có dữ liệu địa điểm)"
+    return table, {"places_in": len(places), "places_out": len(lines), "tokens": estimate_tokens(table)}
+
+
+def _render(codes: Dict[str, str], header: str, lines: List[str]) -> str:
+    legend = " ".join(f"{code}={category}" for category, code in codes.items())
+    return "\n".join(([f"Loại: {legend}"] if legend else []) + [header] + lines)
@@ -0,0 +1,228 @@
+"""
+Deterministic post-processing that removes zig-zags from generated days.
+
+Each day's activities are matched to coordinates (their own, or a nearby
+place with the same name). Meals, hotels and activities without coordinates
+stay pinned to their slot; the movable activities between two pins are
+reordered with nearest-neighbour + 2-opt + Or-opt on a travel-time matrix.
+The time column is kept as-is: activities move between the existing slots.
+"""
+from __future__ import annotations
+import copy
+import re
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.geo import coords_array, distance_matrix_m
+
+Point = Dict[str, float]
+# matrix_fn(points, points) -> travel times (seconds), e.g. GeoapifyService.get_distance_matrix
+MatrixFn = Callable[[List[Point], List[Point]], Awaitable[List[List[float]]]]
+
+MEAL_KEYWORDS = ("ăn sáng", "ăn trưa", "ăn tối", "bữa", "breakfast", "lunch", "dinner")
+PINNED_TYPES = {"restaurant", "hotel"}
+# Phương tiện trong preferences -> mode của Geoapify
+TRANSPORT_MODES = {
+    "xe máy": "motorcycle", "ô tô": "drive", "oto": "drive", "taxi": "drive",
+    "đi bộ": "walk", "xe đạp": "bicycle",
+}
+MAX_PASSES = 20
+
+
+def transport_mode(transport: Optional[str]) -> str:
+    return TRANSPORT_MODES.get((transport or "").strip().lower(), "drive")
+
+
+def _normalize(s: str) -> str:
+    s = unicodedata.normalize("NFD", s or "")
+    s = re.sub(r"[\u0300-\u036f]", "", s).replace("đ", "d").replace("Đ", "d")
+    return " ".join(s.lower().split())
+
+
+def activity_point(activity: Dict[str, Any], places_by_name: Dict[str, Point]) -> Optional[Point]:
+    """Coordinates of an activity: its own, else the nearby place it names"""
+    coords = activity.get("coordinates") or activity
+    lat, lon = coords.get("lat"), coords.get("lon", coords.get("lng"))
+    if lat is not None and lon is not None:
+        return {"lat": float(lat), "lon": float(lon)}
+
+    name = _normalize(activity.get("place") or activity.get("location") or activity.get("name") or "")
+    if not name:
+        return None
+    if name in places_by_name:
+        return places_by_name[name]
+    for place_name, point in places_by_name.items():
+        if len(place_name) >= 4 and (place_name in name or name in place_name):
+            return point
+    return None
+
+
+def is_pinned(activity: Dict[str, Any]) -> bool:
+    if activity.get("type") in PINNED_TYPES:
+        return True
+    text = _normalize(f"{activity.get('place', '')} {activity.get('name', '')} {activity.get('desc', '')}")
+    return any(_normalize(k) in text for k in MEAL_KEYWORDS)
+
+
+def _path_cost(order: Sequence[int], start: Optional[int], end: Optional[int], cost: List[List[float]]) -> float:
+    stops = ([start] if start is not None else []) + list(order) + ([end] if end is not None else [])
+    return sum(cost[a][b] for a, b in zip(stops, stops[1:]))
+
+
+def _nearest_neighbour(nodes: List[int], start: Optional[int], cost: List[List[float]]) -> List[int]:
+    remaining = list(nodes)
+    order: List[int] = []
+    current = start
+    if current is None:
+        current = remaining.pop(0)
+        order.append(current)
+    while remaining:
+        nxt = min(remaining, key=lambda n: cost[current][n])
+        remaining.remove(nxt)
+        order.append(nxt)
+        current = nxt
+    return order
+
+
+def _improve(order: List[int], start: Optional[int], end: Optional[int], cost: List[List[float]]) -> List[int]:
+    """2-opt (segment reversal) and Or-opt (move chains of 1-3) until no gain"""
+    best = list(order)
+    best_cost = _path_cost(best, start, end, cost)
+    n = len(best)
+    for _ in range(MAX_PASSES):
+        improved = False
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                candidate = best[:i] + best[i:j + 1][::-1] + best[j + 1:]
+                c = _path_cost(candidate, start, end, cost)
+                if c < best_cost - 1e-9:
+                    best, best_cost, improved = candidate, c, True
+        for length in (1, 2, 3):
+            for i in range(n - length + 1):
+                chain, rest = best[i:i + length], best[:i] + best[i + length:]
+                for k in range(len(rest) + 1):
+                    if k == i:
+                        continue
+                    candidate = rest[:k] + chain + rest[k:]
+                    c = _path_cost(candidate, start, end, cost)
+                    if c < best_cost - 1e-9:
+                        best, best_cost, improved = candidate, c, True
+        if not improved:
+            break
+    return best
+
+
+def _optimize_segment(nodes: List[int], start: Optional[int], end: Optional[int], cost: List[List[float]]) -> List[int]:
+    if len(nodes) < 2:
+        return nodes
+    if start is None:
+        # Open start: try each node first and keep the best tour
+        candidates = [_nearest_neighbour([s] + [n for n in nodes if n != s], None, cost) for s in nodes]
+        tour = min(candidates, key=lambda o: _path_cost(o, None, end, cost))
+    else:
+        tour = _nearest_neighbour(nodes, start, cost)
+    tour = _improve(tour, start, end, cost)
+    # Only accept a strictly shorter order, otherwise keep the generated one
+    if _path_cost(tour, start, end, cost) < _path_cost(nodes, start, end, cost) - 1e-9:
+        return tour
+    return nodes
+
+
+def _located_cost(order: Sequence[int], points: List[Optional[Point]], cost: List[List[float]]) -> float:
+    located = [i for i in order if points[i] is not None]
+    return sum(cost[a][b] for a, b in zip(located, located[1:]))
+
+
+def reorder_day(activities: List[Dict[str, Any]], points: List[Optional[Point]], cost: List[List[float]]) -> List[int]:
+    """
+    New visiting order (indices into ``activities``). ``points[i]`` are the
+    coordinates of ``activities[i]`` (None = unknown) and ``cost[i][j]`` the
+    travel cost between them; pinned activities keep their position.
+    """
+    pinned = [is_pinned(a) or points[i] is None for i, a in enumerate(activities)]
+    result: List[int] = []
+    segment: List[int] = []
+    anchor: Optional[int] = None
+    for i in list(range(len(activities))) + [None]:
+        if i is not None and not pinned[i]:
+            segment.append(i)
+            continue
+        start = anchor if anchor is not None and points[anchor] is not None else None
+        end = i if i is not None and points[i] is not None else None
+        result.extend(_optimize_segment(segment, start, end, cost))
+        segment = []
+        if i is not None:
+            result.append(i)
+            anchor = i
+    return result
+
+
+def apply_order(activities: List[Dict[str, Any]], order: List[int]) -> List[Dict[str, Any]]:
+    """Activities in ``order``, each taking the time slot of the position it moves to"""
+    reordered = []
+    for slot, idx in zip(activities, order):
+        activity = dict(activities[idx])
+        if "time" in slot:
+            activity["time"] = slot["time"]
+        reordered.append(activity)
+    return reordered
+
+
+def estimate_matrix(points: List[Point]) -> List[List[float]]:
+    """Straight-line distances (m) as a travel cost when no matrix service is given"""
+    lats, lons = coords_array(points)
+    return distance_matrix_m(lats, lons, lats, lons).tolist()
+
+
+async def optimize_day(
+    activities: List[Dict[str, Any]],
+    places_by_name: Dict[str, Point],
+    matrix_fn: Optional[MatrixFn] = None,
+) -> Tuple[List[Dict[str, Any]], float, float]:
+    """``(activities, cost_before, cost_after)`` for one day"""
+    points = [activity_point(a, places_by_name) for a in activities]
+    located = [i for i, p in enumerate(points) if p is not None]
+    if len(located) < 3:
+        return activities, 0.0, 0.0
+
+    located_points = [points[i] for i in located]
+    sub = await matrix_fn(located_points, located_points) if matrix_fn else estimate_matrix(located_points)
+    cost = [[0.0] * len(activities) for _ in activities]
+    for a, i in enumerate(located):
+        for b, j in enumerate(located):
+            cost[i][j] = float(sub[a][b] or 0)
+
+    order = reorder_day(activities, points, cost)
+    identity = list(range(len(activities)))
+    return apply_order(activities, order), _located_cost(identity, points, cost), _located_cost(order, points, cost)
+
+
+def places_index(nearby_places: List[Dict[str, Any]]) -> Dict[str, Point]:
+    """Normalized place name -> coordinates, for matching activity names"""
+    return {
+        _normalize(p.get("name", "")): {"lat": p["lat"], "lon": p.get("lon", p.get("lng"))}
+        for p in nearby_places
+        if p.get("name") and p.get("lat") is not None and p.get("lon", p.get("lng")) is not None
+    }
+
+
+async def optimize_itinerary(
+    plan: Dict[str, Any],
+    nearby_places: List[Dict[str, Any]],
+    matrix_fn: Optional[MatrixFn] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Reorder every day of an agent itinerary (``plan["schedule"]``).
+
+    Returns ``(plan, stats)``; stats has the travel cost before and after
+    (seconds with ``matrix_fn``, meters otherwise). The input is not modified.
+    """
+    by_name = places_index(nearby_places)
+    plan = copy.deepcopy(plan)
+    before = after = 0.0
+    for day in plan.get("schedule", []):
+        activities, day_before, day_after = await optimize_day(day.get("activities") or [], by_name, matrix_fn)
+        day["activities"] = activities
+        before += day_before
+        after += day_after
+    return plan, {"travel_before": round(before, 1), "travel_after": round(after, 1)}
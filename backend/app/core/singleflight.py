@@ -0,0 +1,70 @@
+"""
+Single-flight request coalescing: concurrent callers with the same key share
+one in-flight call instead of each hitting the provider.
+"""
+from __future__ import annotations
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    ``await flight.do(key, fn)`` runs ``fn()`` once per key at a time.
+
+    The call runs in its own task, so one caller being cancelled does not
+    cancel it for the others; it is cancelled only when every waiter has
+    gone away. Results and exceptions are delivered to all waiters.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.deduplicated = 0
+        self.errors = 0
+        self.cancelled = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None or call.task.done():
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task, key=key, call=call: self._finish(key, call, task))
+            self.calls += 1
+        else:
+            self.deduplicated += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+                self.cancelled += 1
+
+    def _finish(self, key: Hashable, call: _Call, task: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.calls + self.deduplicated
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "deduplicated": self.deduplicated,
+            "dedup_ratio": (self.deduplicated / total) if total else 0.0,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+        }
@@ -4,6 +4,8 @@ import os
 from typing import Optional
 import logging
 
+from app import db_indexes
+
 logger = logging.getLogger(__name__)
 
 class Database:
@@ -35,35 +37,14 @@ async def init_db():
         raise
 
 async def create_indexes():
-    """Create database indexes for better performance"""
+    """Create the registered indexes (app/db_indexes.py) and check the hot query plans"""
     try:
-        # Users collection indexes
-        await db.database.users.create_index("email", unique=True)
-        await db.database.users.create_index("username", unique=True)
-        
-        # Trips collection indexes
-        await db.database.trips.create_index("user_id")
-        await db.database.trips.create_index("destination")
-        await db.database.trips.create_index("start_date")
-        await db.database.trips.create_index("status")
-        
-        # Activities collection indexes
-        await db.database.activities.create_index("trip_id")
-        await db.database.activities.create_index("day")
-        
-        # Feedback collection indexes
-        await db.database.feedback.create_index("trip_id")
-        await db.database.feedback.create_index("created_at")
-        
-        # Maps collection indexes
-        try:
-            await db.database.map_locations.create_index([("location", "2dsphere")])
-        except Exception as e:
-            logger.warning(f"Could not create 2dsphere index: {e}")
-        await db.database.map_locations.create_index("category")
-        
+        await db_indexes.create_indexes(db.database)
         logger.info("Database indexes created successfully")
         
+        if os.getenv("VERIFY_QUERY_PLANS", "true").lower() == "true":
+            await db_indexes.verify_query_plans(db.database)
+        
     except Exception as e:
         logger.error(f"Failed to create indexes: {e}")
 
@@ -0,0 +1,126 @@
+"""
+Declarative MongoDB index registry.
+
+``INDEXES`` lists every index the app relies on; compound indexes follow
+the filter + sort shape of the hot queries in ``HOT_QUERIES`` (equality
+fields first, then the sort field), so those queries are answered by an
+index scan without an in-memory sort. At startup ``verify_query_plans``
+runs ``explain()`` on each hot query and logs the ones that fall back to a
+COLLSCAN; ``unused_indexes`` reports indexes with no recorded use
+(``$indexStats``) for /admin/indexes/unused.
+"""
+import logging
+from typing import Any, Dict, List, Set
+
+logger = logging.getLogger(__name__)
+
+ASC, DESC = 1, -1
+
+INDEXES: List[Dict[str, Any]] = [
+    {"collection": "users", "keys": [("email", ASC)], "unique": True},
+    {"collection": "users", "keys": [("username", ASC)], "unique": True},
+    # trips.find({user_id}).sort(created_at desc)
+    {"collection": "trips", "keys": [("user_id", ASC), ("created_at", DESC)]},
+    {"collection": "trips", "keys": [("destination", ASC)]},
+    {"collection": "trips", "keys": [("start_date", ASC)]},
+    {"collection": "trips", "keys": [("status", ASC)]},
+    # activities.find({trip_id}).sort(day) and the itinerary aggregation
+    {"collection": "activities", "keys": [("trip_id", ASC), ("day", ASC)]},
+    {"collection": "feedback", "keys": [("trip_id", ASC)]},
+    {"collection": "feedback", "keys": [("created_at", ASC)]},
+    # feedback_replies.find({feedback_id}).sort(created_at)
+    {"collection": "feedback_replies", "keys": [("feedback_id", ASC), ("created_at", ASC)]},
+    # user_preferences.find_one({user_id}, sort=created_at desc)
+    {"collection": "user_preferences", "keys": [("user_id", ASC), ("created_at", DESC)]},
+    {"collection": "map_locations", "keys": [("location", "2dsphere")]},
+    {"collection": "map_locations", "keys": [("category", ASC)]},
+    # SerpAPI place details cache: Mongo drops entries once fully stale
+    {"collection": "place_details_cache", "keys": [("stale_until", ASC)], "expireAfterSeconds": 0},
+]
+
+HOT_QUERIES: List[Dict[str, Any]] = [
+    {"collection": "activities", "filter": {"trip_id": ""}, "sort": [("day", ASC)]},
+    {"collection": "trips", "filter": {"user_id": ""}, "sort": [("created_at", DESC)]},
+    {"collection": "user_preferences", "filter": {"user_id": ""}, "sort": [("created_at", DESC)]},
+    {"collection": "feedback_replies", "filter": {"feedback_id": ""}, "sort": [("created_at", ASC)]},
+]
+
+
+def index_name(keys) -> str:
+    """Name MongoDB gives an index by default (``user_id_1_created_at_-1``)"""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def covering_index(query: Dict[str, Any]):
+    """Registered index whose key prefix is the query's equality fields then its sort, or None"""
+    n, sort = len(query["filter"]), list(query.get("sort", []))
+    for spec in INDEXES:
+        keys = spec["keys"]
+        if spec["collection"] == query["collection"] and {field for field, _ in keys[:n]} == set(query["filter"]) \
+                and keys[n:n + len(sort)] == sort:
+            return spec
+    return None
+
+
+async def create_indexes(database) -> None:
+    for spec in INDEXES:
+        options = {k: v for k, v in spec.items() if k not in ("collection", "keys")}
+        try:
+            await database[spec["collection"]].create_index(spec["keys"], **options)
+        except Exception as e:
+            logger.warning(f"Could not create index {spec['collection']}.{index_name(spec['keys'])}: {e}")
+
+
+def plan_stages(plan: Any) -> Set[str]:
+    """Every ``stage`` in an explain plan tree"""
+    stages: Set[str] = set()
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            stages.add(plan["stage"])
+        for value in plan.values():
+            stages |= plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            stages |= plan_stages(item)
+    return stages
+
+
+async def verify_query_plans(database) -> List[Dict[str, Any]]:
+    """Winning plan stages of every hot query; COLLSCANs are logged as warnings"""
+    report = []
+    for query in HOT_QUERIES:
+        cursor = database[query["collection"]].find(query["filter"])
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        explain = await cursor.explain()
+        stages = plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        shape = f"{query['collection']}.find({list(query['filter'])}).sort({query.get('sort', [])})"
+        if "COLLSCAN" in stages:
+            logger.warning(f"Query plan check: {shape} does a COLLSCAN")
+        report.append({"query": shape, "stages": sorted(stages), "collscan": "COLLSCAN" in stages})
+    return report
+
+
+async def unused_indexes(database) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Indexes with no recorded operation since they were loaded (counters reset
+    on server restart) and indexes present in the database but missing from
+    ``INDEXES`` (left over from older releases).
+    """
+    registered = {(spec["collection"], index_name(spec["keys"])) for spec in INDEXES}
+    unused, unregistered = [], []
+    for collection in sorted(await database.list_collection_names()):
+        async for stat in database[collection].aggregate([{"$indexStats": {}}]):
+            if stat["name"] == "_id_":
+                continue
+            entry = {
+                "collection": collection,
+                "index": stat["name"],
+                "ops": stat["accesses"]["ops"],
+                "since": stat["accesses"]["since"],
+            }
+            if entry["ops"] == 0:
+                unused.append(entry)
+            if (collection, stat["name"]) not in registered:
+                unregistered.append(entry)
+    return {"unused": unused, "unregistered": unregistered}
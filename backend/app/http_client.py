@@ -0,0 +1,166 @@
+"""
+Application-scoped pooled HTTP clients for outbound provider calls.
+
+One ``httpx.AsyncClient`` is kept per provider so every provider gets its own
+connection limit while all of them share keep-alive pooling (and HTTP/2 when
+the ``h2`` package is installed). Clients are created in the ``main.py``
+lifespan and closed on shutdown, the same way as the MongoDB client.
+"""
+import os
+import time
+import logging
+from typing import Any, Dict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2 support)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Per-provider connection limits; override with HTTP_MAX_CONNECTIONS_<PROVIDER>
+PROVIDER_LIMITS: Dict[str, Dict[str, int]] = {
+    "geoapify": {"max_connections": 50, "max_keepalive_connections": 20},
+    "serpapi": {"max_connections": 20, "max_keepalive_connections": 10},
+    "openweather": {"max_connections": 10, "max_keepalive_connections": 5},
+    "default": {"max_connections": 20, "max_keepalive_connections": 10},
+}
+
+DEFAULT_TIMEOUT = httpx.Timeout(20.0, connect=5.0)
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+
+class _InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """Transport that counts requests so pool usage can be sized under load."""
+
+    def __init__(self, provider: str, **kwargs):
+        super().__init__(**kwargs)
+        self.provider = provider
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_time = 0.0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            return await super().handle_async_request(request)
+        except Exception:
+            self.errors_total += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.total_time += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        connections = []
+        try:
+            # httpcore does not expose pool stats publicly
+            connections = list(self._pool.connections)
+        except Exception:
+            pass
+        idle = sum(1 for c in connections if c.is_idle())
+        http2 = sum(1 for c in connections if getattr(c, "_connection", None) is not None
+                    and type(c._connection).__name__.startswith("AsyncHTTP2"))
+        return {
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "avg_request_time": (self.total_time / self.requests_total) if self.requests_total else 0.0,
+            "connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "http2_connections": http2,
+        }
+
+
+class HTTPClients:
+    """Registry of pooled ``httpx.AsyncClient`` instances keyed by provider."""
+
+    def __init__(self):
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.transports: Dict[str, _InstrumentedTransport] = {}
+
+    def _limits_for(self, provider: str) -> httpx.Limits:
+        conf = PROVIDER_LIMITS.get(provider, PROVIDER_LIMITS["default"])
+        max_conn = int(os.getenv(f"HTTP_MAX_CONNECTIONS_{provider.upper()}", conf["max_connections"]))
+        keepalive = min(conf["max_keepalive_connections"], max_conn)
+        return httpx.Limits(
+            max_connections=max_conn,
+            max_keepalive_connections=keepalive,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        )
+
+    def get(self, provider: str = "default") -> httpx.AsyncClient:
+        """Return the client for a provider, creating it on first use."""
+        client = self.clients.get(provider)
+        if client is None or client.is_closed:
+            transport = _InstrumentedTransport(
+                provider,
+                http2=HTTP2_AVAILABLE,
+                limits=self._limits_for(provider),
+                retries=1,
+            )
+            client = httpx.AsyncClient(
+                transport=transport,
+                timeout=DEFAULT_TIMEOUT,
+                follow_redirects=True,
+            )
+            self.clients[provider] = client
+            self.transports[provider] = transport
+        return client
+
+    async def close(self):
+        for provider, client in list(self.clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close HTTP client '{provider}': {e}")
+        self.clients.clear()
+        self.transports.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2_enabled": HTTP2_AVAILABLE,
+            "providers": {
+                provider: {
+                    **transport.stats(),
+                    "max_connections": self._limits_for(provider).max_connections,
+                }
+                for provider, transport in self.transports.items()
+            },
+        }
+
+
+http_clients = HTTPClients()
+
+
+async def init_http_clients():
+    """Create the shared clients for the known providers"""
+    for provider in PROVIDER_LIMITS:
+        http_clients.get(provider)
+    logger.info(f"HTTP client pool initialized (http2={HTTP2_AVAILABLE})")
+
+
+async def close_http_clients():
+    """Close all pooled connections"""
+    await http_clients.close()
+    logger.info("HTTP client pool closed")
+
+
+def get_http_client(provider: str = "default") -> httpx.AsyncClient:
+    """Get the shared client for a provider"""
+    return http_clients.get(provider)
+
+
+def get_http_pool_stats() -> Dict[str, Any]:
+    """Pool statistics for every provider client created so far"""
+    return http_clients.stats()
@@ -7,6 +7,8 @@ import asyncio
 from collections import defaultdict, deque
 from datetime import datetime, timedelta
 
+from app.core.cache_backend import RedisCacheBackend, get_redis_client, redis_cache_enabled
+
 logger = logging.getLogger(__name__)
 
 class LoggingMiddleware:
@@ -36,6 +38,9 @@ class RateLimitMiddleware:
         self.app = app
         self.requests_per_minute = requests_per_minute
         self.requests = defaultdict(deque)
+        # With Redis configured the limit is shared by all workers/nodes
+        redis_client = get_redis_client() if redis_cache_enabled() else None
+        self.shared_counter = RedisCacheBackend("ratelimit", redis_client, ttl=60) if redis_client else None
     
     async def __call__(self, scope, receive, send):
         if scope["type"] != "http":
@@ -45,6 +50,33 @@ class RateLimitMiddleware:
         request = Request(scope, receive)
         client_ip = request.client.host
         
+        limited = None
+        if self.shared_counter is not None:
+            limited = await self._is_limited_shared(client_ip)
+        if limited is None:
+            limited = self._is_limited_local(client_ip)
+        
+        if limited:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"}
+            )
+            await response(scope, receive, send)
+            return
+        
+        # Process request
+        await self.app(scope, receive, send)
+    
+    async def _is_limited_shared(self, client_ip: str):
+        """Fixed one-minute window counted in Redis; None if Redis is down"""
+        window = int(time.time() // 60)
+        count = await self.shared_counter.incr(f"{client_ip}:{window}", ttl=60)
+        if count is None:
+            logger.warning("Shared rate limit unavailable, using local counter")
+            return None
+        return count > self.requests_per_minute
+    
+    def _is_limited_local(self, client_ip: str) -> bool:
         # Clean old requests
         now = datetime.utcnow()
         minute_ago = now - timedelta(minutes=1)
@@ -54,15 +86,8 @@ class RateLimitMiddleware:
         
         # Check rate limit
         if len(self.requests[client_ip]) >= self.requests_per_minute:
-            response = JSONResponse(
-                status_code=429,
-                content={"detail": "Rate limit exceeded"}
-            )
-            await response(scope, receive, send)
-            return
+            return True
         
         # Add current request
         self.requests[client_ip].append(now)
-        
-        # Process request
-        await self.app(scope, receive, send)
+        return False
@@ -40,6 +40,7 @@ class TripStatus(str, Enum):
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
     CANCELLED = "cancelled"
+    FAILED = "failed"
 
 class ActivityType(str, Enum):
     ATTRACTION = "attraction"
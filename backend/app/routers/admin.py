@@ -1,10 +1,20 @@
+import asyncio
+
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
 
 from app.models import AdminStatsResponse
 from app.database import get_database
+from app.db_indexes import unused_indexes
+from app.http_client import get_http_pool_stats
+from app.core.llm_executor import get_llm_stats
+from app.core.cache import get_cache_stats
+from app.core.job_queue import get_job_stats
+from app.core.llm_scheduler import get_generation_stats
+from app.core.model_router import get_model_router_stats
 from app.utils.auth import get_current_user
+from app.utils.dataloader import Loaders, get_loaders
 
 router = APIRouter()
 
@@ -55,12 +65,54 @@ async def get_admin_stats(current_user: dict = Depends(get_current_user)):
             detail=f"Failed to get admin stats: {str(e)}"
         )
 
+@router.get("/http-pool", response_model=Dict[str, Any])
+async def get_http_pool(current_user: dict = Depends(get_current_user)):
+    """Get outbound HTTP connection pool statistics per provider"""
+    return get_http_pool_stats()
+
+@router.get("/llm", response_model=Dict[str, Any])
+async def get_llm_queue(current_user: dict = Depends(get_current_user)):
+    """Get LLM worker pool usage and queue depth"""
+    return get_llm_stats()
+
+@router.get("/cache-stats", response_model=Dict[str, Any])
+async def get_caches(current_user: dict = Depends(get_current_user)):
+    """Get hit/miss statistics for the in-process caches"""
+    return get_cache_stats()
+
+@router.get("/generation", response_model=Dict[str, Any])
+async def get_generation_queue(current_user: dict = Depends(get_current_user)):
+    """Get hosted-LLM scheduler lanes, queue times, retries and rate limits"""
+    return get_generation_stats()
+
+@router.get("/model-tiers", response_model=Dict[str, Any])
+async def get_model_tiers(current_user: dict = Depends(get_current_user)):
+    """Get per-tier latency, acceptance and escalation rates of the model cascades"""
+    return get_model_router_stats()
+
+@router.get("/jobs", response_model=Dict[str, Any])
+async def get_jobs(current_user: dict = Depends(get_current_user)):
+    """Get background job queue depth and outcomes"""
+    return get_job_stats()
+
+@router.get("/indexes/unused", response_model=Dict[str, Any])
+async def get_unused_indexes(current_user: dict = Depends(get_current_user)):
+    """Get indexes with no recorded use and indexes missing from the registry"""
+    try:
+        return await unused_indexes(get_database())
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get index usage: {str(e)}"
+        )
+
 @router.get("/trips", response_model=List[Dict[str, Any]])
 async def get_all_trips(
     skip: int = 0,
     limit: int = 100,
     status: str = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get all trips for admin"""
     try:
@@ -79,16 +131,14 @@ async def get_all_trips(
              "created_at": 1, "user_id": 1}
         ).skip(skip).limit(limit).sort("created_at", -1).to_list(length=None)
         
+        # Get user info (one query for the whole page)
+        users = await loaders.users.load_many([str(trip["user_id"]) for trip in trips])
+        
         # Convert ObjectId to string and add user info
-        for trip in trips:
+        for trip, user in zip(trips, users):
             trip["id"] = str(trip["_id"])
             del trip["_id"]
             
-            # Get user info
-            user = await db.users.find_one(
-                {"_id": trip["user_id"]},
-                {"username": 1, "email": 1, "full_name": 1}
-            )
             if user:
                 trip["user"] = {
                     "username": user["username"],
@@ -108,7 +158,8 @@ async def get_all_trips(
 async def get_all_users(
     skip: int = 0,
     limit: int = 100,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get all users for admin"""
     try:
@@ -121,13 +172,13 @@ async def get_all_users(
              "is_active": 1, "created_at": 1}
         ).skip(skip).limit(limit).sort("created_at", -1).to_list(length=None)
         
+        # Get trip counts (one aggregation for the whole page)
+        trip_counts = await loaders.trip_counts.load_many([str(user["_id"]) for user in users])
+        
         # Convert ObjectId to string and add trip count
-        for user in users:
+        for user, trip_count in zip(users, trip_counts):
             user["id"] = str(user["_id"])
             del user["_id"]
-            
-            # Get trip count
-            trip_count = await db.trips.count_documents({"user_id": user["id"]})
             user["trip_count"] = trip_count
         
         return users
@@ -142,7 +193,8 @@ async def get_all_users(
 async def get_all_feedback(
     skip: int = 0,
     limit: int = 100,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get all feedback for admin"""
     try:
@@ -155,16 +207,17 @@ async def get_all_feedback(
              "would_recommend": 1, "created_at": 1}
         ).skip(skip).limit(limit).sort("created_at", -1).to_list(length=None)
         
+        # Get trip and user info (one query each for the whole page)
+        trips, users = await asyncio.gather(
+            loaders.trips.load_many([str(feedback["trip_id"]) for feedback in feedback_list]),
+            loaders.users.load_many([str(feedback["user_id"]) for feedback in feedback_list]),
+        )
+        
         # Convert ObjectId to string and add trip/user info
-        for feedback in feedback_list:
+        for feedback, trip, user in zip(feedback_list, trips, users):
             feedback["id"] = str(feedback["_id"])
             del feedback["_id"]
             
-            # Get trip info
-            trip = await db.trips.find_one(
-                {"_id": feedback["trip_id"]},
-                {"destination": 1, "start_date": 1, "end_date": 1}
-            )
             if trip:
                 feedback["trip"] = {
                     "destination": trip["destination"],
@@ -172,11 +225,6 @@ async def get_all_feedback(
                     "end_date": trip["end_date"]
                 }
             
-            # Get user info
-            user = await db.users.find_one(
-                {"_id": feedback["user_id"]},
-                {"username": 1, "email": 1, "full_name": 1}
-            )
             if user:
                 feedback["user"] = {
                     "username": user["username"],
@@ -1,8 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from langchain_community.llms import Ollama
 from langchain_core.prompts import PromptTemplate
 import json
 
+from app.core.llm_executor import llm_executor, LLMOverloadedError
+
 router = APIRouter(prefix="/api/ai", tags=["AI Recommendation"])
 llm = Ollama(model="mistral", temperature=0.7)
 
@@ -21,7 +23,14 @@ async def recommend(payload: dict):
     ]
     """)
 
-    out = llm.invoke(prompt.format(theme=theme, lat=lat, lon=lon))
+    try:
+        out = await llm_executor.run(llm.invoke, prompt.format(theme=theme, lat=lat, lon=lon))
+    except LLMOverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="AI đang quá tải, vui lòng thử lại sau",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     try:
         return json.loads(out)
     except:
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import Dict, Any, List
-from datetime import datetime
 
 from app.models import ItineraryResponse
 from app.database import get_database
 from app.utils.auth import get_current_user_optional
+from app.services.trip_store import EMBEDDED, load_itinerary
 
 router = APIRouter()
 
@@ -33,52 +33,7 @@ async def get_itinerary(
                 detail="Access denied"
             )
         
-        # Get activities
-        activities = await db.activities.find(
-            {"trip_id": trip_id}
-        ).sort("day", 1).to_list(length=None)
-        
-        # Group activities by day
-        days = {}
-        for activity in activities:
-            day = activity["day"]
-            if day not in days:
-                days[day] = []
-            
-            activity_data = {
-                "id": str(activity["_id"]),
-                "name": activity["name"],
-                "type": activity["type"],
-                "time": activity["time"],
-                "duration": activity["duration"],
-                "cost": activity["cost"],
-                "description": activity.get("description"),
-                "location": activity.get("location"),
-                "rating": activity.get("rating"),
-                "coordinates": activity.get("coordinates")
-            }
-            days[day].append(activity_data)
-        
-        # Calculate summary
-        total_attractions = len([a for day in days.values() for a in day if a["type"] == "attraction"])
-        total_restaurants = len([a for day in days.values() for a in day if a["type"] == "restaurant"])
-        total_hotels = len([a for day in days.values() for a in day if a["type"] == "hotel"])
-        
-        ratings = [a["rating"] for day in days.values() for a in day if a["rating"]]
-        average_rating = sum(ratings) / len(ratings) if ratings else 0.0
-        
-        # Format days for response
-        formatted_days = []
-        for day_num in sorted(days.keys()):
-            day_activities = days[day_num]
-            day_cost = sum(activity["cost"] for activity in day_activities)
-            
-            formatted_days.append({
-                "day": day_num,
-                "date": (trip["start_date"] + datetime.timedelta(days=day_num-1)).strftime("%Y-%m-%d"),
-                "estimatedCost": day_cost,
-                "activities": day_activities
-            })
+        days, summary = await load_itinerary(db, trip)
         
         return ItineraryResponse(
             trip_id=trip_id,
@@ -87,13 +42,8 @@ async def get_itinerary(
             total_cost=trip["total_cost"],
             start_date=trip["start_date"],
             end_date=trip["end_date"],
-            days=formatted_days,
-            summary={
-                "totalAttractions": total_attractions,
-                "totalRestaurants": total_restaurants,
-                "totalHotels": total_hotels,
-                "averageRating": average_rating
-            }
+            days=days,
+            summary=summary
         )
         
     except HTTPException:
@@ -130,8 +80,16 @@ async def get_trip_activities(
                 detail="Access denied"
             )
         
+        if trip.get("storage") == EMBEDDED:
+            return [
+                {"trip_id": str(trip["_id"]), "day": d["day"], **activity, "created_at": trip.get("updated_at")}
+                for d in trip.get("days", [])
+                if day is None or d["day"] == day
+                for activity in d["activities"]
+            ]
+        
         # Build query
-        query = {"trip_id": trip_id}
+        query = {"trip_id": trip["_id"]}
         if day is not None:
             query["day"] = day
         
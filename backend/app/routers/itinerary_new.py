@@ -1,15 +1,46 @@
 """
 Itinerary generation router using Ollama AI
 """
+import asyncio
+import json
+import os
+
 from fastapi import APIRouter, HTTPException
-from app.core.agent import generate_itinerary
+from fastapi.responses import StreamingResponse
+from app.core.agent import generate_itinerary, is_fallback, stream_itinerary
+from app.core.llm_executor import LLMOverloadedError
 from app.core.geo_utils import get_nearby_places
-from app.core.schema import GenerateItineraryReq, Itinerary
-from typing import Dict, Any
+from app.core.itinerary_cache import itinerary_cache_from_env, places_fingerprint
+from app.core.route_optimizer import optimize_itinerary, transport_mode
+from app.core.schema import GenerateItineraryReq
+from app.services.geoapify_service import GeoapifyService
+from typing import Dict, Any, AsyncIterator, List, Tuple
 
 router = APIRouter(prefix="/api/itinerary", tags=["Itinerary (AI)"])
 
 DEFAULT_LOCATION = {"lat": 13.782, "lon": 109.219}  #(fallback)
+PLACES_PER_DAY = 5
+ROUTE_OPTIMIZE_TIMEOUT = float(os.getenv("ROUTE_OPTIMIZE_TIMEOUT", "5"))
+
+itinerary_cache = itinerary_cache_from_env("itinerary_result")
+
+
+async def optimize_routes(
+    plan: Dict[str, Any], nearby_places: List[Dict[str, Any]], prefs: Dict[str, Any]
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Reorder each day to cut travel time; on any failure keep the plan as generated"""
+    geoapify = GeoapifyService()
+    mode = transport_mode(prefs.get("transport"))
+
+    async def matrix(origins, destinations):
+        # Never plan on mock costs: without the provider use the haversine estimate
+        return await geoapify.get_distance_matrix(origins, destinations, mode, fallback_estimate=True)
+
+    try:
+        return await asyncio.wait_for(optimize_itinerary(plan, nearby_places, matrix), ROUTE_OPTIMIZE_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️ Route optimization skipped: {e!r}")
+        return plan, {"skipped": True}
 
 
 @router.post("/generate", response_model=Dict[str, Any])
@@ -21,30 +52,118 @@ async def create_itinerary(payload: GenerateItineraryReq):
         prefs = payload.preferences.dict()
         loc = payload.location.dict() if payload.location else DEFAULT_LOCATION
 
-        # Get nearby places
-        nearby_places = get_nearby_places(
+        # Get nearby places (async, bounded by NEARBY_TIMEOUT_BUDGET);
+        # long trips need enough candidates to fill one cluster per day
+        nearby_places = await get_nearby_places(
             lat=loc["lat"],
             lon=loc["lon"],
             prefs=prefs,
             radius=8000,
-            limit=20
+            limit=min(max(20, prefs["days"] * PLACES_PER_DAY), 100)
         )
 
-        # Generate itinerary
-        plan = generate_itinerary(prefs, nearby_places)
+        # Same preferences in the same area with unchanged places -> reuse a plan
+        cache_key = itinerary_cache.key(prefs, loc["lat"], loc["lon"])
+        fingerprint = places_fingerprint(nearby_places)
+        plan = await itinerary_cache.get(cache_key, fingerprint)
+        if plan is not None:
+            route_stats = {"cached": True}
+        else:
+            # Generate itinerary (LLM runs off the event loop)
+            plan = await generate_itinerary(prefs, nearby_places)
+
+            # Reorder each day's stops by travel time (meals keep their slot)
+            plan, route_stats = await optimize_routes(plan, nearby_places, prefs)
+            # Template fallbacks (model down or unusable output) are not reused
+            if not is_fallback(plan):
+                await itinerary_cache.put(cache_key, plan, fingerprint)
 
         return {
             "success": True,
             "data": plan,
             "meta": {
                 "nearby_count": len(nearby_places),
-                "location": loc
+                "location": loc,
+                "route_optimization": route_stats,
+                "cached": route_stats.get("cached", False),
+                "fallback": is_fallback(plan),
             }
         }
+    except LLMOverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI đang quá tải, vui lòng thử lại sau ({e.queue_depth} yêu cầu đang chờ)",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating itinerary: {str(e)}")
 
 
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/generate/stream")
+async def stream_itinerary_events(payload: GenerateItineraryReq):
+    """
+    Same as ``/generate`` but as Server-Sent Events, so the client can show
+    each day as soon as the model has written it:
+
+    ``status`` -> ``meta`` -> ``day`` (one per day, route-optimized) -> ``done``;
+    ``error`` replaces the remaining events on failure (503 when the AI is busy).
+    """
+    prefs = payload.preferences.dict()
+    loc = payload.location.dict() if payload.location else DEFAULT_LOCATION
+
+    async def events() -> AsyncIterator[str]:
+        # First byte right away; the places lookup can take a few seconds
+        yield _sse("status", {"stage": "nearby"})
+        try:
+            nearby_places = await get_nearby_places(
+                lat=loc["lat"],
+                lon=loc["lon"],
+                prefs=prefs,
+                radius=8000,
+                limit=min(max(20, prefs["days"] * PLACES_PER_DAY), 100)
+            )
+            cache_key = itinerary_cache.key(prefs, loc["lat"], loc["lon"])
+            fingerprint = places_fingerprint(nearby_places)
+            plan = await itinerary_cache.get(cache_key, fingerprint)
+            yield _sse("meta", {"nearby_count": len(nearby_places), "location": loc, "cached": plan is not None})
+            if plan is not None:
+                for day in plan.get("schedule", []):
+                    yield _sse("day", day)
+                yield _sse("done", plan)
+                return
+
+            days = {}
+            async for kind, data in stream_itinerary(prefs, nearby_places):
+                if kind == "day":
+                    optimized, _ = await optimize_routes({"schedule": [data]}, nearby_places, prefs)
+                    days[data["day"]] = optimized["schedule"][0]
+                    yield _sse("day", days[data["day"]])
+                else:
+                    # Days the client already got keep their optimized order
+                    data["schedule"] = [days.get(d["day"], d) for d in data.get("schedule", [])]
+                    if not is_fallback(data):
+                        await itinerary_cache.put(cache_key, data, fingerprint)
+                    yield _sse("done", data)
+        except LLMOverloadedError as e:
+            yield _sse("error", {
+                "status": 503,
+                "detail": f"AI đang quá tải, vui lòng thử lại sau ({e.queue_depth} yêu cầu đang chờ)",
+                "retry_after": e.retry_after,
+            })
+        except Exception as e:
+            yield _sse("error", {"status": 500, "detail": f"Error generating itinerary: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{itinerary_id}")
 async def get_itinerary(itinerary_id: str):
     """
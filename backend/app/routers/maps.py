@@ -112,7 +112,9 @@ async def get_distance_matrix_geoapify(
                 detail="Origins and destinations required"
             )
 
-        matrix = await geoapify_service.get_distance_matrix(origins, destinations, mode)
+        matrix = await geoapify_service.get_distance_matrix(
+            origins, destinations, mode, estimate=request.get("estimate")
+        )
 
         if not matrix:
             raise HTTPException(
@@ -1,23 +1,173 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from datetime import datetime, date
-from typing import List, Dict, Any
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Any, Optional
+import asyncio
+import logging
+import os
 import uuid
 
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.core.job_queue import Job, JobQueueFullError, job_queue
+from app.core.llm_executor import LLMOverloadedError
+from app.core.llm_scheduler import BATCH, INTERACTIVE
 from app.models import TripCreate, Trip, TripResponse, ItineraryResponse
 from app.database import get_database
 from app.utils.auth import get_current_user
 from app.services.ai_service import AITravelPlannerService
 from app.services.maps_service import MapsService
+from app.services.trip_store import load_itinerary, save_itinerary
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+TRIP_PLAN_JOB = "trip_plan"
+# Jobs live in process memory: a trip whose generation stopped updating for
+# TRIP_JOB_STALE_AFTER seconds (process killed, deploy) is requeued by the
+# sweeper, or failed once older than TRIP_JOB_MAX_AGE
+TRIP_JOB_STALE_AFTER = float(os.getenv("TRIP_JOB_STALE_AFTER", "120"))
+TRIP_JOB_MAX_AGE = float(os.getenv("TRIP_JOB_MAX_AGE", str(86400)))
+# Times a job waits out a full LLM scheduler queue before the trip is failed
+TRIP_JOB_OVERLOAD_RETRIES = int(os.getenv("TRIP_JOB_OVERLOAD_RETRIES", "10"))
+TRIP_FIELDS = ("destination", "start_date", "end_date", "people", "budget", "travel_style", "interests", "total_days")
+
+
+async def _set_trip_status(db, trip_oid, trip_status: str) -> None:
+    await db.trips.update_one({"_id": trip_oid}, {"$set": {"status": trip_status, "updated_at": datetime.utcnow()}})
+
+
+async def _heartbeat(db, trip_oid) -> None:
+    """Keep ``updated_at`` fresh while the trip is generated so the sweeper leaves it alone"""
+    while True:
+        await asyncio.sleep(TRIP_JOB_STALE_AFTER / 4)
+        await db.trips.update_one({"_id": trip_oid}, {"$set": {"updated_at": datetime.utcnow()}})
+
+
+async def generate_trip_plan(job: Job, report) -> Dict[str, Any]:
+    """Background job: generate the itinerary, store its activities, confirm the trip"""
+    db = get_database()
+    trip_oid = job.payload["trip_oid"]
+    # Claim the trip: a sweeper in another process may have requeued it under a new token
+    claimed = await db.trips.update_one(
+        {"_id": trip_oid, "status": "pending", "job_token": job.payload["token"]},
+        {"$set": {"status": "in_progress", "updated_at": datetime.utcnow()}},
+    )
+    if not claimed.modified_count:
+        return {"trip_id": job.id, "skipped": True}
+
+    heartbeat = asyncio.ensure_future(_heartbeat(db, trip_oid))
+    try:
+        ai_service = AITravelPlannerService()
+        for attempt in range(TRIP_JOB_OVERLOAD_RETRIES + 1):
+            await report("generating", 0.1)
+            try:
+                itinerary = await ai_service.generate_itinerary(
+                    job.payload["trip_data"], job.id, job.payload["language"], job.payload.get("priority", INTERACTIVE)
+                )
+                break
+            except LLMOverloadedError as e:
+                # The scheduler queue is full of interactive requests: wait for room instead of failing the trip
+                if attempt == TRIP_JOB_OVERLOAD_RETRIES:
+                    raise
+                await report("waiting", 0.1)
+                await asyncio.sleep(e.retry_after)
+        await report("saving", 0.8)
+
+        saved = await save_itinerary(db, trip_oid, itinerary, job.payload["trip_data"].get("start_date"))
+        return {"trip_id": job.id, **saved}
+    except asyncio.CancelledError:
+        # Shutdown: hand the trip back to the sweeper of the next process
+        await _set_trip_status(db, trip_oid, "pending")
+        raise
+    except BaseException:
+        await _set_trip_status(db, trip_oid, "failed")
+        raise
+    finally:
+        heartbeat.cancel()
+
+
+async def submit_trip_plan(trip: Dict[str, Any], owner: Optional[str]) -> Job:
+    """Queue generation of a stored trip; a new ``job_token`` makes older jobs for it no-ops"""
+    token = uuid.uuid4().hex
+    await get_database().trips.update_one({"_id": trip["_id"]}, {"$set": {"job_token": token}})
+    return await job_queue.submit(
+        TRIP_PLAN_JOB,
+        {
+            "trip_oid": trip["_id"],
+            "trip_data": {field: trip.get(field) for field in TRIP_FIELDS},
+            "language": trip.get("language", "vi"),
+            "token": token,
+            # Background generation yields the LLM scheduler to interactive requests
+            "priority": BATCH,
+        },
+        job_id=str(trip["_id"]),
+        owner=owner,
+    )
+
+
+async def requeue_stale_trips() -> Dict[str, int]:
+    """
+    Requeue pending/in-progress trips nobody is working on (their
+    ``updated_at`` is older than TRIP_JOB_STALE_AFTER); fail those older
+    than TRIP_JOB_MAX_AGE.
+    """
+    db = get_database()
+    now = datetime.utcnow()
+    counts = {"requeued": 0, "failed": 0}
+    stale = {"status": {"$in": ["pending", "in_progress"]}, "updated_at": {"$lt": now - timedelta(seconds=TRIP_JOB_STALE_AFTER)}}
+    async for trip in db.trips.find(stale):
+        job = job_queue.get(str(trip["_id"]))
+        if job is not None and job.status in ("pending", "running"):
+            continue
+        # Claim it (touching updated_at) so concurrent sweepers skip it
+        claimed = await db.trips.update_one(
+            {"_id": trip["_id"], "updated_at": trip["updated_at"]},
+            {"$set": {"status": "pending", "updated_at": now}},
+        )
+        if not claimed.modified_count:
+            continue
+        if trip["created_at"] < now - timedelta(seconds=TRIP_JOB_MAX_AGE):
+            await _set_trip_status(db, trip["_id"], "failed")
+            counts["failed"] += 1
+            continue
+        try:
+            await submit_trip_plan(trip, trip.get("user_id"))
+        except JobQueueFullError:
+            break  # left pending, retried on the next sweep
+        counts["requeued"] += 1
+    if counts["requeued"] or counts["failed"]:
+        logger.info(f"Trip job sweep: {counts['requeued']} requeued, {counts['failed']} failed")
+    return counts
+
+
+async def run_trip_job_sweeper(interval: float = 60.0):
+    """Background task (started in the lifespan) that recovers trips whose job was lost"""
+    while True:
+        try:
+            await requeue_stale_trips()
+        except Exception as e:
+            logger.warning(f"Trip job sweep failed: {e}")
+        await asyncio.sleep(interval)
+
+
+job_queue.register(TRIP_PLAN_JOB, generate_trip_plan)
+
+
 @router.post("/travel-planner", response_model=TripResponse)
 async def create_travel_plan(
     trip_data: TripCreate,
     language: str = "vi",  # Mặc định tiếng Việt
     current_user: dict = Depends(get_current_user)
 ):
-    """Create a new travel plan using AI"""
+    """
+    Create a new travel plan using AI.
+
+    Returns right away with status ``pending``; the itinerary is generated by a
+    background job whose progress is pushed over the websocket (``job_update``)
+    and can be polled at ``/travel-planner/{trip_id}/status``.
+    """
     try:
         db = get_database()
         
@@ -44,6 +194,7 @@ async def create_travel_plan(
             "interests": trip_data.interests,
             "total_cost": 0.0,
             "status": "pending",
+            "language": language,
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
@@ -52,45 +203,21 @@ async def create_travel_plan(
         result = await db.trips.insert_one(trip_doc)
         trip_id = str(result.inserted_id)
         
-        # Generate itinerary using AI service
-        ai_service = AITravelPlannerService()
-        itinerary = await ai_service.generate_itinerary(trip_data, trip_id, language)
-        
-        # Save activities to database
-        activities = []
-        for day_data in itinerary.get("days", []):
-            day_number = day_data["day"]
-            for activity_data in day_data["activities"]:
-                activity_doc = {
-                    "trip_id": result.inserted_id,
-                    "day": day_number,
-                    "name": activity_data["name"],
-                    "type": activity_data["type"],
-                    "time": activity_data["time"],
-                    "duration": activity_data["duration"],
-                    "cost": activity_data.get("cost", 0.0),
-                    "description": activity_data.get("description"),
-                    "location": activity_data.get("location"),
-                    "rating": activity_data.get("rating"),
-                    "coordinates": activity_data.get("coordinates"),
-                    "created_at": datetime.utcnow()
-                }
-                activities.append(activity_doc)
-        
-        if activities:
-            await db.activities.insert_many(activities)
-        
-        # Update trip with total cost
-        total_cost = sum(activity["cost"] for activity in activities)
-        await db.trips.update_one(
-            {"_id": result.inserted_id},
-            {"$set": {"total_cost": total_cost, "status": "confirmed"}}
-        )
+        # Generate itinerary in the background
+        try:
+            await submit_trip_plan({**trip_doc, "_id": result.inserted_id}, current_user["user_id"])
+        except JobQueueFullError as e:
+            await db.trips.delete_one({"_id": result.inserted_id})
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Too many travel plans being generated, please retry ({e.queue_depth} waiting)",
+                headers={"Retry-After": str(e.retry_after)},
+            )
         
         return TripResponse(
             trip_id=trip_id,
-            status="success",
-            message="Travel plan created successfully"
+            status="pending",
+            message="Travel plan is being generated"
         )
         
     except HTTPException:
@@ -101,6 +228,28 @@ async def create_travel_plan(
             detail=f"Failed to create travel plan: {str(e)}"
         )
 
+@router.get("/travel-planner/{trip_id}/status", response_model=Dict[str, Any])
+async def get_travel_plan_status(
+    trip_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Progress of the background generation of a trip"""
+    job = job_queue.get(trip_id)
+    if job is not None and job.owner == current_user["user_id"]:
+        return job.to_dict()
+
+    # Job no longer in memory (e.g. after a restart): report the stored trip status
+    db = get_database()
+    try:
+        trip = await db.trips.find_one(
+            {"_id": ObjectId(trip_id), "user_id": current_user["user_id"]}, {"status": 1}
+        )
+    except InvalidId:
+        trip = None
+    if not trip:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
+    return {"job_id": trip_id, "status": trip["status"]}
+
 @router.get("/trips", response_model=List[Dict[str, Any]])
 async def get_user_trips(current_user: dict = Depends(get_current_user)):
     """Get all trips for current user"""
@@ -147,31 +296,7 @@ async def get_trip_details(
                 detail="Trip not found"
             )
         
-        # Get activities
-        activities = await db.activities.find(
-            {"trip_id": trip_id}
-        ).sort("day", 1).to_list(length=None)
-        
-        # Group activities by day
-        days = {}
-        for activity in activities:
-            day = activity["day"]
-            if day not in days:
-                days[day] = []
-            
-            activity_data = {
-                "id": str(activity["_id"]),
-                "name": activity["name"],
-                "type": activity["type"],
-                "time": activity["time"],
-                "duration": activity["duration"],
-                "cost": activity["cost"],
-                "description": activity.get("description"),
-                "location": activity.get("location"),
-                "rating": activity.get("rating"),
-                "coordinates": activity.get("coordinates")
-            }
-            days[day].append(activity_data)
+        days, summary = await load_itinerary(db, trip)
         
         # Format response
         trip_data = {
@@ -187,7 +312,8 @@ async def get_trip_details(
             "interests": trip["interests"],
             "status": trip["status"],
             "created_at": trip["created_at"],
-            "days": days
+            "days": {day["day"]: day["activities"] for day in days},
+            "summary": summary
         }
         
         return trip_data
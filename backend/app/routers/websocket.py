@@ -5,6 +5,7 @@ import asyncio
 from datetime import datetime
 import uuid
 
+from app.core.job_queue import Job, job_queue
 from app.models import WebSocketMessage, LocationUpdate
 from app.database import get_database
 from app.utils.auth import get_current_user_optional
@@ -98,6 +99,24 @@ class ConnectionManager:
 # Global connection manager
 manager = ConnectionManager()
 
+
+@job_queue.subscribe
+async def forward_job_update(job: Job):
+    """
+    Push background job progress (e.g. travel plan generation) to its owner.
+
+    Only reaches sockets connected to this worker process (jobs and
+    connections are both in-process); clients on another worker should poll
+    GET /travel-planner/{trip_id}/status, which falls back to the trip
+    status stored in Mongo.
+    """
+    if job.owner:
+        await manager.send_personal_message({
+            "type": "job_update",
+            **job.to_dict(),
+            "timestamp": datetime.utcnow().isoformat()
+        }, job.owner)
+
 @router.websocket("/connect/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
     """WebSocket endpoint for real-time communication"""
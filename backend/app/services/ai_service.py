@@ -1,58 +1,150 @@
 import openai
+from openai import AsyncOpenAI
 import os
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
-import json
 import random
 
+from app.core.itinerary_cache import itinerary_cache_from_env
+from app.core.json_repair import extract_json
+from app.core.llm_executor import LLMOverloadedError
+from app.core.llm_scheduler import INTERACTIVE, generation_scheduler
+from app.core.model_router import ModelRouter, tiers_from_env
+from app.core.route_optimizer import optimize_day
+
+# OpenAI plans keyed on destination + preferences (dates are re-applied on a hit)
+TRIP_CACHE_FIELDS = ("destination", "total_days", "people", "budget", "travel_style", "interests", "language")
+trip_plan_cache = itinerary_cache_from_env("travel_planner_result")
+
+# Provider errors worth another attempt (rate limit, 5xx, network)
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+# Cheapest model first; a plan that fails validation is regenerated by the next one
+OPENAI_MODEL_TIERS = tiers_from_env(os.getenv("OPENAI_MODEL_TIERS", "gpt-3.5-turbo,gpt-4"))
+REQUIRED_ACTIVITY_FIELDS = ("name", "type", "time", "duration")
+planner_router = ModelRouter("openai_planner", OPENAI_MODEL_TIERS)
+
+_openai_client: Optional[AsyncOpenAI] = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    Shared client; ``OPENAI_BASE_URL`` points it at any OpenAI-compatible
+    server. Retries are left to the generation scheduler.
+    """
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            timeout=float(os.getenv("OPENAI_TIMEOUT", "60")),
+            max_retries=0,
+        )
+    return _openai_client
+
+
+async def close_openai_client():
+    global _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+
+
 class AITravelPlannerService:
     def __init__(self):
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.default_language = os.getenv("DEFAULT_LANGUAGE", "vi")  # Mặc định tiếng Việt
-        if self.openai_api_key:
-            openai.api_key = self.openai_api_key
     
-    async def generate_itinerary(self, trip_data: Dict[str, Any], trip_id: str, language: str = None) -> Dict[str, Any]:
-        """Generate travel itinerary using AI"""
+    async def generate_itinerary(
+        self, trip_data: Dict[str, Any], trip_id: str, language: str = None, priority: int = INTERACTIVE
+    ) -> Dict[str, Any]:
+        """
+        Generate travel itinerary using AI
+
+        ``priority`` is the scheduler lane (INTERACTIVE or BATCH). When the
+        scheduler queue is full ``LLMOverloadedError`` is raised instead of
+        silently returning a mock itinerary.
+        """
+        # Sử dụng ngôn ngữ được chỉ định hoặc mặc định
+        target_language = language or self.default_language
+        trip_data = self._trip_fields(trip_data)
         try:
-            # Sử dụng ngôn ngữ được chỉ định hoặc mặc định
-            target_language = language or self.default_language
-            
             if self.openai_api_key:
-                return await self._generate_with_openai(trip_data, trip_id, target_language)
+                cache_key = trip_plan_cache.key({**trip_data, "language": target_language}, fields=TRIP_CACHE_FIELDS)
+                cached = await trip_plan_cache.get(cache_key)
+                if cached is not None:
+                    return self._redate(cached, trip_data["start_date"])
+                return await self._generate_with_openai(trip_data, trip_id, target_language, cache_key, priority)
             else:
                 return await self._generate_mock_itinerary(trip_data, trip_id, target_language)
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             # Fallback to mock data if AI fails
             return await self._generate_mock_itinerary(trip_data, trip_id, target_language)
     
-    async def _generate_with_openai(self, trip_data: Dict[str, Any], trip_id: str, language: str) -> Dict[str, Any]:
-        """Generate itinerary using OpenAI API"""
+    async def _generate_with_openai(
+        self,
+        trip_data: Dict[str, Any],
+        trip_id: str,
+        language: str,
+        cache_key: Optional[str] = None,
+        priority: int = INTERACTIVE,
+    ) -> Dict[str, Any]:
+        """Generate itinerary using OpenAI API, escalating through OPENAI_MODEL_TIERS"""
         try:
             prompt = self._create_prompt(trip_data, language)
+            client = get_openai_client()
+
+            async def call(model: str) -> str:
+                response = await generation_scheduler.submit(
+                    model,
+                    lambda: client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": self._get_system_prompt(language)},
+                            {"role": "user", "content": prompt}
+                        ],
+                        max_tokens=2000,
+                        temperature=0.7
+                    ),
+                    priority=priority,
+                    retry_on=RETRYABLE_ERRORS,
+                )
+                return response.choices[0].message.content
+
+            itinerary, _ = await planner_router.run(call, lambda text: self._validate_plan(text, trip_data))
+            if cache_key:
+                await trip_plan_cache.put(cache_key, itinerary)
+            return itinerary
             
-            # Chọn model phù hợp với ngôn ngữ
-            model = "gpt-3.5-turbo"
-            if language == "vi":
-                model = "gpt-4"  # GPT-4 hỗ trợ tiếng Việt tốt hơn
-            
-            response = await openai.ChatCompletion.acreate(
-                model=model,
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt(language)},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=2000,
-                temperature=0.7
-            )
-            
-            itinerary_text = response.choices[0].message.content
-            return self._parse_ai_response(itinerary_text, trip_data, language)
-            
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             print(f"OpenAI API error: {e}")
             return await self._generate_mock_itinerary(trip_data, trip_id, language)
     
+    @staticmethod
+    def _trip_fields(trip_data: Any) -> Dict[str, Any]:
+        """Trip request (model or dict) as a dict with ``total_days``"""
+        data = dict(trip_data) if isinstance(trip_data, dict) else trip_data.dict()
+        if "total_days" not in data and data.get("start_date") and data.get("end_date"):
+            data["total_days"] = (data["end_date"] - data["start_date"]).days + 1
+        return data
+
+    @staticmethod
+    def _redate(itinerary: Dict[str, Any], start_date: Any) -> Dict[str, Any]:
+        """Point a cached plan's days at this trip's dates"""
+        for day in itinerary.get("days", []):
+            if start_date and isinstance(day.get("day"), int):
+                day["date"] = (start_date + timedelta(days=day["day"] - 1)).strftime("%Y-%m-%d")
+        return itinerary
+
     def _get_system_prompt(self, language: str) -> str:
         """Get system prompt based on language"""
         if language == "vi":
@@ -217,20 +309,24 @@ class AITravelPlannerService:
         }
         return translations.get(language, {}).get(interest, interest)
     
-    async def _parse_ai_response(self, response_text: str, trip_data: Dict[str, Any], language: str) -> Dict[str, Any]:
-        """Parse AI response and convert to structured data"""
-        try:
-            # Try to extract JSON from response
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            json_str = response_text[start_idx:end_idx]
-            
-            itinerary = json.loads(json_str)
-            return itinerary
-            
-        except Exception as e:
-            print(f"Failed to parse AI response: {e}")
-            return await self._generate_mock_itinerary(trip_data, "", language)
+    def _parse_ai_response(self, response_text: str) -> Dict[str, Any]:
+        """Parse AI response and convert to structured data (ValueError if it is not JSON)"""
+        return extract_json(response_text)
+
+    def _validate_plan(self, response_text: str, trip_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Parsed itinerary if it has every day and the activity fields we store, else ValueError"""
+        itinerary = self._parse_ai_response(response_text)
+        days = itinerary.get("days")
+        if not isinstance(days, list) or len(days) < trip_data.get("total_days", 1):
+            raise ValueError(f"expected {trip_data.get('total_days', 1)} days")
+        for day in days:
+            if not day.get("activities"):
+                raise ValueError(f"day {day.get('day')} has no activities")
+            for activity in day["activities"]:
+                missing = [f for f in REQUIRED_ACTIVITY_FIELDS if f not in activity]
+                if missing:
+                    raise ValueError(f"day {day.get('day')} activity missing {missing}")
+        return itinerary
     
     async def _generate_mock_itinerary(self, trip_data: Dict[str, Any], trip_id: str, language: str) -> Dict[str, Any]:
         """Generate mock itinerary data"""
@@ -249,6 +345,9 @@ class AITravelPlannerService:
         for day in range(1, total_days + 1):
             day_date = start_date + timedelta(days=day-1)
             day_activities = random.sample(mock_activities, min(4, len(mock_activities)))
+            # Keep the slots chronological, then visit the stops in route order
+            day_activities.sort(key=lambda a: a.get("time", ""))
+            day_activities, _, _ = await optimize_day(day_activities, {})
             
             # Add unique IDs to activities
             for i, activity in enumerate(day_activities):
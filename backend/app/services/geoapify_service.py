@@ -3,6 +3,53 @@ import httpx
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+from app.http_client import get_http_client
+from app.core.cache import register_cache
+from app.core.cache_backend import get_cache_backend
+from app.core.geo import coords_array, distance_matrix_m, distances_from
+from app.core.geo_cache import nearby_cache_from_env
+from app.core.geo_index import GridIndex
+from app.core.singleflight import SingleFlight
+
+# Shared across instances: services are created per request
+nearby_cache = nearby_cache_from_env("geoapify_nearby")
+route_cache = register_cache("geoapify_route", get_cache_backend(
+    "route",
+    ttl=float(os.getenv("ROUTE_CACHE_TTL", str(6 * 3600))),
+    maxsize=int(os.getenv("ROUTE_CACHE_SIZE", "1024")),
+))
+# Reverse geocode: exact answers per ~1m (5 decimals), then the nearest
+# address already resolved by this worker within REVERSE_NEAREST_M; the
+# index expires its points with the cache TTL
+REVERSE_CACHE_TTL = float(os.getenv("REVERSE_CACHE_TTL", str(7 * 86400)))
+geocode_cache = register_cache("geoapify_reverse", get_cache_backend(
+    "reverse",
+    ttl=REVERSE_CACHE_TTL,
+    maxsize=int(os.getenv("REVERSE_CACHE_SIZE", "10000")),
+))
+address_index = register_cache("geoapify_address_index", GridIndex(
+    cell_m=100.0, maxsize=int(os.getenv("REVERSE_INDEX_SIZE", "50000")), ttl=REVERSE_CACHE_TTL
+))
+REVERSE_NEAREST_M = float(os.getenv("REVERSE_NEAREST_M", "30"))
+# Route matrix: one cache entry per (mode, origin, destination) cell
+matrix_cache = register_cache("geoapify_matrix", get_cache_backend(
+    "matrix",
+    ttl=float(os.getenv("MATRIX_CACHE_TTL", "86400")),
+    maxsize=int(os.getenv("MATRIX_CACHE_SIZE", "100000")),
+))
+# Cached in place of a pair the provider cannot route, so the miss is not refetched
+MATRIX_UNREACHABLE = -1
+MATRIX_EXACT_MAX_CELLS = int(os.getenv("MATRIX_EXACT_MAX_CELLS", "2500"))
+SYMMETRIC_MODES = {"walk"}
+# Average door-to-door speeds (m/s) and road/straight-line ratio for estimates
+ESTIMATE_SPEED_MPS = {
+    "drive": 8.3, "truck": 7.0, "motorcycle": 8.3, "scooter": 6.9,
+    "bicycle": 4.2, "walk": 1.3, "transit": 5.5, "approximated_transit": 5.5,
+}
+DETOUR_FACTOR = 1.3
+# Identical concurrent provider calls (same normalized key) share one request
+geoapify_flight = register_cache("geoapify_singleflight", SingleFlight())
+
 
 class GeoapifyService:
     """
@@ -10,14 +57,20 @@ class GeoapifyService:
     Chuẩn hoá endpoint API mới nhất (v2) + kiểm soát lỗi & fallback mock.
     """
 
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         self.api_key = os.getenv("GEOAPIFY_KEY", "e21572c819734004b50cce6f8b52e171")
         self.base_url = "https://api.geoapify.com"
         self.tiles_url = "https://maps.geoapify.com/v1/tile/carto/{z}/{x}/{y}.png"
+        # Shared pooled client (created in main.py lifespan) unless one is injected
+        self._http_client = http_client
 
         if not self.api_key:
             print("⚠️ Warning: GEOAPIFY_KEY not found — service in mock mode.")
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._http_client or get_http_client("geoapify")
+
     # -------------------------------------------------------------
     # 📍 NEARBY PLACES
     # -------------------------------------------------------------
@@ -29,126 +82,254 @@ class GeoapifyService:
         radius: int = 5000,
         limit: int = 20
     ) -> List[Dict[str, Any]]:
-        """Lấy danh sách địa điểm gần vị trí hiện tại."""
+        """Lấy danh sách địa điểm gần vị trí hiện tại (cache theo ô geohash)."""
 
         if not self.api_key:
             return self._get_mock_places(lat, lng, limit)
 
-        category_str = ",".join(categories) if categories else "catering.restaurant,catering.cafe,tourism.sights"
+        categories = categories or ["catering.restaurant", "catering.cafe", "tourism.sights"]
+
+        async def fetch(center_lat: float, center_lng: float, fetch_radius: int, fetch_limit: int):
+            key = ("nearby", center_lat, center_lng, ",".join(sorted(set(categories))), fetch_radius, fetch_limit)
+            return await geoapify_flight.do(key, lambda: self._fetch_nearby_places(
+                center_lat, center_lng, categories, fetch_radius, fetch_limit
+            ))
+
+        try:
+            return await nearby_cache.get_or_fetch(lat, lng, categories, radius, limit, fetch)
+        except Exception as e:
+            print(f"❌ Geoapify nearby error: {e}")
+            return self._get_mock_places(lat, lng, limit)
 
+    async def _fetch_nearby_places(
+        self,
+        lat: float,
+        lng: float,
+        categories: List[str],
+        radius: int,
+        limit: int
+    ) -> List[Dict[str, Any]]:
         url = f"{self.base_url}/v2/places"
         params = {
-            "categories": category_str,
+            "categories": ",".join(categories),
             "filter": f"circle:{lng},{lat},{radius}",
             "bias": f"proximity:{lng},{lat}",
             "limit": limit,
             "apiKey": self.api_key,
         }
 
-        try:
-            async with httpx.AsyncClient(timeout=20.0) as client:
-                res = await client.get(url, params=params)
-                res.raise_for_status()
-                data = res.json()
-
-            features = data.get("features", [])
-            results = []
-            for f in features[:limit]:
-                p = f.get("properties", {})
-                coords = f.get("geometry", {}).get("coordinates", [])
-                results.append({
-                    "id": p.get("place_id", f"geo_{len(results)}"),
-                    "name": p.get("name", "Unnamed"),
-                    "address": p.get("address_line1", ""),
-                    "city": p.get("city", ""),
-                    "country": p.get("country", ""),
-                    "rating": p.get("rank", 0),
-                    "website": p.get("website", ""),
-                    "lat": coords[1] if len(coords) > 1 else lat,
-                    "lon": coords[0] if len(coords) > 0 else lng,
-                    "categories": p.get("categories", []),
-                    "source": "geoapify"
-                })
-            return results
+        res = await self.client.get(url, params=params, timeout=20.0)
+        res.raise_for_status()
+        data = res.json()
 
-        except Exception as e:
-            print(f"❌ Geoapify nearby error: {e}")
-            return self._get_mock_places(lat, lng, limit)
+        features = data.get("features", [])
+        results = []
+        for f in features[:limit]:
+            p = f.get("properties", {})
+            coords = f.get("geometry", {}).get("coordinates", [])
+            results.append({
+                "id": p.get("place_id", f"geo_{len(results)}"),
+                "name": p.get("name", "Unnamed"),
+                "address": p.get("address_line1", ""),
+                "city": p.get("city", ""),
+                "country": p.get("country", ""),
+                "rating": p.get("rank", 0),
+                "website": p.get("website", ""),
+                "lat": coords[1] if len(coords) > 1 else lat,
+                "lon": coords[0] if len(coords) > 0 else lng,
+                "categories": p.get("categories", []),
+                "source": "geoapify"
+            })
+        return results
 
     # -------------------------------------------------------------
     # 📍 REVERSE GEOCODE
     # -------------------------------------------------------------
     async def reverse_geocode(self, lat: float, lng: float) -> Dict[str, Any]:
-        """Lấy địa chỉ từ toạ độ"""
+        """
+        Lấy địa chỉ từ toạ độ
+
+        Thứ tự: cache theo toạ độ làm tròn 5 chữ số -> địa chỉ đã biết gần
+        nhất (trong REVERSE_NEAREST_M mét) -> gọi Geoapify.
+        """
         if not self.api_key:
             return self._get_mock_address()
 
-        url = f"{self.base_url}/v1/geocode/reverse"
-        params = {"lat": lat, "lon": lng, "apiKey": self.api_key}
-
+        key = f"{lat:.5f},{lng:.5f}"
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                res = await client.get(url, params=params)
-                res.raise_for_status()
-                data = res.json()
-            feat = data.get("features", [])
-            if not feat:
-                return self._get_mock_address()
-            prop = feat[0]["properties"]
-            return {
-                "formatted": prop.get("formatted", ""),
-                "address_line1": prop.get("address_line1", ""),
-                "city": prop.get("city", ""),
-                "state": prop.get("state", ""),
-                "country": prop.get("country", ""),
-                "lat": lat, "lon": lng
-            }
+            cached = await geocode_cache.get(key)
+            if cached is not None:
+                return {**cached, "lat": lat, "lon": lng}
+
+            nearest = address_index.nearest(lat, lng, REVERSE_NEAREST_M)
+            if nearest is not None:
+                distance, address = nearest
+                return {**address, "lat": lat, "lon": lng, "approximate": True, "distance_m": round(distance, 1)}
+
+            address = await geoapify_flight.do(("reverse", key), lambda: self._resolve_address(key, lat, lng))
         except Exception as e:
             print(f"❌ Reverse geocode error: {e}")
             return self._get_mock_address()
+        if address is None:
+            return self._get_mock_address()
+        return {**address, "lat": lat, "lon": lng}
+
+    async def _resolve_address(self, key: str, lat: float, lng: float) -> Optional[Dict[str, Any]]:
+        address = await self._fetch_reverse_geocode(lat, lng)
+        if address is not None:
+            await geocode_cache.set(key, address)
+            address_index.add(key, lat, lng, address)
+        return address
+
+    async def _fetch_reverse_geocode(self, lat: float, lng: float) -> Optional[Dict[str, Any]]:
+        url = f"{self.base_url}/v1/geocode/reverse"
+        params = {"lat": lat, "lon": lng, "apiKey": self.api_key}
+
+        res = await self.client.get(url, params=params, timeout=15.0)
+        res.raise_for_status()
+        data = res.json()
+        feat = data.get("features", [])
+        if not feat:
+            return None
+        prop = feat[0]["properties"]
+        return {
+            "formatted": prop.get("formatted", ""),
+            "address_line1": prop.get("address_line1", ""),
+            "city": prop.get("city", ""),
+            "state": prop.get("state", ""),
+            "country": prop.get("country", ""),
+            "lat": lat, "lon": lng
+        }
 
     # -------------------------------------------------------------
     # 🚗 ROUTING
     # -------------------------------------------------------------
     async def get_route(self, waypoints: List[Dict[str, float]], mode: str = "drive") -> Dict[str, Any]:
-        """Lấy route giữa các điểm"""
+        """Lấy route giữa các điểm (cache theo waypoint làm tròn ~1m + mode)"""
         if not self.api_key:
             return self._get_mock_route(waypoints)
 
-        url = f"{self.base_url}/v1/routing"
-        waypoint_str = "|".join([f"{p['lat']},{p['lon']}" for p in waypoints])
-        params = {"waypoints": waypoint_str, "mode": mode, "apiKey": self.api_key}
+        key = mode + ":" + "|".join(f"{p['lat']:.5f},{p['lon']:.5f}" for p in waypoints)
 
-        try:
-            async with httpx.AsyncClient(timeout=25.0) as client:
-                res = await client.get(url, params=params)
-                res.raise_for_status()
-                data = res.json()
-
-            feature = data.get("features", [{}])[0]
-            coords = feature.get("geometry", {}).get("coordinates", [])
-            prop = feature.get("properties", {})
-
-            return {
-                "distance_m": prop.get("distance", 0),
-                "time_s": prop.get("time", 0),
-                "waypoints": [{"lat": c[1], "lon": c[0]} for c in coords],
-                "mode": mode,
-            }
+        async def fetch():
+            route = await self._fetch_route(waypoints, mode)
+            await route_cache.set(key, route)
+            return route
 
+        try:
+            cached = await route_cache.get(key)
+            if cached is not None:
+                return cached
+            return await geoapify_flight.do(("route", key), fetch)
         except Exception as e:
             print(f"❌ Routing API error: {e}")
             return self._get_mock_route(waypoints)
 
+    async def _fetch_route(self, waypoints: List[Dict[str, float]], mode: str) -> Dict[str, Any]:
+        url = f"{self.base_url}/v1/routing"
+        waypoint_str = "|".join([f"{p['lat']},{p['lon']}" for p in waypoints])
+        params = {"waypoints": waypoint_str, "mode": mode, "apiKey": self.api_key}
+
+        res = await self.client.get(url, params=params, timeout=25.0)
+        res.raise_for_status()
+        data = res.json()
+
+        feature = data.get("features", [{}])[0]
+        coords = feature.get("geometry", {}).get("coordinates", [])
+        prop = feature.get("properties", {})
+
+        return {
+            "distance_m": prop.get("distance", 0),
+            "time_s": prop.get("time", 0),
+            "waypoints": [{"lat": c[1], "lon": c[0]} for c in coords],
+            "mode": mode,
+        }
+
     # -------------------------------------------------------------
     # 🧮 DISTANCE MATRIX
     # -------------------------------------------------------------
     async def get_distance_matrix(
-        self, origins: List[Dict[str, float]], destinations: List[Dict[str, float]], mode="drive"
+        self,
+        origins: List[Dict[str, float]],
+        destinations: List[Dict[str, float]],
+        mode="drive",
+        estimate: Optional[bool] = None,
+        fallback_estimate: bool = False,
     ) -> List[List[float]]:
+        """
+        Ma trận thời gian di chuyển (giây) origins x destinations.
+
+        Mỗi cặp (origin, destination, mode) được cache riêng nên khi thêm một
+        điểm dừng chỉ các ô còn thiếu được gửi lên /v1/routematrix; với
+        mode "walk" cặp A->B dùng chung với B->A. ``estimate=True`` (hoặc
+        ma trận lớn hơn MATRIX_EXACT_MAX_CELLS) dùng ước lượng haversine
+        cục bộ, không gọi API. Cặp không có đường đi là None (cũng được cache).
+        Khi không có API key hoặc API lỗi: ma trận mock, hoặc ước lượng
+        haversine nếu ``fallback_estimate=True`` (dùng khi kết quả được dùng
+        để tính toán, vd. sắp xếp lại lộ trình).
+        """
+        if estimate is None:
+            estimate = len(origins) * len(destinations) > MATRIX_EXACT_MAX_CELLS
+        if estimate:
+            return self._estimate_matrix(origins, destinations, mode)
         if not self.api_key:
-            return self._get_mock_matrix(origins, destinations)
+            return self._fallback_matrix(origins, destinations, mode, fallback_estimate)
 
+        keys = [[self._matrix_key(o, d, mode) for d in destinations] for o in origins]
+        try:
+            flat = await matrix_cache.get_many([k for row in keys for k in row])
+            n = len(destinations)
+            matrix = [flat[i * n:(i + 1) * n] for i in range(len(origins))]
+
+            for rows, cols in self._missing_blocks(matrix):
+                block = await self._fetch_matrix(
+                    [origins[i] for i in rows], [destinations[j] for j in cols], mode
+                )
+                fetched = {}
+                for bi, i in enumerate(rows):
+                    for bj, j in enumerate(cols):
+                        matrix[i][j] = block[bi][bj]
+                        fetched[keys[i][j]] = MATRIX_UNREACHABLE if block[bi][bj] is None else block[bi][bj]
+                await matrix_cache.set_many(fetched)
+            return [[None if v == MATRIX_UNREACHABLE else v for v in row] for row in matrix]
+        except Exception as e:
+            print(f"❌ Matrix error: {e}")
+            return self._fallback_matrix(origins, destinations, mode, fallback_estimate)
+
+    def _fallback_matrix(self, origins, destinations, mode: str, estimate: bool) -> List[List[float]]:
+        if estimate:
+            return self._estimate_matrix(origins, destinations, mode)
+        return self._get_mock_matrix(origins, destinations)
+
+    @staticmethod
+    def _matrix_key(origin: Dict[str, float], destination: Dict[str, float], mode: str) -> str:
+        a = f"{origin['lat']:.5f},{origin['lon']:.5f}"
+        b = f"{destination['lat']:.5f},{destination['lon']:.5f}"
+        if mode in SYMMETRIC_MODES and b < a:
+            a, b = b, a
+        return f"{mode}:{a}>{b}"
+
+    @staticmethod
+    def _missing_blocks(matrix: List[List[Optional[float]]]) -> List[tuple]:
+        """
+        (rows, cols) sub-matrices covering every missing cell: origins with
+        nothing cached are fetched against all destinations, the remaining
+        gaps as one block (e.g. the new column when a stop is appended).
+        """
+        n = len(matrix[0]) if matrix else 0
+        missing = [[j for j, v in enumerate(row) if v is None] for row in matrix]
+        full_rows = [i for i, cols in enumerate(missing) if cols and len(cols) == n]
+        blocks = [(full_rows, list(range(n)))] if full_rows else []
+
+        rest_rows = [i for i, cols in enumerate(missing) if cols and len(cols) < n]
+        rest_cols = sorted({j for i in rest_rows for j in missing[i]})
+        if rest_rows:
+            blocks.append((rest_rows, rest_cols))
+        return blocks
+
+    async def _fetch_matrix(
+        self, origins: List[Dict[str, float]], destinations: List[Dict[str, float]], mode: str
+    ) -> List[List[float]]:
         url = f"{self.base_url}/v1/routematrix"
         params = {
             "mode": mode,
@@ -156,23 +337,28 @@ class GeoapifyService:
             "targets": "|".join([f"{d['lat']},{d['lon']}" for d in destinations]),
             "apiKey": self.api_key,
         }
-        try:
-            async with httpx.AsyncClient(timeout=20.0) as cli:
-                r = await cli.get(url, params=params)
-                r.raise_for_status()
-                data = r.json()
-            # Format: distances/time matrix
-            rows = data.get("sources_to_targets", [])
-            return [[t.get("time", 0) for t in src["targets"]] for src in rows]
-        except Exception as e:
-            print(f"❌ Matrix error: {e}")
-            return self._get_mock_matrix(origins, destinations)
+        r = await self.client.get(url, params=params, timeout=20.0)
+        r.raise_for_status()
+        data = r.json()
+        # Format: distances/time matrix
+        rows = data.get("sources_to_targets", [])
+        return [[t.get("time", 0) for t in src["targets"]] for src in rows]
+
+    def _estimate_matrix(
+        self, origins: List[Dict[str, float]], destinations: List[Dict[str, float]], mode: str
+    ) -> List[List[float]]:
+        """Thời gian ước lượng: khoảng cách đường chim bay x hệ số đường vòng / tốc độ"""
+        speed = ESTIMATE_SPEED_MPS.get(mode, ESTIMATE_SPEED_MPS["drive"])
+        o_lats, o_lons = coords_array(origins)
+        d_lats, d_lons = coords_array(destinations)
+        seconds = distance_matrix_m(o_lats, o_lons, d_lats, d_lons) * (DETOUR_FACTOR / speed)
+        return seconds.round(1).tolist()
 
     # -------------------------------------------------------------
     # 🔄 MOCK FALLBACKS
     # -------------------------------------------------------------
     def _get_mock_places(self, lat: float, lng: float, limit: int):
-        return [{
+        places = [{
             "id": f"mock_{i}",
             "name": f"Mock Cafe {i+1}",
             "address": f"{100+i} Đường 3/2",
@@ -184,12 +370,17 @@ class GeoapifyService:
             "categories": ["catering.cafe"],
             "source": "mock"
         } for i in range(min(limit, 8))]
+        # Same shape as cached real results: distance from the caller included
+        distances = distances_from(lat, lng, *coords_array(places))
+        for place, d in zip(places, distances):
+            place["distance_m"] = round(float(d), 1)
+        return places
 
     def _get_mock_route(self, waypoints):
         return {"distance_m": 2500, "time_s": 320, "waypoints": waypoints, "mode": "drive"}
 
     def _get_mock_matrix(self, origins, destinations):
-        return [[300, 600][: len(destinations)] for _ in origins]
+        return [[[300, 600][j % 2] for j in range(len(destinations))] for _ in origins]
 
     def _get_mock_address(self):
         return {"formatted": "Hà Nội, Việt Nam", "city": "Hà Nội", "country": "VN"}
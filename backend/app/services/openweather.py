@@ -1,10 +1,12 @@
 import os, httpx
+from typing import Optional
+from app.http_client import get_http_client
 API_KEY = os.getenv("OPENWEATHER_KEY", "")
 
-async def get_weather(lat: float, lon: float, lang="vi"):
+async def get_weather(lat: float, lon: float, lang="vi", client: Optional[httpx.AsyncClient] = None):
     url = (f"https://api.openweathermap.org/data/3.0/onecall?"
            f"lat={lat}&lon={lon}&units=metric&lang={lang}&appid={API_KEY}")
-    async with httpx.AsyncClient(timeout=8) as cli:
-        r = await cli.get(url)
-        r.raise_for_status()
-        return r.json()
+    cli = client or get_http_client("openweather")
+    r = await cli.get(url, timeout=8)
+    r.raise_for_status()
+    return r.json()
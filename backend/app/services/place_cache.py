@@ -0,0 +1,146 @@
+"""
+Two-tier cache for SerpAPI place details: cache backend (in-process LRU or
+Redis) in front of MongoDB.
+
+Entries are keyed by normalized place name + geohash bucket. Each entry is
+fresh until ``fresh_until``; between that and ``stale_until`` it is still
+served while a background refresh runs (stale-while-revalidate). "No match"
+answers are cached too (``details`` is None) with a shorter TTL.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.cache import register_cache
+from app.core.cache_backend import CacheBackend, get_cache_backend
+from app.core.geo import geohash_encode
+from app.database import get_database
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "place_details_cache"
+
+
+class PlaceDetailsCache:
+    def __init__(
+        self,
+        ttl: float = 7 * 86400,
+        stale_ttl: float = 30 * 86400,
+        negative_ttl: float = 86400,
+        l1_size: int = 2048,
+        precision: int = 6,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.precision = precision
+        self.l1: CacheBackend = get_cache_backend("place_details", ttl=ttl + stale_ttl, maxsize=l1_size)
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.counters = {
+            "l1_hits": 0, "l2_hits": 0, "misses": 0, "stale_hits": 0,
+            "negative_hits": 0, "refreshes": 0, "l2_errors": 0,
+        }
+
+    def key(self, normalized_name: str, lat: float, lng: float) -> str:
+        return f"{normalized_name}|{geohash_encode(lat, lng, self.precision)}"
+
+    def _collection(self):
+        database = get_database()
+        return database[COLLECTION] if database is not None else None
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached entry ``{"details", "fresh_until", "stale_until"}`` or None"""
+        now = datetime.utcnow()
+        entry = await self.l1.get(key)
+        if entry is not None:
+            self.counters["l1_hits"] += 1
+        else:
+            entry = await self._l2_get(key)
+            if entry is not None and entry["stale_until"] > now:
+                self.counters["l2_hits"] += 1
+                await self._l1_set(key, entry, now)
+            else:
+                entry = None
+        if entry is None or entry["stale_until"] <= now:
+            self.counters["misses"] += 1
+            return None
+        if entry["details"] is None:
+            self.counters["negative_hits"] += 1
+        if entry["fresh_until"] <= now:
+            self.counters["stale_hits"] += 1
+        return entry
+
+    def is_stale(self, entry: Dict[str, Any]) -> bool:
+        return entry["fresh_until"] <= datetime.utcnow()
+
+    async def set(self, key: str, details: Optional[Dict[str, Any]]) -> None:
+        now = datetime.utcnow()
+        fresh = self.ttl if details is not None else self.negative_ttl
+        entry = {
+            "details": details,
+            "fresh_until": now + timedelta(seconds=fresh),
+            "stale_until": now + timedelta(seconds=fresh + self.stale_ttl),
+            "updated_at": now,
+        }
+        await self._l1_set(key, entry, now)
+        collection = self._collection()
+        if collection is None:
+            return
+        try:
+            await collection.update_one({"_id": key}, {"$set": entry}, upsert=True)
+        except Exception as e:
+            self.counters["l2_errors"] += 1
+            logger.warning(f"Place cache write failed: {e}")
+
+    def refresh_in_background(self, key: str, refresh: Callable[[], Awaitable[Any]]) -> None:
+        """Run ``refresh`` once per key; concurrent stale hits share it"""
+        if key in self._refreshing:
+            return
+        self.counters["refreshes"] += 1
+        task = asyncio.ensure_future(refresh())
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _l1_set(self, key: str, entry: Dict[str, Any], now: datetime) -> None:
+        ttl = (entry["stale_until"] - now).total_seconds()
+        if ttl > 0:
+            await self.l1.set(key, entry, ttl=ttl)
+
+    async def _l2_get(self, key: str) -> Optional[Dict[str, Any]]:
+        collection = self._collection()
+        if collection is None:
+            return None
+        try:
+            return await collection.find_one({"_id": key}, {"_id": 0})
+        except Exception as e:
+            self.counters["l2_errors"] += 1
+            logger.warning(f"Place cache read failed: {e}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.counters["l1_hits"] + self.counters["l2_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_ratio": (hits / lookups) if lookups else 0.0,
+            "l1": self.l1.stats(),
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "negative_ttl": self.negative_ttl,
+        }
+
+    async def clear(self) -> None:
+        await self.l1.clear()
+
+    def purge_expired(self) -> int:
+        return self.l1.purge_expired()
+
+
+place_details_cache = register_cache("serpapi_place_details", PlaceDetailsCache(
+    ttl=float(os.getenv("SERPAPI_CACHE_TTL", str(7 * 86400))),
+    stale_ttl=float(os.getenv("SERPAPI_CACHE_STALE_TTL", str(30 * 86400))),
+    negative_ttl=float(os.getenv("SERPAPI_NEGATIVE_TTL", "86400")),
+    l1_size=int(os.getenv("SERPAPI_CACHE_SIZE", "2048")),
+))
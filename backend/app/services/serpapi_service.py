@@ -1,17 +1,38 @@
 import os
+import asyncio
 import httpx
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 import json
 
+import numpy as np
+
+from app.core.cache import register_cache
+from app.core.geo import distances_from
+from app.core.singleflight import SingleFlight
+from app.http_client import get_http_client
+from app.services.place_cache import place_details_cache
+
+# Concurrent lookups of the same place (cache key) share one SerpAPI call
+serpapi_flight = register_cache("serpapi_singleflight", SingleFlight())
+
 class SerpAPIService:
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         self.api_key = os.getenv("SERPAPI_KEY")
         self.base_url = "https://serpapi.com/search"
+        # Shared pooled client (created in main.py lifespan) unless one is injected
+        self._http_client = http_client
+        # Enrichment fan-out: số request song song & deadline cho cả batch (giây)
+        self.enrich_concurrency = int(os.getenv("SERPAPI_CONCURRENCY", "5"))
+        self.enrich_deadline = float(os.getenv("SERPAPI_BATCH_DEADLINE", "15"))
 
         if not self.api_key:
             print("⚠️ Warning: SERPAPI_KEY not found. SerpAPI features will run in mock mode.")
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._http_client or get_http_client("serpapi")
+
     # ===========================================================
     # 🔍 Lấy chi tiết địa điểm
     # ===========================================================
@@ -24,11 +45,29 @@ class SerpAPIService:
     ) -> Optional[Dict[str, Any]]:
         """
         Lấy chi tiết địa điểm từ SerpAPI Google Maps Engine
+
+        Kết quả (kể cả "không tìm thấy") được cache 2 tầng theo tên chuẩn hoá
+        + ô toạ độ; bản cache cũ vẫn được trả về trong khi làm mới ở nền.
         """
 
         if not self.api_key:
             return self._get_mock_place_details(place_name, lat, lng)
 
+        key = place_details_cache.key(self._normalize_name(place_name), lat, lng)
+        cached = await place_details_cache.get(key)
+        if cached is not None:
+            if place_details_cache.is_stale(cached):
+                place_details_cache.refresh_in_background(
+                    key, lambda: self._fetch_place_details(key, place_name, lat, lng)
+                )
+            if cached["details"] is None:
+                return self._get_mock_place_details(place_name, lat, lng)
+            return cached["details"]
+
+        return await serpapi_flight.do(key, lambda: self._fetch_place_details(key, place_name, lat, lng))
+
+    async def _fetch_place_details(self, key: str, place_name: str, lat: float, lng: float) -> Dict[str, Any]:
+        """Gọi SerpAPI và ghi cache; lỗi mạng không được cache"""
         try:
             params = {
                 "engine": "google_maps",
@@ -38,25 +77,27 @@ class SerpAPIService:
                 "api_key": self.api_key,
             }
 
-            async with httpx.AsyncClient(timeout=25.0) as client:
-                res = await client.get(self.base_url, params=params)
-                res.raise_for_status()
-                data = res.json()
+            res = await self.client.get(self.base_url, params=params, timeout=25.0)
+            res.raise_for_status()
+            data = res.json()
 
             # SerpAPI có thể trả về nhiều dạng key khác nhau
             local_results = data.get("local_results") or data.get("place_results") or []
 
             if not local_results:
                 print(f"⚠️ SerpAPI: No results found for '{place_name}' at {lat},{lng}")
+                await place_details_cache.set(key, None)
                 return self._get_mock_place_details(place_name, lat, lng)
 
             best_match = self._find_best_match(local_results, place_name, lat, lng)
 
             if not best_match:
                 print(f"⚠️ SerpAPI: No match found for '{place_name}'")
+                await place_details_cache.set(key, None)
                 return self._get_mock_place_details(place_name, lat, lng)
 
             result = self._format_serpapi_result(best_match)
+            await place_details_cache.set(key, result)
             print(f"✅ SerpAPI: Found '{result['name']}' with rating {result['rating']}")
             return result
 
@@ -85,19 +126,19 @@ class SerpAPIService:
         best_match = None
         target_norm = self._normalize_name(target_name)
 
-        for result in results:
-            name = result.get("title", "")
-            coords = result.get("gps_coordinates", {})
-            result_lat = coords.get("latitude", 0)
-            result_lng = coords.get("longitude", 0)
+        coords = [r.get("gps_coordinates") or {} for r in results]
+        distances_km = distances_from(
+            target_lat, target_lng,
+            [c.get("latitude", 0) for c in coords],
+            [c.get("longitude", 0) for c in coords],
+        ) / 1000
+        distance_scores = np.clip(1 - distances_km / 2.0, 0, 1)  # ưu tiên dưới 2km
 
+        for result, distance_score in zip(results, distance_scores):
             name_similarity = self._calculate_name_similarity(
-                target_norm, self._normalize_name(name)
+                target_norm, self._normalize_name(result.get("title", ""))
             )
-            distance = self._calculate_distance(target_lat, target_lng, result_lat, result_lng)
-            distance_score = max(0, 1 - (distance / 2.0))  # ưu tiên dưới 2km
-
-            score = (name_similarity * 0.8) + (distance_score * 0.2)
+            score = (name_similarity * 0.8) + (float(distance_score) * 0.2)
 
             if score > best_score:
                 best_score = score
@@ -122,13 +163,6 @@ class SerpAPIService:
         union = len(words1.union(words2))
         return intersection / union if union else 0
 
-    def _calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-        from math import radians, cos, sin, asin, sqrt
-        lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
-        dlat, dlng = lat2 - lat1, lng2 - lng1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlng/2)**2
-        return 6371 * (2 * asin(sqrt(a)))  # km
-
     # ===========================================================
     # 🧾 Formatter (clean)
     # ===========================================================
@@ -182,22 +216,62 @@ class SerpAPIService:
     # ⚙️ Lấy nhiều địa điểm cùng lúc (song song)
     # ===========================================================
     async def get_multiple_places_details(
-        self, places: List[Dict[str, Any]]
+        self,
+        places: List[Dict[str, Any]],
+        concurrency: Optional[int] = None,
+        deadline: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
-        results = []
-        for place in places:
-            try:
-                details = await self.get_place_details(
+        """
+        Làm giàu nhiều địa điểm song song (tối đa ``concurrency`` request cùng lúc).
+
+        Hết ``deadline`` giây thì trả về kết quả một phần: địa điểm chưa xong
+        dùng dữ liệu mock. Thứ tự giữ nguyên như ``places``; mỗi phần tử có
+        ``enriched`` (True nếu lấy được từ SerpAPI) và ``enrichment``
+        ("serpapi" | "fallback" | "deadline").
+        """
+        if not places:
+            return []
+
+        semaphore = asyncio.Semaphore(concurrency or self.enrich_concurrency)
+
+        async def enrich(place: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self.get_place_details(
                     place_name=place.get("name", ""),
                     lat=place.get("lat", 0),
-                    lng=place.get("lng", 0),
+                    lng=self._place_lng(place),
                     place_id=place.get("place_id"),
                 )
-                if details:
-                    results.append({**place, **details})
+
+        tasks = [asyncio.ensure_future(enrich(place)) for place in places]
+        try:
+            done, pending = await asyncio.wait(
+                tasks, timeout=self.enrich_deadline if deadline is None else deadline
+            )
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        if pending:
+            print(f"⏱ SerpAPI batch deadline: {len(pending)}/{len(places)} places fell back")
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        results = []
+        for place, task in zip(places, tasks):
+            details, status = None, "deadline"
+            if task in done:
+                if task.exception() is not None:
+                    print(f"❌ SerpAPI multiple error for {place.get('name')}: {task.exception()}")
+                    status = "fallback"
                 else:
-                    results.append({**place, **self._get_mock_place_details(place.get("name",""), place.get("lat",0), place.get("lng",0))})
-            except Exception as e:
-                print(f"❌ SerpAPI multiple error for {place.get('name')}: {e}")
-                results.append({**place, **self._get_mock_place_details(place.get('name',''), place.get('lat',0), place.get('lng',0))})
+                    details = task.result()
+                    status = "serpapi" if details and details.get("source") == "serpapi" else "fallback"
+            if not details:
+                details = self._get_mock_place_details(place.get("name", ""), place.get("lat", 0), self._place_lng(place))
+            results.append({**place, **details, "enriched": status == "serpapi", "enrichment": status})
         return results
+
+    @staticmethod
+    def _place_lng(place: Dict[str, Any]) -> float:
+        # Geoapify dùng "lon", một số nguồn khác dùng "lng"
+        return place.get("lng", place.get("lon", 0))
@@ -1,3 +1,4 @@
+import math
 import os
 import httpx
 from typing import Dict, List, Any, Optional
@@ -5,17 +6,34 @@ from datetime import datetime, timedelta
 import json
 from functools import lru_cache
 
+from app.core.cache import register_cache
+from app.core.cache_backend import get_cache_backend
+from app.core.geo import coords_array, distances_from, geohash_encode
+from app.core.singleflight import SingleFlight
 from app.services.geoapify_service import GeoapifyService
 from app.services.serpapi_service import SerpAPIService
 
+# Shared by every service instance (services are created per request)
+suggestions_cache = register_cache("smart_suggestions", get_cache_backend(
+    "suggestions",
+    maxsize=int(os.getenv("SUGGESTIONS_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("SUGGESTIONS_CACHE_TTL", "3600")),
+    max_bytes=int(os.getenv("SUGGESTIONS_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+))
+suggestions_flight = register_cache("smart_suggestions_singleflight", SingleFlight())
+# Ô geohash ~150m: người dùng ở gần nhau dùng chung kết quả
+SUGGESTIONS_GEOHASH_PRECISION = 7
+# Điểm cộng tối đa (thang rating) cho địa điểm ngay cạnh người dùng
+PROXIMITY_WEIGHT = float(os.getenv("SUGGESTIONS_PROXIMITY_WEIGHT", "0.5"))
+
 class SmartSuggestionsService:
-    def __init__(self):
-        self.geoapify_service = GeoapifyService()
-        self.serpapi_service = SerpAPIService()
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        # Both providers share the app-scoped pooled client unless one is injected
+        self.geoapify_service = GeoapifyService(http_client=http_client)
+        self.serpapi_service = SerpAPIService(http_client=http_client)
         
-        # Simple in-memory cache (can be replaced with Redis)
-        self.cache = {}
-        self.cache_ttl = 3600  # 1 hour
+        self.cache = suggestions_cache
+        self.cache_ttl = suggestions_cache.ttl
 
     async def get_smart_suggestions(
         self,
@@ -38,15 +56,36 @@ class SmartSuggestionsService:
         Returns:
             Dict với suggestions và metadata
         """
-        cache_key = f"suggestions_{lat}_{lng}_{category}_{radius}_{limit}"
+        cell = geohash_encode(lat, lng, SUGGESTIONS_GEOHASH_PRECISION)
+        cache_key = f"suggestions_{cell}_{category}_{radius}_{limit}"
         
         # Check cache
-        if cache_key in self.cache:
-            cached_data, timestamp = self.cache[cache_key]
-            if datetime.now() - timestamp < timedelta(seconds=self.cache_ttl):
-                print(f"📦 Using cached suggestions for {category}")
-                return cached_data
+        cached_data = await self.cache.get(cache_key)
+        if cached_data is not None:
+            print(f"📦 Using cached suggestions for {category}")
+            return {
+                **cached_data,
+                "suggestions": self._with_distances(cached_data["suggestions"], lat, lng),
+                "high_rated": self._with_distances(cached_data["high_rated"], lat, lng),
+                "good_rated": self._with_distances(cached_data["good_rated"], lat, lng),
+                "location": {"lat": lat, "lng": lng},
+            }
+
+        # Concurrent identical misses share one Geoapify + SerpAPI pipeline
+        return await suggestions_flight.do(
+            cache_key,
+            lambda: self._build_suggestions(cache_key, lat, lng, category, radius, limit)
+        )
 
+    async def _build_suggestions(
+        self,
+        cache_key: str,
+        lat: float,
+        lng: float,
+        category: str,
+        radius: int,
+        limit: int
+    ) -> Dict[str, Any]:
         try:
             print(f"🔍 Getting smart suggestions for {category} at {lat},{lng}")
             
@@ -70,10 +109,11 @@ class SmartSuggestionsService:
                 geoapify_places
             )
             
-            print(f"⭐ Got details for {len(serpapi_places)} places from SerpAPI")
+            enriched_count = sum(1 for p in serpapi_places if p.get("enriched"))
+            print(f"⭐ Got details for {enriched_count}/{len(serpapi_places)} places from SerpAPI")
 
-            # Step 3: Filter and sort by rating
-            filtered_places = self._filter_and_sort_places(serpapi_places, limit)
+            # Step 3: Filter and sort by rating + proximity
+            filtered_places = self._filter_and_sort_places(serpapi_places, limit, lat, lng, radius)
             
             # Step 4: Categorize by rating
             categorized = self._categorize_by_rating(filtered_places)
@@ -86,11 +126,15 @@ class SmartSuggestionsService:
                 "category": category,
                 "location": {"lat": lat, "lng": lng},
                 "radius": radius,
+                "enrichment": {
+                    "enriched": enriched_count,
+                    "fallback": len(serpapi_places) - enriched_count,
+                },
                 "timestamp": datetime.now().isoformat()
             }
             
             # Cache result
-            self.cache[cache_key] = (result, datetime.now())
+            await self.cache.set(cache_key, result)
             
             print(f"✅ Smart suggestions ready: {len(filtered_places)} places")
             return result
@@ -102,22 +146,36 @@ class SmartSuggestionsService:
     def _filter_and_sort_places(
         self,
         places: List[Dict[str, Any]],
-        limit: int
+        limit: int,
+        lat: float,
+        lng: float,
+        radius: int
     ) -> List[Dict[str, Any]]:
-        """Lọc và sắp xếp địa điểm theo rating"""
+        """Lọc và sắp xếp địa điểm theo rating, cộng điểm cho địa điểm gần"""
         
         # Filter out places with very low ratings
-        filtered = [p for p in places if p.get("rating", 0) >= 3.5]
+        filtered = self._with_distances([p for p in places if p.get("rating", 0) >= 3.5], lat, lng)
         
-        # Sort by rating (descending), then by reviews count
-        sorted_places = sorted(
-            filtered,
-            key=lambda x: (x.get("rating", 0), x.get("reviews_count", 0)),
-            reverse=True
-        )
+        # Sort by rating + proximity bonus (descending), then by reviews count
+        def score(place):
+            distance = place.get("distance_m")
+            proximity = 0.0 if distance is None else max(0.0, 1 - distance / max(radius, 1))
+            return (place.get("rating", 0) + PROXIMITY_WEIGHT * proximity, place.get("reviews_count", 0))
+        
+        sorted_places = sorted(filtered, key=score, reverse=True)
         
         return sorted_places[:limit]
 
+    def _with_distances(self, places: List[Dict[str, Any]], lat: float, lng: float) -> List[Dict[str, Any]]:
+        """Copies of ``places`` with ``distance_m`` from (lat, lng); None if no coords"""
+        if not places:
+            return []
+        distances = distances_from(lat, lng, *coords_array(places))
+        return [
+            {**p, "distance_m": None if math.isnan(d) else round(float(d), 1)}
+            for p, d in zip(places, distances)
+        ]
+
     def _categorize_by_rating(self, places: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """Phân loại địa điểm theo rating"""
         high_rated = [p for p in places if p.get("rating", 0) >= 4.5]
@@ -181,15 +239,14 @@ class SmartSuggestionsService:
             print(f"Error getting enhanced place details: {e}")
             return None
 
-    def clear_cache(self):
+    async def clear_cache(self):
         """Xóa cache"""
-        self.cache.clear()
+        await self.cache.clear()
         print("🗑️ Cache cleared")
 
     def get_cache_stats(self) -> Dict[str, Any]:
-        """Thống kê cache"""
+        """Thống kê cache (hit ratio, evictions, dung lượng) — không liệt kê key"""
         return {
-            "cache_size": len(self.cache),
-            "cache_ttl": self.cache_ttl,
-            "cached_keys": list(self.cache.keys())
+            **self.cache.stats(),
+            "single_flight": suggestions_flight.stats(),
         }
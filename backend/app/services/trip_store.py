@@ -0,0 +1,219 @@
+"""
+Persistence of generated trip itineraries.
+
+Two layouts are supported (``TRIP_STORAGE``):
+
+- ``collection`` (default): one document per activity in ``activities``,
+  grouped and summarized by an aggregation pipeline on every read;
+- ``embedded``: the days, their activities and precomputed summary fields
+  (``totalAttractions``, ``averageRating``, day ``estimatedCost``, ...) live
+  in the trip document itself, so saving is one write and reading is the
+  trip lookup alone.
+
+Readers handle both, so trips can be migrated gradually
+(``migrate_trip_storage.py``).
+"""
+from datetime import datetime, timedelta
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+COLLECTION, EMBEDDED = "collection", "embedded"
+
+
+def trip_storage_mode() -> str:
+    mode = os.getenv("TRIP_STORAGE", COLLECTION).lower()
+    return mode if mode in (COLLECTION, EMBEDDED) else COLLECTION
+
+
+def activity_fields(activity: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": activity["name"],
+        "type": activity["type"],
+        "time": activity["time"],
+        "duration": activity["duration"],
+        "cost": activity.get("cost", 0.0) or 0.0,
+        "description": activity.get("description"),
+        "location": activity.get("location"),
+        "rating": activity.get("rating"),
+        "coordinates": activity.get("coordinates"),
+    }
+
+
+def _day_date(start_date: Any, day: int) -> Optional[str]:
+    if not start_date:
+        return None
+    return (start_date + timedelta(days=day - 1)).strftime("%Y-%m-%d")
+
+
+def format_days(days: Dict[int, List[Dict[str, Any]]], start_date: Any) -> List[Dict[str, Any]]:
+    """``{day: activities}`` -> response days with date and estimated cost"""
+    return [{
+        "day": day,
+        "date": _day_date(start_date, day),
+        "estimatedCost": sum(a["cost"] or 0 for a in days[day]),
+        "activities": days[day],
+    } for day in sorted(days)]
+
+
+def summarize(days: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    activities = [a for day in days for a in day["activities"]]
+    ratings = [a["rating"] for a in activities if a.get("rating")]
+    return {
+        "totalAttractions": sum(1 for a in activities if a["type"] == "attraction"),
+        "totalRestaurants": sum(1 for a in activities if a["type"] == "restaurant"),
+        "totalHotels": sum(1 for a in activities if a["type"] == "hotel"),
+        "averageRating": sum(ratings) / len(ratings) if ratings else 0.0,
+    }
+
+
+def embed_days(itinerary_days: Iterable[Dict[str, Any]], start_date: Any) -> List[Dict[str, Any]]:
+    """Generated days -> embedded day documents (activities get stable ``{day}_{n}`` ids)"""
+    days: Dict[int, List[Dict[str, Any]]] = {}
+    for day_data in itinerary_days:
+        activities = days.setdefault(day_data["day"], [])
+        for activity in day_data["activities"]:
+            activities.append({"id": f"{day_data['day']}_{len(activities) + 1}", **activity_fields(activity)})
+    return format_days(days, start_date)
+
+
+def _type_count(activity_type: str) -> Dict[str, Any]:
+    return {"$sum": {"$cond": [{"$eq": ["$type", activity_type]}, 1, 0]}}
+
+
+def itinerary_pipeline(trip_id: Any) -> List[Dict[str, Any]]:
+    """
+    Aggregation over ``activities`` returning one document
+    ``{"days": [{"_id": day, "estimatedCost", "activities"}], "summary": [{...}]}``
+    so grouping, day costs, type counts and the average rating are computed
+    by MongoDB and only the response fields are transferred.
+    """
+    return [
+        {"$match": {"trip_id": trip_id}},
+        {"$sort": {"day": 1, "_id": 1}},
+        {"$project": {
+            "_id": 0,
+            "day": 1,
+            "type": 1,
+            "rating": 1,
+            "cost": {"$ifNull": ["$cost", 0.0]},
+            "activity": {
+                "id": {"$toString": "$_id"},
+                "name": "$name",
+                "type": "$type",
+                "time": "$time",
+                "duration": "$duration",
+                "cost": {"$ifNull": ["$cost", 0.0]},
+                "description": {"$ifNull": ["$description", None]},
+                "location": {"$ifNull": ["$location", None]},
+                "rating": {"$ifNull": ["$rating", None]},
+                "coordinates": {"$ifNull": ["$coordinates", None]},
+            },
+        }},
+        {"$facet": {
+            "days": [
+                {"$group": {"_id": "$day", "estimatedCost": {"$sum": "$cost"}, "activities": {"$push": "$activity"}}},
+                {"$sort": {"_id": 1}},
+            ],
+            "summary": [
+                {"$group": {
+                    "_id": None,
+                    "totalAttractions": _type_count("attraction"),
+                    "totalRestaurants": _type_count("restaurant"),
+                    "totalHotels": _type_count("hotel"),
+                    # $avg skips nulls; unrated (0/None) activities do not count
+                    "averageRating": {"$avg": {"$cond": [{"$gt": ["$rating", 0]}, "$rating", None]}},
+                }},
+                {"$project": {"_id": 0}},
+            ],
+        }},
+    ]
+
+
+def days_from_aggregate(result: Dict[str, Any], start_date: Any) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """``itinerary_pipeline`` output -> ``(days, summary)``"""
+    days = [{
+        "day": day["_id"],
+        "date": _day_date(start_date, day["_id"]),
+        "estimatedCost": day["estimatedCost"],
+        "activities": day["activities"],
+    } for day in result.get("days", [])]
+    summary = {"totalAttractions": 0, "totalRestaurants": 0, "totalHotels": 0, "averageRating": 0.0}
+    if result.get("summary"):
+        summary.update(result["summary"][0])
+        summary["averageRating"] = summary["averageRating"] or 0.0
+    return days, summary
+
+
+async def save_itinerary(
+    db, trip_oid: Any, itinerary: Dict[str, Any], start_date: Any, mode: Optional[str] = None
+) -> Dict[str, Any]:
+    """Store a generated itinerary and confirm the trip; returns activity count and total cost"""
+    mode = mode or trip_storage_mode()
+    now = datetime.utcnow()
+    if mode == EMBEDDED:
+        days = embed_days(itinerary.get("days", []), start_date)
+        total_cost = sum(day["estimatedCost"] for day in days)
+        await db.trips.update_one({"_id": trip_oid}, {"$set": {
+            "days": days,
+            "summary": summarize(days),
+            "storage": EMBEDDED,
+            "total_cost": total_cost,
+            "status": "confirmed",
+            "updated_at": now,
+        }})
+        return {"activities": sum(len(day["activities"]) for day in days), "total_cost": total_cost}
+
+    activities = [
+        {"trip_id": trip_oid, "day": day_data["day"], **activity_fields(activity_data), "created_at": now}
+        for day_data in itinerary.get("days", [])
+        for activity_data in day_data["activities"]
+    ]
+    if activities:
+        await db.activities.insert_many(activities)
+    total_cost = sum(activity["cost"] for activity in activities)
+    await db.trips.update_one(
+        {"_id": trip_oid},
+        {"$set": {"total_cost": total_cost, "status": "confirmed", "updated_at": now}}
+    )
+    return {"activities": len(activities), "total_cost": total_cost}
+
+
+async def load_itinerary(db, trip: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """``(days, summary)`` of a trip in either layout"""
+    if trip.get("storage") == EMBEDDED:
+        return trip.get("days", []), trip.get("summary") or summarize(trip.get("days", []))
+    result = await db.activities.aggregate(itinerary_pipeline(trip["_id"])).to_list(length=1)
+    return days_from_aggregate(result[0] if result else {}, trip.get("start_date"))
+
+
+async def migrate_trip(db, trip: Dict[str, Any], to: str, keep_activities: bool = False) -> int:
+    """Move one trip to layout ``to``; returns the number of activities moved"""
+    if to == EMBEDDED:
+        if trip.get("storage") == EMBEDDED:
+            return 0
+        days, summary = await load_itinerary(db, trip)
+        await db.trips.update_one({"_id": trip["_id"]}, {"$set": {
+            "days": days,
+            "summary": summary,
+            "storage": EMBEDDED,
+            "updated_at": datetime.utcnow(),
+        }})
+        if not keep_activities:
+            await db.activities.delete_many({"trip_id": trip["_id"]})
+        return sum(len(day["activities"]) for day in days)
+
+    if trip.get("storage") != EMBEDDED:
+        return 0
+    now = datetime.utcnow()
+    activities = [
+        {"trip_id": trip["_id"], "day": day["day"], **activity_fields(activity), "created_at": now}
+        for day in trip.get("days", [])
+        for activity in day["activities"]
+    ]
+    if activities:
+        await db.activities.insert_many(activities)
+    await db.trips.update_one(
+        {"_id": trip["_id"]},
+        {"$unset": {"days": "", "summary": "", "storage": ""}, "$set": {"updated_at": now}},
+    )
+    return len(activities)
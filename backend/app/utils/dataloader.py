@@ -0,0 +1,111 @@
+"""
+Request-scoped batched lookups.
+
+``DataLoader.load(key)`` calls made while building one response are
+collected until the event loop gets a chance to run, then resolved with a
+single ``batch_fn(keys)`` call (e.g. one ``$in`` query) instead of one
+query per key. Results are cached for the loader's lifetime, so create
+loaders per request - ``Depends(get_loaders)`` - never module-wide.
+
+    trips = await db.trips.find(...).to_list(length=None)
+    users = await loaders.users.load_many([t["user_id"] for t in trips])
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.database import get_database
+
+BatchFn = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class DataLoader:
+    def __init__(self, batch_fn: BatchFn, max_batch_size: int = 1000):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._pending: List[Hashable] = []
+        self.batches = 0
+
+    async def load(self, key: Hashable) -> Optional[Any]:
+        """Value for ``key`` (None if the batch function returned nothing for it)"""
+        if key not in self._cache:
+            self._cache[key] = asyncio.get_running_loop().create_future()
+            if not self._pending:
+                asyncio.get_running_loop().call_soon(self._dispatch)
+            self._pending.append(key)
+        return await asyncio.shield(self._cache[key])
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Any]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Hashable, value: Any) -> None:
+        if key not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._cache[key] = future
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, []
+        for i in range(0, len(pending), self.max_batch_size):
+            asyncio.ensure_future(self._run(pending[i:i + self.max_batch_size]))
+
+    async def _run(self, keys: List[Hashable]) -> None:
+        self.batches += 1
+        try:
+            results = await self.batch_fn(keys)
+        except Exception as e:
+            for key in keys:
+                self._cache.pop(key).set_exception(e)
+            return
+        for key in keys:
+            self._cache[key].set_result(results.get(key))
+
+
+def _id_variants(keys: Iterable[Hashable]) -> List[Any]:
+    """Keys plus their ObjectId form: ids are stored as strings in references but ObjectId in ``_id``"""
+    variants: List[Any] = []
+    for key in keys:
+        variants.append(key)
+        if isinstance(key, str):
+            try:
+                variants.append(ObjectId(key))
+            except InvalidId:
+                pass
+    return variants
+
+
+def by_id(collection, projection: Optional[Dict[str, int]] = None) -> BatchFn:
+    """Batch function: documents of ``collection`` by ``str(_id)``, one ``$in`` query"""
+    async def batch(keys: List[Hashable]) -> Dict[Hashable, Any]:
+        docs = await collection.find({"_id": {"$in": _id_variants(keys)}}, projection).to_list(length=None)
+        return {str(doc["_id"]): doc for doc in docs}
+    return batch
+
+
+def count_by(collection, field: str) -> BatchFn:
+    """Batch function: number of documents of ``collection`` per value of ``field``, one aggregation"""
+    async def batch(keys: List[Hashable]) -> Dict[Hashable, Any]:
+        counts = await collection.aggregate([
+            {"$match": {field: {"$in": list(keys)}}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        ]).to_list(length=None)
+        found = {row["_id"]: row["count"] for row in counts}
+        return {key: found.get(key, 0) for key in keys}
+    return batch
+
+
+class Loaders:
+    """The loaders used by the routers, bound to one request"""
+
+    def __init__(self, db):
+        self.users = DataLoader(by_id(db.users, {"username": 1, "email": 1, "full_name": 1}))
+        self.trips = DataLoader(by_id(db.trips, {"destination": 1, "start_date": 1, "end_date": 1, "status": 1}))
+        self.trip_counts = DataLoader(count_by(db.trips, "user_id"))
+
+
+def get_loaders() -> Loaders:
+    """FastAPI dependency: fresh loaders for each request"""
+    return Loaders(get_database())
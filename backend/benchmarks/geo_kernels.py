@@ -0,0 +1,66 @@
+"""
+Throughput of the geo distance kernels.
+
+    cd backend && python -m benchmarks.geo_kernels [--n 10000] [--chunk 1024]
+
+Compares the scalar ``haversine_m`` loop with the NumPy kernels on an
+N x N point set around Đà Nẵng. The full matrix is processed in row blocks
+(``iter_distance_blocks``) so memory stays at ``chunk x N`` floats.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core.geo import distances_from, haversine_m, iter_distance_blocks, within_radius
+
+
+def random_points(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return 16.0 + rng.random(n) * 0.3, 108.0 + rng.random(n) * 0.3
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=10000)
+    parser.add_argument("--chunk", type=int, default=1024)
+    parser.add_argument("--scalar-sample", type=int, default=200_000)
+    args = parser.parse_args()
+
+    lats, lons = random_points(args.n)
+
+    sample = min(args.scalar_sample, args.n * args.n)
+    _, scalar_s = timed(lambda: [
+        haversine_m(lats[i % args.n], lons[i % args.n], lats[(i * 7) % args.n], lons[(i * 7) % args.n])
+        for i in range(sample)
+    ])
+    print(f"scalar haversine_m        {sample / scalar_s / 1e6:8.2f} M pairs/s")
+
+    _, one_s = timed(lambda: [distances_from(lats[i], lons[i], lats, lons) for i in range(100)])
+    print(f"distances_from (1 x N)    {100 * args.n / one_s / 1e6:8.2f} M pairs/s")
+
+    def full_matrix():
+        nearest = np.empty(args.n)
+        for start, block in iter_distance_blocks(lats, lons, lats, lons, chunk_rows=args.chunk):
+            rows = np.arange(block.shape[0])
+            block[rows, start + rows] = np.inf  # ignore self-distance
+            nearest[start:start + block.shape[0]] = block.min(axis=1)
+        return nearest
+
+    nearest, matrix_s = timed(full_matrix)
+    pairs = args.n * args.n
+    print(f"distance matrix {args.n}x{args.n} {pairs / matrix_s / 1e6:8.2f} M pairs/s "
+          f"({matrix_s:.2f}s, median nearest neighbour {np.median(nearest):.0f} m)")
+
+    _, radius_s = timed(lambda: [within_radius(lats[i], lons[i], 1000, lats, lons) for i in range(1000)])
+    print(f"within_radius (bbox+exact) {1000 / radius_s:8.0f} queries/s over {args.n} points")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Parse success and speed of LLM-output JSON extraction: the old slice +
+``json.loads`` vs ``app.core.json_repair``.
+
+    cd backend && python -m benchmarks.json_extraction [--repeat 200]
+    cd backend && python -m benchmarks.json_extraction --corpus outputs.jsonl
+
+``--corpus`` takes recorded raw model outputs, one JSON record per line with
+the text under ``"raw"`` (``"days"`` optional, default 1). Without it a
+synthetic corpus with the usual failure modes is used: prose around the
+JSON, code fences, trailing commas, key variants and outputs cut off at the
+token limit.
+"""
+import argparse
+import json
+import time
+
+from app.core.json_repair import coerce_itinerary, extract_json
+
+
+def legacy_extract(text: str):
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("no JSON")
+    snippet = text[start:]
+    end = snippet.rfind("}")
+    if end != -1:
+        snippet = snippet[:end + 1]
+    return json.loads(snippet)
+
+
+def synthetic_plan(days: int, per_day: int = 6):
+    return {
+        "overview": f"Chuyến đi {days} ngày tại Quy Nhơn",
+        "schedule": [{
+            "day": d,
+            "title": f"Ngày {d} - khám phá {{biển}}",
+            "activities": [
+                {"time": f"{8 + 2 * i:02d}:00", "place": f"Địa điểm {d}.{i}", "desc": "Tham quan \"nổi tiếng\""}
+                for i in range(per_day)
+            ],
+        } for d in range(1, days + 1)],
+        "total_cost_estimate": "4.500.000đ",
+    }
+
+
+def synthetic_corpus():
+    corpus = []
+    for days in (1, 3, 5):
+        plan = synthetic_plan(days)
+        raw = json.dumps(plan, ensure_ascii=False, indent=2)
+        variants = {
+            "clean": raw,
+            "preamble": "Dưới đây là lịch trình của bạn:\n" + raw,
+            "fenced+commentary": f"```json\n{raw}\n```\nLưu ý: giá có thể thay đổi {{tuỳ mùa}}.",
+            "trailing commas": raw.replace('"\n      }', '",\n      }').replace("}\n  ]", "},\n  ]"),
+            "key variants": raw.replace('"schedule"', '"days"').replace('"place"', '"name"'),
+            "truncated 90%": raw[: int(len(raw) * 0.9)],
+            "truncated 60%": raw[: int(len(raw) * 0.6)],
+        }
+        corpus += [{"kind": kind, "raw": text, "days": days} for kind, text in variants.items()]
+    return corpus
+
+
+def load_corpus(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [{"kind": "recorded", "days": 1, **json.loads(line)} for line in f if line.strip()]
+
+
+def evaluate(extract, record):
+    """(parsed, schema-valid, complete days)"""
+    try:
+        data = extract(record["raw"])
+    except ValueError:
+        return False, False, 0
+    try:
+        plan = coerce_itinerary(data)
+    except ValueError:
+        return True, False, 0
+    return True, True, len(plan["schedule"])
+
+
+def time_per_call(extract, corpus, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for record in corpus:
+            try:
+                extract(record["raw"])
+            except ValueError:
+                pass
+    return (time.perf_counter() - started) / (repeat * len(corpus)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="JSONL file of recorded raw outputs")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    kinds = sorted({r["kind"] for r in corpus}, key=[r["kind"] for r in corpus].index)
+
+    print(f"{'kind':<18} {'n':>3} {'legacy ok':>9} {'repair ok':>9} {'schema ok':>9}")
+    for kind in kinds:
+        records = [r for r in corpus if r["kind"] == kind]
+        legacy = sum(evaluate(legacy_extract, r)[0] for r in records)
+        repaired = [evaluate(extract_json, r) for r in records]
+        print(f"{kind:<18} {len(records):>3} {legacy:>9} {sum(p for p, _, _ in repaired):>9} "
+              f"{sum(v for _, v, _ in repaired):>9}")
+
+    legacy_total = sum(evaluate(legacy_extract, r)[0] for r in corpus)
+    repaired_total = sum(evaluate(extract_json, r)[1] for r in corpus)
+    print(f"\nusable outputs: legacy {legacy_total}/{len(corpus)} -> repair {repaired_total}/{len(corpus)}")
+    print(f"time per output: legacy {time_per_call(legacy_extract, corpus, args.repeat):.1f}µs, "
+          f"repair {time_per_call(extract_json, corpus, args.repeat):.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Prompt size and generation latency: indented JSON vs the compact places table.
+
+    cd backend && python -m benchmarks.prompt_compaction [--places 20 50 100]
+    cd backend && python -m benchmarks.prompt_compaction --ollama --runs 3
+
+Without ``--ollama`` only prompt sizes (chars, estimated tokens) are
+compared. With it, both prompts are sent to the local Ollama model used by
+``app.core.agent`` and the mean wall time per generation is reported.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from app.core import agent
+from app.core.prompt_codec import estimate_tokens
+
+PREFS = {"days": 3, "region": "Quy Nhơn", "budget": "Trung bình", "theme": "ẩm thực", "transport": "xe máy", "people": 2}
+CATEGORIES = ["tourism,tourism.sights", "catering,catering.restaurant", "catering,catering.cafe", "leisure,leisure.park"]
+
+
+def synthetic_places(n: int):
+    return [{
+        "name": f"Địa điểm du lịch số {i}",
+        "address": f"{i} Nguyễn Huệ, Phường Hải Cảng, Quy Nhơn, Bình Định",
+        "category": CATEGORIES[i % len(CATEGORIES)],
+        "rating": 0,
+        "lat": 13.77 + i * 0.0013,
+        "lon": 109.22 - i * 0.0007,
+        "distance_m": 150.0 * i,
+    } for i in range(n)]
+
+
+def prompts(places):
+    fields = {k: PREFS[k] for k in ("days", "region", "budget", "theme", "transport", "people")}
+    before = agent.PROMPT_TMPL.format(nearby_places=json.dumps(places, ensure_ascii=False, indent=2), **fields)
+    table = agent._compact_places(PREFS, places, agent.PROMPT_TMPL.format(nearby_places="", **fields))
+    after = agent.PROMPT_TMPL.format(nearby_places=table, **fields)
+    return before, after
+
+
+def time_generation(prompt: str, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        agent.llm.invoke(prompt)
+        samples.append(time.perf_counter() - started)
+    return statistics.mean(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--places", type=int, nargs="+", default=[20, 50, 100])
+    parser.add_argument("--ollama", action="store_true", help="also time generation on the local model")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'places':>6} {'json chars':>10} {'json tok':>8} {'table chars':>11} {'table tok':>9} {'ratio':>6}")
+    for n in args.places:
+        before, after = prompts(synthetic_places(n))
+        b_tok, a_tok = estimate_tokens(before), estimate_tokens(after)
+        print(f"{n:>6} {len(before):>10} {b_tok:>8} {len(after):>11} {a_tok:>9} {b_tok / a_tok:>5.1f}x")
+
+        if args.ollama:
+            if not agent.OLLAMA_AVAILABLE:
+                raise SystemExit("Ollama/langchain not available")
+            b_s, a_s = time_generation(before, args.runs), time_generation(after, args.runs)
+            print(f"       generation: json {b_s:.1f}s -> table {a_s:.1f}s ({b_s / a_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
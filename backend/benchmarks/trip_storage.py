@@ -0,0 +1,86 @@
+"""
+Write and read latency of the two trip layouts in ``app.services.trip_store``:
+one document per activity vs the itinerary embedded in the trip.
+
+    cd backend && python -m benchmarks.trip_storage [--trips 200] [--days 5] [--per-day 6]
+
+Needs a running MongoDB (``MONGODB_URL``); everything goes to a scratch
+database ``<DATABASE_NAME>_bench`` that is dropped afterwards.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from datetime import date, datetime
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.services.trip_store import COLLECTION, EMBEDDED, load_itinerary, save_itinerary
+
+
+def synthetic_itinerary(days: int, per_day: int):
+    return {"days": [{
+        "day": d,
+        "activities": [{
+            "name": f"Địa điểm {d}.{i}",
+            "type": ("attraction", "restaurant", "hotel")[i % 3],
+            "time": f"{8 + 2 * i:02d}:00",
+            "duration": "2h",
+            "cost": 150000.0,
+            "description": "Tham quan và ăn uống",
+            "location": "Đà Nẵng",
+            "rating": 4.0 + (i % 10) / 10,
+            "coordinates": {"lat": 16.05 + i / 1000, "lng": 108.2 + d / 1000},
+        } for i in range(per_day)],
+    } for d in range(1, days + 1)]}
+
+
+def ms(samples):
+    return f"p50 {statistics.median(samples) * 1000:6.2f}ms  mean {statistics.mean(samples) * 1000:6.2f}ms"
+
+
+async def run(db, mode: str, trips: int, itinerary):
+    write, read = [], []
+    for _ in range(trips):
+        trip_oid = ObjectId()
+        await db.trips.insert_one({"_id": trip_oid, "status": "in_progress", "start_date": datetime(2024, 3, 15),
+                                   "created_at": datetime.utcnow()})
+        started = time.perf_counter()
+        await save_itinerary(db, trip_oid, itinerary, date(2024, 3, 15), mode=mode)
+        write.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        trip = await db.trips.find_one({"_id": trip_oid})
+        await load_itinerary(db, trip)
+        read.append(time.perf_counter() - started)
+    return write, read
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trips", type=int, default=200)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--per-day", type=int, default=6)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    name = os.getenv("DATABASE_NAME", "hackthon") + "_bench"
+    db = client[name]
+    await db.activities.create_index("trip_id")
+    itinerary = synthetic_itinerary(args.days, args.per_day)
+    print(f"{args.trips} trips x {args.days} days x {args.per_day} activities")
+    try:
+        for mode in (COLLECTION, EMBEDDED):
+            write, read = await run(db, mode, args.trips, itinerary)
+            print(f"{mode:<10} write {ms(write)}   read {ms(read)}")
+        print(f"documents: trips {await db.trips.count_documents({})}, "
+              f"activities {await db.activities.count_documents({})}")
+    finally:
+        await client.drop_database(name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
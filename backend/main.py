@@ -6,11 +6,22 @@ from motor.motor_asyncio import AsyncIOMotorClient
 
 import uvicorn
 import os
+import asyncio
 import logging
 
 from dotenv import load_dotenv
 
+# Load environment variables before any app module: caches, queues and
+# schedulers read their settings (CACHE_BACKEND, ...) at import time
+load_dotenv()
+
 from app.database import init_db
+from app.http_client import init_http_clients, close_http_clients
+from app.core.llm_executor import llm_executor
+from app.core.cache import run_cache_janitor
+from app.core.cache_backend import close_redis_client
+from app.core.job_queue import job_queue
+from app.services.ai_service import close_openai_client
 from app.routers import (
     auth, 
     travel_planner, 
@@ -29,9 +40,6 @@ from app.routers import (
 from app.middleware import LoggingMiddleware, RateLimitMiddleware
 from app.utils.logger import setup_logger
 
-# Load environment variables
-load_dotenv()
-
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "hackthon")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
@@ -46,11 +54,26 @@ async def lifespan(app: FastAPI):
     logger.info("Starting AI Travel Planner API...")
     await init_db()
     logger.info("Database initialized successfully")
+    await init_http_clients()
+    cache_janitor = asyncio.create_task(
+        run_cache_janitor(float(os.getenv("CACHE_JANITOR_INTERVAL", "60")))
+    )
+    job_queue.start()
+    trip_job_sweeper = asyncio.create_task(
+        travel_planner.run_trip_job_sweeper(float(os.getenv("TRIP_JOB_SWEEP_INTERVAL", "60")))
+    )
     
     yield
     
     # Shutdown
     logger.info("Shutting down AI Travel Planner API...")
+    cache_janitor.cancel()
+    trip_job_sweeper.cancel()
+    await job_queue.stop()
+    await close_http_clients()
+    await close_redis_client()
+    await close_openai_client()
+    llm_executor.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
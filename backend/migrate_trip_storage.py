@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Move stored itineraries between the two trip layouts (see app/services/trip_store.py).
+
+    python migrate_trip_storage.py --to embedded [--dry-run] [--keep-activities]
+    python migrate_trip_storage.py --to collection      # rollback
+
+Uses MONGODB_URL / DATABASE_NAME (environment or .env) like the app. Only
+trips whose generation has finished are moved - a pending or in-progress
+trip is still written by its job in the configured layout. Trips already in
+the target layout are skipped, so the script can be re-run after an
+interruption.
+"""
+
+import argparse
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.services.trip_store import COLLECTION, EMBEDDED, migrate_trip
+
+FINAL_STATUSES = ["confirmed", "completed", "cancelled", "failed"]
+
+
+def trips_to_migrate(to: str):
+    storage = {"$ne": EMBEDDED} if to == EMBEDDED else EMBEDDED
+    return {"storage": storage, "status": {"$in": FINAL_STATUSES}}
+
+
+async def migrate(to: str, dry_run: bool, keep_activities: bool):
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    db = client[os.getenv("DATABASE_NAME", "hackthon")]
+
+    query = trips_to_migrate(to)
+    total = await db.trips.count_documents(query)
+    print(f"{total} trips to move to '{to}' layout{' (dry run)' if dry_run else ''}")
+
+    moved_trips = moved_activities = 0
+    async for trip in db.trips.find(query):
+        if dry_run:
+            if to == EMBEDDED:
+                count = await db.activities.count_documents({"trip_id": trip["_id"]})
+            else:
+                count = sum(len(day["activities"]) for day in trip.get("days", []))
+            print(f"   {trip['_id']}: {count} activities")
+            continue
+        moved_activities += await migrate_trip(db, trip, to, keep_activities)
+        moved_trips += 1
+        if moved_trips % 100 == 0:
+            print(f"   {moved_trips}/{total}")
+
+    if not dry_run:
+        print(f"Moved {moved_trips} trips ({moved_activities} activities)")
+    client.close()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", choices=(EMBEDDED, COLLECTION), required=True)
+    parser.add_argument("--dry-run", action="store_true", help="only list what would be moved")
+    parser.add_argument("--keep-activities", action="store_true",
+                        help="leave the activities documents in place after embedding")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.to, args.dry_run, args.keep_activities))
+
+
+if __name__ == "__main__":
+    main()
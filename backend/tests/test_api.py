@@ -122,7 +122,7 @@ class TestTravelPlanner:
         )
         assert response.status_code == 200
         data = response.json()
-        assert data["status"] == "success"
+        assert data["status"] == "pending"
         assert "trip_id" in data
 
     def test_create_travel_plan_invalid_dates(self):
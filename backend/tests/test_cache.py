@@ -0,0 +1,166 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.cache import TTLCache
+from app.core.cache_backend import MemoryCacheBackend
+from app.core.singleflight import SingleFlight
+from app.services import smart_suggestions_service
+from app.services.smart_suggestions_service import SmartSuggestionsService
+
+
+class TestTTLCache:
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        cache = TTLCache(maxsize=10, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_byte_bound_and_accounting(self):
+        cache = TTLCache(maxsize=100, ttl=60, max_bytes=250)
+        for i in range(5):
+            cache.set(i, "x" * 100)  # ~102 bytes each as JSON
+        assert len(cache) == 2
+        assert cache.bytes <= 250
+        cache.delete(4)
+        cache.set(3, "y")
+        assert cache.bytes == 3
+
+    def test_purge_expired(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("old", 1, ttl=0)
+        cache.set("new", 2)
+        assert cache.purge_expired() == 1
+        assert len(cache) == 1
+        assert cache.bytes == 1
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_coalesces_concurrent_calls(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        results = await asyncio.gather(*[flight.do("k", work) for _ in range(10)])
+        assert results == ["ok"] * 10
+        assert calls == 1
+        assert flight.stats()["deduplicated"] == 9
+        assert flight.stats()["in_flight"] == 0
+
+        # Finished calls are not reused
+        await flight.do("k", work)
+        assert calls == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("provider down")
+
+        results = await asyncio.gather(*[flight.do("k", fail) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flight.stats()["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelling_one_waiter_keeps_the_call(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return 42
+
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == 42
+        assert flight.stats()["cancelled"] == 0
+
+    @pytest.mark.asyncio
+    async def test_call_cancelled_when_all_waiters_leave(self):
+        flight = SingleFlight()
+        finished = False
+
+        async def work():
+            nonlocal finished
+            await asyncio.sleep(0.05)
+            finished = True
+
+        waiter = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.08)
+        assert not finished
+        assert flight.stats()["cancelled"] == 1
+
+
+class TestSmartSuggestionsCache:
+    @pytest.mark.asyncio
+    async def test_identical_misses_run_one_pipeline(self, monkeypatch):
+        monkeypatch.setattr(smart_suggestions_service, "suggestions_cache", MemoryCacheBackend("test", ttl=60, maxsize=10))
+        service = SmartSuggestionsService()
+        service.cache = smart_suggestions_service.suggestions_cache
+        calls = 0
+
+        async def nearby(**kwargs):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return [{"name": "Bánh xèo Bà Dưỡng", "lat": 16.06, "lon": 108.21}]
+
+        async def enrich(places):
+            return [{**p, "rating": 4.6, "reviews_count": 900, "enriched": True} for p in places]
+
+        service.geoapify_service.get_nearby_places = nearby
+        service.serpapi_service.get_multiple_places_details = enrich
+
+        results = await asyncio.gather(*[
+            service.get_smart_suggestions(16.0600, 108.2100) for _ in range(5)
+        ])
+        assert calls == 1
+        assert all(r["total_found"] == 1 for r in results)
+
+        # A few meters away: served from cache, with the caller's location
+        nearby_result = await service.get_smart_suggestions(16.06001, 108.21001)
+        assert calls == 1
+        assert nearby_result["location"] == {"lat": 16.06001, "lng": 108.21001}
+
+        stats = service.get_cache_stats()
+        assert "cached_keys" not in stats
+        assert stats["hits"] == 1
+        assert stats["bytes"] > 0
+
+
+class TestSuggestionRanking:
+    def test_nearby_places_win_rating_ties(self):
+        service = SmartSuggestionsService()
+        places = [
+            {"name": "far", "lat": 16.10, "lon": 108.21, "rating": 4.5, "reviews_count": 900},
+            {"name": "near", "lat": 16.061, "lon": 108.21, "rating": 4.5, "reviews_count": 10},
+            {"name": "best", "lat": 16.09, "lon": 108.21, "rating": 4.9, "reviews_count": 10},
+            {"name": "low", "lat": 16.06, "lon": 108.21, "rating": 3.0},
+        ]
+        ranked = service._filter_and_sort_places(places, 10, 16.06, 108.21, 5000)
+
+        assert [p["name"] for p in ranked] == ["best", "near", "far"]
+        assert 100 < ranked[1]["distance_m"] < 120
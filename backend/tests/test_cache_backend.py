@@ -0,0 +1,87 @@
+"""
+Cache backends: Redis (via fakeredis) and in-memory behave the same
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from fakeredis import aioredis as fake_aioredis
+
+from app.core.cache_backend import MemoryCacheBackend, RedisCacheBackend, get_cache_backend
+
+
+@pytest.fixture
+def redis_client():
+    return fake_aioredis.FakeRedis()
+
+
+def backends(redis_client):
+    return [
+        MemoryCacheBackend("test", ttl=60),
+        RedisCacheBackend("test", redis_client, ttl=60),
+    ]
+
+
+class TestCacheBackends:
+    @pytest.mark.asyncio
+    async def test_roundtrip_keeps_datetimes(self, redis_client):
+        now = datetime(2026, 10, 18, 9, 30)
+        entry = {"details": {"name": "Eo Gió", "rating": 4.6}, "fresh_until": now, "tags": ["a", "b"]}
+        for backend in backends(redis_client):
+            await backend.set("k", entry)
+            assert await backend.get("k") == entry
+            assert await backend.get("missing") is None
+            assert backend.stats()["hits"] == 1
+            assert backend.stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_batch_get_and_set(self, redis_client):
+        for backend in backends(redis_client):
+            await backend.set_many({"a": 1, "b": [2, 3]})
+            assert await backend.get_many(["a", "missing", "b"]) == [1, None, [2, 3]]
+            assert backend.stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_entries_expire(self, redis_client):
+        for backend in backends(redis_client):
+            await backend.set("k", 1, ttl=0.05)
+            await asyncio.sleep(0.1)
+            assert await backend.get("k") is None
+
+    @pytest.mark.asyncio
+    async def test_clear_only_touches_own_namespace(self, redis_client):
+        mine = RedisCacheBackend("mine", redis_client)
+        other = RedisCacheBackend("other", redis_client)
+        await mine.set("k", 1)
+        await other.set("k", 2)
+        await mine.clear()
+        assert await mine.get("k") is None
+        assert await other.get("k") == 2
+
+    @pytest.mark.asyncio
+    async def test_incr_keeps_window_expiry(self, redis_client):
+        for backend in backends(redis_client):
+            assert [await backend.incr("ip", ttl=60) for _ in range(3)] == [1, 2, 3]
+        assert 0 < await redis_client.ttl("travel:test:ip") <= 60
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_are_misses(self):
+        class DownRedis:
+            async def get(self, key):
+                raise ConnectionError("down")
+
+            async def set(self, *args, **kwargs):
+                raise ConnectionError("down")
+
+            def pipeline(self, **kwargs):
+                raise ConnectionError("down")
+
+        backend = RedisCacheBackend("down", DownRedis())
+        await backend.set("k", 1)
+        assert await backend.get("k") is None
+        assert await backend.incr("ip", ttl=60) is None
+        assert backend.stats()["errors"] == 3
+
+    def test_memory_is_the_default(self, monkeypatch):
+        monkeypatch.delenv("CACHE_BACKEND", raising=False)
+        assert isinstance(get_cache_backend("x"), MemoryCacheBackend)
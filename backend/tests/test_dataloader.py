@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from app.utils.dataloader import DataLoader
+
+
+def recording_loader(values):
+    calls = []
+
+    async def batch(keys):
+        calls.append(list(keys))
+        await asyncio.sleep(0)
+        return {key: values[key] for key in keys if key in values}
+
+    return DataLoader(batch, max_batch_size=3), calls
+
+
+class TestDataLoader:
+    @pytest.mark.asyncio
+    async def test_concurrent_loads_share_one_batch(self):
+        loader, calls = recording_loader({"a": 1, "b": 2})
+        assert await loader.load_many(["a", "b", "a", "missing"]) == [1, 2, 1, None]
+        assert calls == [["a", "b", "missing"]]
+
+        # cached for the loader's lifetime
+        assert await asyncio.gather(loader.load("a"), loader.load("b")) == [1, 2]
+        assert loader.batches == 1
+
+    @pytest.mark.asyncio
+    async def test_batches_are_capped_and_errors_reach_every_caller(self):
+        loader, calls = recording_loader({k: k for k in "abcde"})
+        assert await loader.load_many("abcde") == list("abcde")
+        assert calls == [["a", "b", "c"], ["d", "e"]]
+
+        async def failing(keys):
+            raise RuntimeError("mongo down")
+
+        broken = DataLoader(failing)
+        results = await asyncio.gather(broken.load("x"), broken.load("y"), return_exceptions=True)
+        assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+        # failures are not cached
+        broken.batch_fn = recording_loader({"x": 1})[0].batch_fn
+        assert await broken.load("x") == 1
@@ -0,0 +1,86 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from app.core import agent
+from app.core.day_planner import balanced_kmeans, plan_days
+
+# Three neighbourhoods ~10-20 km apart, 4 places each, listed interleaved
+AREAS = {"Quy Nhơn": (13.77, 109.22), "Nhơn Lý": (13.88, 109.29), "Tuy Phước": (13.83, 109.10)}
+PLACES = [
+    {"name": f"{area} {i}", "lat": lat + i * 0.002, "lon": lon + i * 0.002}
+    for i in range(4) for area, (lat, lon) in AREAS.items()
+]
+
+
+def areas_of(plan):
+    return {p["name"].rsplit(" ", 1)[0] for p in plan["places"]}
+
+
+class TestPlanDays:
+    def test_one_neighbourhood_per_day(self):
+        plans = plan_days(PLACES, 3, start={"lat": 13.77, "lon": 109.22})
+        assert [len(p["places"]) for p in plans] == [4, 4, 4]
+        assert all(len(areas_of(p)) == 1 for p in plans)
+        # Starts next to the trip location
+        assert areas_of(plans[0]) == {"Quy Nhơn"}
+
+    def test_balanced_when_places_are_uneven(self):
+        skewed = PLACES + [{"name": f"Quy Nhơn x{i}", "lat": 13.77, "lon": 109.22 + i * 0.001} for i in range(6)]
+        sizes = [len(p["places"]) for p in plan_days(skewed, 3)]
+        assert max(sizes) - min(sizes) <= 1 and sum(sizes) == len(skewed)
+
+    def test_cluster_sizes_differ_by_at_most_one(self):
+        rng = np.random.default_rng(7)
+        for _ in range(200):
+            n, k = int(rng.integers(2, 60)), int(rng.integers(1, 9))
+            k = min(k, n)
+            sizes = np.bincount(balanced_kmeans(rng.normal(size=(n, 2)) * 1000, k), minlength=k)
+            assert sizes.max() - sizes.min() <= 1 and sizes.sum() == n, (n, k, sizes)
+
+    def test_more_days_than_places(self):
+        plans = plan_days(PLACES[:2], 4)
+        assert [len(p["places"]) for p in plans] == [1, 1, 0, 0]
+        assert plan_days([], 2)[1] == {"day": 2, "center": None, "places": []}
+
+
+class PerDayLLM:
+    def __init__(self, bad_day=None):
+        self.prompts = []
+        self.bad_day = bad_day
+        self.lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self.lock:
+            self.prompts.append(prompt)
+        day = int(prompt.split("NGÀY ", 1)[1].split("/", 1)[0])
+        if day == self.bad_day:
+            return "xin lỗi, không có JSON"
+        activities = [{"time": t, "place": f"Điểm {t}", "desc": ""} for t in ("08:00", "12:00", "15:00")]
+        return json.dumps({"day": day, "title": f"Ngày {day}", "activities": activities, "cost_estimate": 1000000})
+
+
+class TestGenerateByDay:
+    @pytest.mark.asyncio
+    async def test_long_trip_uses_one_small_prompt_per_day(self, monkeypatch):
+        llm = PerDayLLM(bad_day=2)
+        monkeypatch.setattr(agent, "OLLAMA_AVAILABLE", True)
+        monkeypatch.setattr(agent, "llm", llm, raising=False)
+        prefs = {"days": 6, "region": "Bình Định", "budget": "Trung bình", "theme": "biển", "transport": "xe máy", "people": 2}
+
+        plan = await agent.generate_itinerary(prefs, PLACES)
+
+        assert len(llm.prompts) == 6
+        assert all(sum(p["name"] in prompt for p in PLACES) == 2 for prompt in llm.prompts)
+        assert [d["day"] for d in plan["schedule"]] == [1, 2, 3, 4, 5, 6]
+        # Unparseable day falls back to a template built from its own cluster
+        assert plan["schedule"][1]["title"] == "Ngày 2 - Bình Định"
+        assert plan["schedule"][1]["activities"][0]["place"] in {p["name"] for p in PLACES}
+        assert plan["total_cost_estimate"] == "5.000.000đ"
+
+    def test_template_fills_days_from_clusters(self):
+        plan = agent.generate_itinerary_template({"days": 3, "region": "Bình Định"}, PLACES)
+        mornings = [d["activities"][0]["place"].rsplit(" ", 1)[0] for d in plan["schedule"]]
+        assert sorted(mornings) == sorted(AREAS)
@@ -0,0 +1,35 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.db_indexes import HOT_QUERIES, INDEXES, covering_index, create_indexes, index_name, plan_stages
+
+
+def test_every_hot_query_has_a_matching_compound_index():
+    for query in HOT_QUERIES:
+        spec = covering_index(query)
+        assert spec is not None, query
+        assert len(spec["keys"]) == len(query["filter"]) + len(query["sort"])
+    assert covering_index({"collection": "trips", "filter": {"destination": ""}, "sort": [("created_at", -1)]}) is None
+    assert len({(s["collection"], index_name(s["keys"])) for s in INDEXES}) == len(INDEXES)
+
+
+def test_plan_stages():
+    winning_plan = {
+        "stage": "FETCH",
+        "inputStage": {"stage": "IXSCAN", "keyPattern": {"user_id": 1, "created_at": -1}},
+    }
+    assert plan_stages(winning_plan) == {"FETCH", "IXSCAN"}
+    assert "COLLSCAN" in plan_stages({"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}})
+    assert plan_stages({"queryPlan": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}}) \
+        == {"OR", "IXSCAN", "COLLSCAN"}
+    assert index_name([("user_id", 1), ("created_at", -1)]) == "user_id_1_created_at_-1"
+
+
+@pytest.mark.asyncio
+async def test_create_indexes_builds_the_place_cache_ttl_index():
+    # The registry is the only place the TTL index is declared
+    db = AsyncMongoMockClient()["indexes_test"]
+    await create_indexes(db)
+    info = await db.place_details_cache.index_information()
+    assert info["stale_until_1"]["expireAfterSeconds"] == 0
+    assert "user_id_1_created_at_-1" in await db.trips.index_information()
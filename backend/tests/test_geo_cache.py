@@ -0,0 +1,142 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.core.geo import (
+    bbox_mask, distance_matrix_m, distances_from, geohash_encode, geohash_decode,
+    haversine_m, iter_distance_blocks, within_radius,
+)
+from app.core.geo_cache import NearbyPlacesCache, radius_bucket
+from app.core import geo_index
+from app.core.geo_index import GridIndex
+
+
+class TestGeo:
+    def test_geohash_roundtrip(self):
+        assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+        cell = geohash_encode(15.8801, 108.338, 6)
+        lat, lon, dlat, dlon = geohash_decode(cell)
+        assert abs(lat - 15.8801) <= dlat
+        assert abs(lon - 108.338) <= dlon
+
+    def test_haversine(self):
+        # Hà Nội -> TP.HCM is roughly 1140 km
+        d = haversine_m(21.0285, 105.8542, 10.8231, 106.6297)
+        assert 1130_000 < d < 1150_000
+        assert haversine_m(10.0, 106.0, 10.0, 106.0) == 0
+
+
+class TestGeoKernels:
+    rng = np.random.default_rng(7)
+    lats = 16.0 + rng.random(50) * 0.2
+    lons = 108.1 + rng.random(50) * 0.2
+
+    def test_vectorized_matches_scalar(self):
+        d = distances_from(16.05, 108.2, self.lats, self.lons)
+        expected = [haversine_m(16.05, 108.2, a, b) for a, b in zip(self.lats, self.lons)]
+        np.testing.assert_allclose(d, expected, rtol=1e-9)
+
+    def test_matrix_and_blocks(self):
+        m = distance_matrix_m(self.lats[:5], self.lons[:5], self.lats, self.lons)
+        assert m.shape == (5, 50)
+        np.testing.assert_allclose(np.diag(m[:, :5]), 0, atol=1e-6)
+        blocks = np.vstack([b for _, b in iter_distance_blocks(self.lats, self.lons, self.lats, self.lons, chunk_rows=7)])
+        np.testing.assert_allclose(blocks[:5], m)
+
+    def test_bbox_prefilter_keeps_every_point_in_radius(self):
+        d = distances_from(16.1, 108.2, self.lats, self.lons)
+        mask = bbox_mask(16.1, 108.2, 5000, self.lats, self.lons)
+        assert mask[d <= 5000].all()
+
+        idx, dist = within_radius(16.1, 108.2, 5000, self.lats, self.lons)
+        assert set(idx) == set(np.flatnonzero(d <= 5000))
+        assert list(dist) == sorted(dist)
+
+
+class TestNearbyPlacesCache:
+    def places_around(self, lat, lon):
+        return [
+            {"name": f"p{i}", "lat": lat + i * 0.002, "lon": lon}
+            for i in range(10)
+        ]
+
+    def test_radius_bucket(self):
+        assert radius_bucket(4000) == 5000
+        assert radius_bucket(5000) == 5000
+        assert radius_bucket(99999) == 99999
+
+    @pytest.mark.asyncio
+    async def test_nearby_users_share_one_provider_call(self):
+        cache = NearbyPlacesCache("test_nearby", precision=6)
+        calls = []
+
+        async def fetch(lat, lon, radius, limit):
+            calls.append((lat, lon, radius, limit))
+            return self.places_around(16.0544, 108.2022)
+
+        first = await cache.get_or_fetch(16.0544, 108.2022, ["catering.cafe"], 1000, 5, fetch)
+        # ~20 m away, same geohash cell
+        second = await cache.get_or_fetch(16.0545, 108.2023, ["catering.cafe"], 1000, 5, fetch)
+
+        assert len(calls) == 1
+        # Superset is fetched around the cell center with a padded radius
+        assert calls[0][2] > 1000 and calls[0][3] >= 100
+        assert [p["name"] for p in first] == ["p0", "p1", "p2", "p3", "p4"]
+        assert all(p["distance_m"] <= 1000 for p in second)
+        assert second[0]["distance_m"] < second[-1]["distance_m"]
+
+    @pytest.mark.asyncio
+    async def test_filters_by_exact_distance(self):
+        cache = NearbyPlacesCache("test_nearby_exact")
+
+        async def fetch(lat, lon, radius, limit):
+            return self.places_around(16.0544, 108.2022)
+
+        places = await cache.get_or_fetch(16.0544, 108.2022, ["a"], 500, 20, fetch)
+        # Points are 0.002° (~222 m) apart: only p0..p2 are within 500 m
+        assert [p["name"] for p in places] == ["p0", "p1", "p2"]
+
+    @pytest.mark.asyncio
+    async def test_category_set_is_part_of_key(self):
+        cache = NearbyPlacesCache("test_nearby_keys")
+        assert cache.key(16.05, 108.2, ["b", "a"], 900) == cache.key(16.05, 108.2, ["a", "b"], 1000)
+        assert cache.key(16.05, 108.2, ["a"], 1000) != cache.key(16.05, 108.2, ["a", "b"], 1000)
+
+
+class TestGridIndex:
+    def test_nearest_within_radius(self):
+        index = GridIndex(cell_m=100)
+        index.add("a", 16.0544, 108.2022, "A")
+        index.add("b", 16.0560, 108.2022, "B")  # ~180 m north
+
+        distance, value = index.nearest(16.0545, 108.2022, 50)
+        assert value == "A" and distance < 15
+        # Searches neighbouring cells, not just the query's own
+        assert index.nearest(16.0555, 108.2022, 120)[1] == "B"
+        assert index.nearest(16.0600, 108.2022, 100) is None
+        assert index.stats()["hits"] == 2 and index.stats()["misses"] == 1
+
+    def test_bounded_and_replaces_by_key(self):
+        index = GridIndex(maxsize=2)
+        index.add("a", 16.0, 108.0, 1)
+        index.add("a", 16.1, 108.1, 2)
+        assert len(index) == 1
+        assert index.nearest(16.0, 108.0, 50) is None
+        index.add("b", 16.2, 108.2, 3)
+        index.add("c", 16.3, 108.3, 4)
+        assert len(index) == 2 and index.stats()["evictions"] == 1
+
+    def test_lru_eviction_and_ttl(self, monkeypatch):
+        index = GridIndex(maxsize=2, ttl=60)
+        index.add("a", 16.0, 108.0, 1)
+        index.add("b", 16.2, 108.2, 2)
+        assert index.nearest(16.0, 108.0, 50)[1] == 1  # "a" is now the most recent
+        index.add("c", 16.3, 108.3, 3)
+        assert index.nearest(16.2, 108.2, 50) is None and index.nearest(16.0, 108.0, 50)[1] == 1
+
+        later = time.monotonic() + 61
+        monkeypatch.setattr(geo_index.time, "monotonic", lambda: later)
+        assert index.nearest(16.0, 108.0, 50) is None
+        assert index.purge_expired() == 1 and len(index) == 0
+        assert index.stats()["expired"] == 2
@@ -0,0 +1,176 @@
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.services import geoapify_service
+from app.services.geoapify_service import GeoapifyService
+
+ADDRESS = {"features": [{"properties": {"formatted": "Eo Gió, Quy Nhơn", "city": "Quy Nhơn"}}]}
+ROUTE = {"features": [{
+    "properties": {"distance": 4200, "time": 600},
+    "geometry": {"coordinates": [[109.219, 13.782], [109.225, 13.79]]},
+}]}
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def empty_geocode_caches():
+    await geoapify_service.geocode_cache.clear()
+    await geoapify_service.matrix_cache.clear()
+    geoapify_service.address_index.clear()
+    yield
+
+
+def slow_service(status=200, delay=0.1):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        await asyncio.sleep(delay)
+        if status != 200:
+            return httpx.Response(status)
+        return httpx.Response(200, json=ROUTE if "routing" in request.url.path else ADDRESS)
+
+    service = GeoapifyService(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    service.api_key = "test"
+    return service, calls
+
+
+class TestRequestCoalescing:
+    @pytest.mark.asyncio
+    async def test_identical_reverse_geocodes_share_one_call(self):
+        service, calls = slow_service()
+        before = geoapify_service.geoapify_flight.stats()["deduplicated"]
+
+        results = await asyncio.gather(*[service.reverse_geocode(13.7821, 109.2191) for _ in range(10)])
+
+        assert len(calls) == 1
+        assert all(r["formatted"] == "Eo Gió, Quy Nhơn" for r in results)
+        assert geoapify_service.geoapify_flight.stats()["deduplicated"] - before == 9
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter_and_are_not_kept(self):
+        service, calls = slow_service(status=500)
+
+        results = await asyncio.gather(*[service.reverse_geocode(13.9, 109.1) for _ in range(3)])
+        assert len(calls) == 1
+        assert all(r == service._get_mock_address() for r in results)
+
+        await service.reverse_geocode(13.9, 109.1)
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        service, calls = slow_service(delay=0.2)
+        waypoints = [{"lat": 13.7823, "lon": 109.2193}, {"lat": 13.79, "lon": 109.225}]
+
+        first = asyncio.create_task(service.get_route(waypoints))
+        second = asyncio.create_task(service.get_route(waypoints))
+        await asyncio.sleep(0.05)
+        first.cancel()
+
+        route = await second
+        assert route["distance_m"] == 4200
+        assert len(calls) == 1
+
+
+class TestReverseGeocodeCache:
+    @pytest.mark.asyncio
+    async def test_repeated_fix_is_served_from_cache(self):
+        service, calls = slow_service(delay=0)
+        await service.reverse_geocode(13.782101, 109.219101)
+        again = await service.reverse_geocode(13.782104, 109.219099)  # same 5-decimal cell
+
+        assert len(calls) == 1
+        assert again["formatted"] == "Eo Gió, Quy Nhơn"
+        assert (again["lat"], again["lon"]) == (13.782104, 109.219099)
+        assert "approximate" not in again
+
+    @pytest.mark.asyncio
+    async def test_nearby_fix_uses_nearest_known_address(self):
+        service, calls = slow_service(delay=0)
+        await service.reverse_geocode(13.7821, 109.2191)
+
+        near = await service.reverse_geocode(13.7822, 109.2192)  # ~15 m away
+        assert len(calls) == 1
+        assert near["approximate"] is True
+        assert 10 < near["distance_m"] < 20
+
+        await service.reverse_geocode(13.7841, 109.2191)  # ~220 m away
+        assert len(calls) == 2
+
+
+def matrix_service():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        parse = lambda s: [tuple(map(float, p.split(","))) for p in s.split("|")]
+        sources, targets = parse(request.url.params["sources"]), parse(request.url.params["targets"])
+        calls.append((len(sources), len(targets)))
+        return httpx.Response(200, json={"sources_to_targets": [
+            {"targets": [{"time": round(abs(s[0] - t[0]) * 1e5)} for t in targets]} for s in sources
+        ]})
+
+    service = GeoapifyService(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    service.api_key = "test"
+    return service, calls
+
+
+STOPS = [{"lat": 13.78 + i * 0.01, "lon": 109.21 + i * 0.001} for i in range(5)]
+
+
+class TestDistanceMatrixCache:
+    @pytest.mark.asyncio
+    async def test_appending_a_stop_fetches_only_new_cells(self):
+        service, calls = matrix_service()
+        first = await service.get_distance_matrix(STOPS[:4], STOPS[:4])
+        second = await service.get_distance_matrix(STOPS, STOPS)
+
+        assert calls == [(4, 4), (1, 5), (4, 1)]
+        assert [row[:4] for row in second[:4]] == first
+        assert second[4][0] == 4000
+
+        await service.get_distance_matrix(STOPS[1:3], STOPS[::-1])
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_walk_mode_reuses_reverse_pairs(self):
+        service, calls = matrix_service()
+        forward = await service.get_distance_matrix(STOPS[:2], STOPS[2:], mode="walk")
+        backward = await service.get_distance_matrix(STOPS[2:], STOPS[:2], mode="walk")
+
+        assert calls == [(2, 3)]
+        assert backward == [list(col) for col in zip(*forward)]
+        await service.get_distance_matrix(STOPS[2:], STOPS[:2], mode="drive")
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_unreachable_pairs_are_cached(self):
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            return httpx.Response(200, json={"sources_to_targets": [
+                {"targets": [{"time": 0}, {"time": None}]}, {"targets": [{"time": 250}, {"time": 0}]},
+            ]})
+
+        service = GeoapifyService(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        service.api_key = "test"
+        first = await service.get_distance_matrix(STOPS[:2], STOPS[:2])
+        second = await service.get_distance_matrix(STOPS[:2], STOPS[:2])
+
+        assert first == second == [[0, None], [250, 0]]
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_large_or_requested_estimates_stay_local(self, monkeypatch):
+        service, calls = matrix_service()
+        estimate = await service.get_distance_matrix(STOPS[:1], STOPS[1:2], mode="walk", estimate=True)
+        # ~1.1 km straight line at walking speed with detour factor: ~18 min
+        assert 900 < estimate[0][0] < 1300
+
+        monkeypatch.setattr(geoapify_service, "MATRIX_EXACT_MAX_CELLS", 10)
+        matrix = await service.get_distance_matrix(STOPS, STOPS)
+        assert len(matrix) == 5 and matrix[0][0] == 0
+        assert calls == []
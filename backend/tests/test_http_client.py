@@ -0,0 +1,47 @@
+import pytest
+import httpx
+
+from app.http_client import HTTPClients
+from app.services.geoapify_service import GeoapifyService
+
+
+class TestHTTPClients:
+    def test_client_is_reused_per_provider(self):
+        clients = HTTPClients()
+        assert clients.get("geoapify") is clients.get("geoapify")
+        assert clients.get("geoapify") is not clients.get("serpapi")
+
+    def test_provider_limits(self, monkeypatch):
+        monkeypatch.setenv("HTTP_MAX_CONNECTIONS_SERPAPI", "3")
+        clients = HTTPClients()
+        clients.get("serpapi")
+        stats = clients.stats()["providers"]["serpapi"]
+        assert stats["max_connections"] == 3
+        assert stats["requests_total"] == 0
+
+    @pytest.mark.asyncio
+    async def test_close_clears_clients(self):
+        clients = HTTPClients()
+        client = clients.get("geoapify")
+        await clients.close()
+        assert client.is_closed
+        assert clients.stats()["providers"] == {}
+
+
+class TestServiceInjection:
+    @pytest.mark.asyncio
+    async def test_geoapify_uses_injected_client(self):
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            return httpx.Response(200, json={"features": [{
+                "properties": {"formatted": "Quy Nhơn", "city": "Quy Nhơn"}
+            }]})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            service = GeoapifyService(http_client=client)
+            address = await service.reverse_geocode(13.78, 109.22)
+
+        assert calls == ["/v1/geocode/reverse"]
+        assert address["city"] == "Quy Nhơn"
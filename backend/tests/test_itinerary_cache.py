@@ -0,0 +1,108 @@
+import httpx
+import pytest
+import pytest_asyncio
+
+from main import app
+from app.core import agent
+from app.core.itinerary_cache import ItineraryCache, places_fingerprint
+from app.routers import itinerary_new
+
+PREFS = {"budget": "Trung bình", "days": 3, "region": "Đà Nẵng", "theme": "Ẩm thực", "transport": "xe máy", "people": 2}
+PLACES = [
+    {"name": "Chợ Hàn", "lat": 16.0678, "lon": 108.2244},
+    {"name": "Bà Nà Hills", "lat": 15.9977, "lon": 107.9881},
+]
+
+
+class TestItineraryCache:
+    def test_key_ignores_case_diacritics_and_nearby_locations(self):
+        cache = ItineraryCache("test_itinerary_key")
+        same = {**PREFS, "region": " da nang ", "theme": "am thuc"}
+        assert cache.key(PREFS, 16.0544, 108.2022) == cache.key(same, 16.0550, 108.2030)
+        assert cache.key(PREFS, 16.0544, 108.2022) != cache.key({**PREFS, "days": 4}, 16.0544, 108.2022)
+        assert cache.key(PREFS, 16.0544, 108.2022) != cache.key(PREFS, 10.7769, 106.7009)
+        assert places_fingerprint(PLACES) == places_fingerprint(PLACES[::-1])
+
+    @pytest.mark.asyncio
+    async def test_variants_and_hit_ratio(self, monkeypatch):
+        cache = ItineraryCache("test_itinerary_variants", variants=2, refresh_prob=0.5)
+        key = cache.key(PREFS)
+        assert await cache.get(key) is None
+        await cache.put(key, {"overview": "A"})
+
+        monkeypatch.setattr("app.core.itinerary_cache.random.random", lambda: 0.1)
+        assert await cache.get(key) is None  # pool not full: regenerate
+        await cache.put(key, {"overview": "B"})
+        # Pool full: always a hit, any variant, never the stored object itself
+        plans = [await cache.get(key) for _ in range(20)]
+        assert {p["overview"] for p in plans} <= {"A", "B"}
+        plans[0]["overview"] = "changed"
+        assert (await cache.get(key))["overview"] in {"A", "B"}
+
+        stats = cache.stats()
+        assert stats["hits"] == 21 and stats["misses"] == 2 and stats["refreshes"] == 1
+        assert stats["hit_ratio"] == pytest.approx(21 / 23)
+
+    @pytest.mark.asyncio
+    async def test_changed_places_invalidate_entry(self):
+        cache = ItineraryCache("test_itinerary_stale", refresh_prob=0.0)
+        key = cache.key(PREFS)
+        await cache.put(key, {"overview": "A"}, places_fingerprint(PLACES))
+        assert await cache.get(key, places_fingerprint(PLACES)) is not None
+        assert await cache.get(key, places_fingerprint(PLACES[:1])) is None
+        assert await cache.get(key, places_fingerprint(PLACES)) is None  # entry was dropped
+        assert cache.stats()["stale"] == 1
+
+
+@pytest_asyncio.fixture
+async def counting_agent(monkeypatch):
+    await itinerary_new.itinerary_cache.clear()
+    monkeypatch.setattr(itinerary_new.itinerary_cache, "refresh_prob", 0.0)
+    calls = []
+
+    async def places(**kwargs):
+        return PLACES
+
+    async def generate(prefs, nearby):
+        calls.append(prefs)
+        # Template content standing in for real model output
+        plan = agent.generate_itinerary_template(prefs, nearby)
+        plan.pop("fallback")
+        for day in plan["schedule"]:
+            day.pop("fallback")
+        return plan
+
+    monkeypatch.setattr(itinerary_new, "get_nearby_places", places)
+    monkeypatch.setattr(itinerary_new, "generate_itinerary", generate)
+    yield calls
+    await itinerary_new.itinerary_cache.clear()
+
+
+class TestGenerateUsesCache:
+    @pytest.mark.asyncio
+    async def test_repeated_request_is_served_from_cache(self, counting_agent):
+        payload = {"preferences": PREFS, "location": {"lat": 16.0544, "lon": 108.2022}}
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            first = await client.post("/api/itinerary/generate", json=payload)
+            second = await client.post("/api/itinerary/generate", json=payload)
+
+        assert len(counting_agent) == 1
+        assert first.json()["meta"]["cached"] is False
+        assert second.json()["meta"]["cached"] is True
+        assert second.json()["data"] == first.json()["data"]
+
+    @pytest.mark.asyncio
+    async def test_template_fallback_is_not_cached(self, counting_agent, monkeypatch):
+        async def model_down(prefs, nearby):
+            counting_agent.append(prefs)
+            return agent.generate_itinerary_template(prefs, nearby)
+
+        monkeypatch.setattr(itinerary_new, "generate_itinerary", model_down)
+        payload = {"preferences": PREFS, "location": {"lat": 16.0544, "lon": 108.2022}}
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            first = await client.post("/api/itinerary/generate", json=payload)
+            second = await client.post("/api/itinerary/generate", json=payload)
+
+        assert first.json()["meta"]["fallback"] is True
+        assert second.json()["meta"]["cached"] is False
+        assert len(counting_agent) == 2
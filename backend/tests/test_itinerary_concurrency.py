@@ -0,0 +1,79 @@
+"""
+Regression benchmark: concurrent /api/itinerary/generate calls must not
+serialize behind a slow Geoapify response.
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from main import app
+from app.core import agent, geo_utils
+from app.routers import itinerary_new
+
+PROVIDER_DELAY = 0.3
+CONCURRENCY = 8
+
+PAYLOAD = {
+    "preferences": {
+        "budget": "Trung bình", "days": 2, "region": "Quy Nhơn",
+        "theme": "ẩm thực", "transport": "xe máy", "people": 2,
+    },
+    "location": {"lat": 13.782, "lon": 109.219},
+}
+
+
+def slow_geoapify(delay: float) -> httpx.AsyncClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={"features": [{
+            "properties": {"name": "Eo Gió", "categories": ["tourism.sights"]},
+            "geometry": {"coordinates": [109.225, 13.79]},
+        }]})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def empty_nearby_cache():
+    await geo_utils.nearby_cache.clear()
+    yield
+    await geo_utils.nearby_cache.clear()
+
+
+@pytest.fixture
+def template_agent(monkeypatch):
+    async def fake_generate(prefs, places):
+        return agent.generate_itinerary_template(prefs, places)
+    monkeypatch.setattr(itinerary_new, "generate_itinerary", fake_generate)
+
+
+class TestGenerateConcurrency:
+    @pytest.mark.asyncio
+    async def test_concurrent_generate_calls_overlap(self, monkeypatch, template_agent):
+        provider = slow_geoapify(PROVIDER_DELAY)
+        monkeypatch.setattr(geo_utils, "get_http_client", lambda name: provider)
+
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            started = time.perf_counter()
+            responses = await asyncio.gather(*[
+                client.post("/api/itinerary/generate", json=PAYLOAD)
+                for _ in range(CONCURRENCY)
+            ])
+            elapsed = time.perf_counter() - started
+
+        assert all(r.status_code == 200 for r in responses)
+        assert all(r.json()["meta"]["nearby_count"] == 1 for r in responses)
+        # Serialized calls would take CONCURRENCY * PROVIDER_DELAY (2.4s)
+        assert elapsed < PROVIDER_DELAY * CONCURRENCY / 2
+
+    @pytest.mark.asyncio
+    async def test_nearby_lookup_respects_timeout_budget(self):
+        provider = slow_geoapify(2.0)
+        started = time.perf_counter()
+        places = await geo_utils.get_nearby_places(
+            13.782, 109.219, PAYLOAD["preferences"], timeout=0.1, client=provider
+        )
+        assert places == []
+        assert time.perf_counter() - started < 1.0
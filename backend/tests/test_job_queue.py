@@ -0,0 +1,198 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core.job_queue import DONE, FAILED, PENDING, JobQueue, JobQueueFullError
+from app.core.llm_executor import LLMOverloadedError
+from app.core.llm_scheduler import BATCH
+from app.routers import travel_planner, websocket
+
+
+@pytest.fixture
+def queue():
+    return JobQueue(workers=1, maxsize=2)
+
+
+class TestJobQueue:
+    @pytest.mark.asyncio
+    async def test_submit_returns_pending_and_reports_progress(self, queue):
+        events = []
+        release = asyncio.Event()
+
+        async def handler(job, report):
+            await release.wait()
+            await report("generating", 0.5)
+            return {"days": job.payload["days"]}
+
+        async def listener(job):
+            events.append((job.status, job.stage, job.progress))
+
+        queue.register("plan", handler)
+        queue.subscribe(listener)
+        job = await queue.submit("plan", {"days": 3}, job_id="trip-1", owner="u1")
+        assert job.status == PENDING and queue.get("trip-1") is job
+
+        release.set()
+        await queue.join()
+        assert job.status == DONE and job.result == {"days": 3}
+        assert events == [
+            ("pending", "queued", 0.0),
+            ("running", "started", 0.0),
+            ("running", "generating", 0.5),
+            ("done", "done", 1.0),
+        ]
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_failures_and_full_queue(self, queue):
+        blocker = asyncio.Event()
+
+        async def handler(job, report):
+            await blocker.wait()
+            raise RuntimeError("LLM down")
+
+        queue.register("plan", handler)
+        jobs = [await queue.submit("plan", {})]
+        await asyncio.sleep(0)  # worker picks it up
+        jobs += [await queue.submit("plan", {}) for _ in range(2)]
+        with pytest.raises(JobQueueFullError):
+            await queue.submit("plan", {})
+        with pytest.raises(ValueError):
+            await queue.submit("unknown", {})
+
+        blocker.set()
+        await queue.join()
+        assert all(j.status == FAILED and j.error == "LLM down" for j in jobs)
+        assert queue.stats()["failed"] == 3 and queue.stats()["rejected"] == 1
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_updates_are_pushed_to_the_owner_socket(self, monkeypatch, queue):
+        sent = []
+
+        async def send(message, user_id):
+            sent.append((user_id, message["type"], message["status"]))
+
+        async def handler(job, report):
+            return None
+
+        monkeypatch.setattr(websocket.manager, "send_personal_message", send)
+        queue.register("plan", handler)
+        queue.subscribe(websocket.forward_job_update)
+        await queue.submit("plan", {}, owner="u1")
+        await queue.join()
+        assert sent[0] == ("u1", "job_update", "pending") and sent[-1] == ("u1", "job_update", "done")
+        await queue.stop()
+
+
+@pytest_asyncio.fixture
+async def trip_jobs(monkeypatch):
+    """travel_planner job handler and sweeper on an in-memory Mongo and a private queue"""
+    db = AsyncMongoMockClient()["trips_test"]
+    queue = JobQueue(workers=1, maxsize=10)
+    queue.register(travel_planner.TRIP_PLAN_JOB, travel_planner.generate_trip_plan)
+    monkeypatch.setattr(travel_planner, "get_database", lambda: db)
+    monkeypatch.setattr(travel_planner, "job_queue", queue)
+    yield db, queue
+    await queue.stop()
+
+
+def stored_trip(age: float = 0, **fields):
+    at = datetime.utcnow() - timedelta(seconds=age)
+    return {
+        "_id": ObjectId(), "user_id": "u1", "destination": "Huế", "total_days": 2, "people": 2,
+        "budget": "medium", "travel_style": "comfort", "interests": [], "status": "pending",
+        "created_at": at, "updated_at": at, **fields,
+    }
+
+
+class TestTripPlanRecovery:
+    @pytest.mark.asyncio
+    async def test_shutdown_returns_trip_to_pending_and_errors_fail_it(self, trip_jobs, monkeypatch):
+        db, queue = trip_jobs
+        started = asyncio.Event()
+
+        async def slow(self, *args):
+            started.set()
+            await asyncio.sleep(3600)
+
+        monkeypatch.setattr(travel_planner.AITravelPlannerService, "generate_itinerary", slow)
+        trip = stored_trip()
+        await db.trips.insert_one(trip)
+        await travel_planner.submit_trip_plan(trip, "u1")
+        await started.wait()
+        assert (await db.trips.find_one({"_id": trip["_id"]}))["status"] == "in_progress"
+        await queue.stop()
+        assert (await db.trips.find_one({"_id": trip["_id"]}))["status"] == "pending"
+
+        async def broken(self, *args):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(travel_planner.AITravelPlannerService, "generate_itinerary", broken)
+        await travel_planner.submit_trip_plan(trip, "u1")
+        await queue.join()
+        assert (await db.trips.find_one({"_id": trip["_id"]}))["status"] == "failed"
+
+    @pytest.mark.asyncio
+    async def test_sweeper_requeues_stale_trips_once(self, trip_jobs, monkeypatch):
+        db, queue = trip_jobs
+        generated = []
+
+        async def generate(self, trip_data, trip_id, *args):
+            generated.append(trip_id)
+            return {"days": []}
+
+        monkeypatch.setattr(travel_planner.AITravelPlannerService, "generate_itinerary", generate)
+        lost = stored_trip(age=600, status="in_progress", job_token="old")
+        expired = stored_trip(age=travel_planner.TRIP_JOB_MAX_AGE + 1)
+        fresh = stored_trip()
+        await db.trips.insert_many([lost, expired, fresh])
+
+        assert await travel_planner.requeue_stale_trips() == {"requeued": 1, "failed": 1}
+        await queue.join()
+        assert generated == [str(lost["_id"])]
+        statuses = {t["_id"]: t["status"] async for t in db.trips.find()}
+        assert statuses == {lost["_id"]: "confirmed", expired["_id"]: "failed", fresh["_id"]: "pending"}
+
+        # A job queued under the replaced token does nothing
+        stale_job = await queue.submit(
+            travel_planner.TRIP_PLAN_JOB, {"trip_oid": fresh["_id"], "token": "old", "trip_data": {}, "language": "vi"}
+        )
+        await queue.join()
+        assert stale_job.result == {"trip_id": stale_job.id, "skipped": True}
+
+    @pytest.mark.asyncio
+    async def test_batch_lane_and_waiting_out_overload(self, trip_jobs, monkeypatch):
+        db, queue = trip_jobs
+        priorities, stages = [], []
+
+        async def busy_twice(self, trip_data, trip_id, language, priority):
+            priorities.append(priority)
+            if len(priorities) <= 2:
+                raise LLMOverloadedError(32, retry_after=0)
+            return {"days": []}
+
+        async def listener(job):
+            stages.append(job.stage)
+
+        monkeypatch.setattr(travel_planner.AITravelPlannerService, "generate_itinerary", busy_twice)
+        queue.subscribe(listener)
+        trip = stored_trip()
+        await db.trips.insert_one(trip)
+        job = await travel_planner.submit_trip_plan(trip, "u1")
+        await queue.join()
+        assert job.status == DONE
+        assert priorities == [BATCH] * 3
+        assert stages.count("waiting") == 2
+        assert (await db.trips.find_one({"_id": trip["_id"]}))["status"] == "confirmed"
+
+        monkeypatch.setattr(travel_planner, "TRIP_JOB_OVERLOAD_RETRIES", 0)
+        priorities.clear()
+        await db.trips.update_one({"_id": trip["_id"]}, {"$set": {"status": "pending"}})
+        await travel_planner.submit_trip_plan(trip, "u1")
+        await queue.join()
+        assert (await db.trips.find_one({"_id": trip["_id"]}))["status"] == "failed"
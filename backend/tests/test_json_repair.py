@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from app.core import agent
+from app.core.json_repair import close_truncated, coerce_activity, coerce_itinerary, extract_json
+
+PLAN = {
+    "overview": "2 ngày ở Hội An {phố cổ}",
+    "schedule": [
+        {"day": 1, "title": "Phố cổ", "activities": [
+            {"time": "08:00", "place": "Chùa Cầu", "desc": "Dạo \"phố\" cổ }"},
+            {"time": "12:00", "place": "Cơm gà Bà Buội", "desc": "Ăn trưa"},
+        ]},
+        {"day": 2, "title": "Biển", "activities": [
+            {"time": "09:00", "place": "An Bàng", "desc": "Tắm biển"},
+        ]},
+    ],
+    "total_cost_estimate": "3.000.000đ",
+}
+RAW = json.dumps(PLAN, ensure_ascii=False, indent=2)
+
+
+class TestExtractJson:
+    def test_prose_fences_and_trailing_commentary(self):
+        text = f"Đây là lịch trình {{gợi ý}}:\n```json\n{RAW}\n```\nChúc bạn vui vẻ! {{:)}}"
+        assert extract_json(text) == PLAN
+
+    def test_trailing_commas(self):
+        text = RAW.replace('"Ăn trưa"', '"Ăn trưa",').replace('"Tắm biển"\n      }', '"Tắm biển"\n      },')
+        assert extract_json(text) == PLAN
+
+    def test_truncated_output_keeps_complete_days(self):
+        cut = RAW[:RAW.index("An Bàng") + 3]
+        plan = extract_json("Kết quả: " + cut)
+        assert plan["overview"] == PLAN["overview"]
+        assert plan["schedule"][0] == PLAN["schedule"][0]
+        assert plan["schedule"][1]["activities"] == [{"time": "09:00"}]
+        assert close_truncated('{"a": [1, 2, {"b": "x') == '{"a": [1, 2, {}]}'
+
+    def test_no_json(self):
+        with pytest.raises(ValueError):
+            extract_json("Xin lỗi, tôi không thể giúp.")
+
+
+class TestCoerceItinerary:
+    def test_key_variants_are_mapped_onto_the_schema(self):
+        data = {
+            "summary": "Đà Lạt",
+            "days": [{"day_number": "1", "items": [
+                {"start": "8h30", "name": "Hồ Xuân Hương", "description": "Đi dạo", "cost": "50.000đ"},
+                {"time": 14, "location": "Chợ Đà Lạt"},
+                {"time": "18:00"},  # no place: dropped
+            ]}],
+            "total_cost": 1500000,
+        }
+        plan = coerce_itinerary(data)
+        day = plan["schedule"][0]
+        assert plan["overview"] == "Đà Lạt" and plan["total_cost_estimate"] == "1.500.000đ"
+        assert day["day"] == 1 and day["title"] == "Ngày 1"
+        assert [(a["time"], a["place"], a["desc"]) for a in day["activities"]] == [
+            ("08:30", "Hồ Xuân Hương", "Đi dạo"), ("14:00", "Chợ Đà Lạt", ""),
+        ]
+        assert day["activities"][0]["cost"] == 50000.0
+
+    @pytest.mark.parametrize("raw, cost", [
+        ("4.500.000đ", 4500000.0),
+        ("$12.50", 12.5),
+        ("1,5 triệu", 1500000.0),
+        ("1.234,5 USD", 1234.5),
+        ("200k", 200000.0),
+        ("2 trăm nghìn", 200000.0),
+        ("3tr/người", 3000000.0),
+        ("Miễn phí", 0.0),
+        (120000, 120000.0),
+        ("2-3 trăm nghìn", None),
+        ("100.000 - 150.000 VND", None),
+        ("1 triệu 500 nghìn", None),
+        ("12,5.3", None),
+        ("tùy", None),
+    ])
+    def test_costs_are_parsed_not_digit_joined(self, raw, cost):
+        assert coerce_activity({"place": "Chợ Hàn", "cost": raw})["cost"] == cost
+
+    def test_agent_accepts_repaired_output(self, monkeypatch):
+        monkeypatch.setattr(agent, "MIN_ACTIVITIES_PER_DAY", 1)
+        raw = "Chắc chắn rồi!\n" + RAW.replace('"Ăn trưa"', '"Ăn trưa",') + "\nHy vọng bạn thích."
+        plan = agent._validate_itinerary(raw.replace('"activities"', '"items"'), days=1)
+        assert [len(d["activities"]) for d in plan["schedule"]] == [2, 1]
+        with pytest.raises(ValueError):
+            agent._validate_itinerary(raw, days=3)
@@ -0,0 +1,113 @@
+import json
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from main import app
+from app.core import agent, geo_utils
+from app.core.json_stream import JSONArrayStreamParser
+
+PLAN = {
+    "overview": "2 ngày ở Quy Nhơn",
+    "schedule": [
+        {"day": 1, "title": "Biển {xanh}", "activities": [
+            {"time": "08:00", "place": "Eo Gió", "desc": "Ngắm \"bình minh\" ]"},
+        ]},
+        {"day": 2, "title": "Phố cổ", "activities": [
+            {"time": "09:00", "place": "Tháp Đôi", "desc": "Tham quan", "tags": ["a", "b"]},
+        ]},
+    ],
+    "total_cost_estimate": "2.000.000 VND",
+}
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeStreamingLLM:
+    """Yields the plan a few characters at a time, like Ollama token streaming"""
+
+    def __init__(self, text, delay=0.0):
+        self.text = text
+        self.delay = delay
+
+    def stream(self, prompt):
+        for piece in chunks(self.text, 7):
+            time.sleep(self.delay)
+            yield piece
+
+
+class TestJSONArrayStreamParser:
+    @pytest.mark.parametrize("size", [1, 5, 64, 10_000])
+    def test_items_are_emitted_whole_for_any_chunking(self, size):
+        text = "Đây là lịch trình của bạn:\n```json\n" + json.dumps(PLAN, ensure_ascii=False) + "\n```"
+        parser = JSONArrayStreamParser("schedule")
+        items = [item for piece in chunks(text, size) for item in parser.feed(piece)]
+
+        assert items == PLAN["schedule"]
+        assert parser.items_emitted == 2 and parser.errors == 0
+        assert json.loads(parser.document.rsplit("}", 1)[0] + "}") == PLAN
+
+    def test_day_is_available_before_the_document_ends(self):
+        text = json.dumps(PLAN)
+        first_end = text.index('"day": 2') - 2  # just past day 1's closing brace
+        parser = JSONArrayStreamParser("schedule")
+        assert [d["day"] for d in parser.feed(text[:first_end])] == [1]
+        assert [d["day"] for d in parser.feed(text[first_end:])] == [2]
+
+    def test_other_keys_and_broken_items(self):
+        parser = JSONArrayStreamParser("days")
+        items = parser.feed('{"schedule": [{"day": 9}], "days": [{"day": 1}, {"day": 2,,}, {"day": 3}]}')
+        assert items == [{"day": 1}, {"day": 3}]
+        assert parser.errors == 1
+
+
+@pytest_asyncio.fixture
+async def streaming_llm(monkeypatch):
+    await geo_utils.nearby_cache.clear()
+
+    async def no_places(**kwargs):
+        return []
+    monkeypatch.setattr("app.routers.itinerary_new.get_nearby_places", no_places)
+    monkeypatch.setattr(agent, "OLLAMA_AVAILABLE", True)
+    fake = FakeStreamingLLM("Chắc chắn rồi! " + json.dumps(PLAN, ensure_ascii=False), delay=0.01)
+    monkeypatch.setattr(agent, "llm", fake)
+    return fake
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestItineraryStream:
+    @pytest.mark.asyncio
+    async def test_days_are_yielded_before_done(self, streaming_llm):
+        prefs = {"days": 2, "region": "Quy Nhơn", "budget": "Trung bình", "theme": "biển", "transport": "xe máy", "people": 2}
+        events = [event async for event in agent.stream_itinerary(prefs, [])]
+
+        assert [kind for kind, _ in events] == ["day", "day", "done"]
+        assert events[0][1]["title"] == "Biển {xanh}"
+        assert events[-1][1]["overview"] == PLAN["overview"]
+        assert [d["day"] for d in events[-1][1]["schedule"]] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_sse_endpoint(self, streaming_llm):
+        payload = {
+            "preferences": {"budget": "Trung bình", "days": 2, "region": "Quy Nhơn",
+                            "theme": "biển", "transport": "xe máy", "people": 2},
+        }
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.post("/api/itinerary/generate/stream", json=payload)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        assert [kind for kind, _ in events] == ["status", "meta", "day", "day", "done"]
+        assert events[-1][1]["total_cost_estimate"] == "2.000.000 VND"
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from main import app
+from app.core import agent, geo_utils
+from app.core.llm_executor import LLMExecutor, LLMOverloadedError
+
+PLAN = {
+    "overview": "Quy Nhơn 1 ngày",
+    "schedule": [{"day": 1, "title": "Biển", "activities": [
+        {"time": "08:00", "place": "Eo Gió", "desc": "Ngắm biển"},
+    ]}],
+    "total_cost_estimate": "1.000.000đ",
+}
+
+
+class FakeLLM:
+    """Stand-in for langchain's Ollama: a blocking ``invoke``."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def invoke(self, prompt: str) -> str:
+        time.sleep(self.delay)
+        return "Đây là lịch trình:\n" + json.dumps(PLAN, ensure_ascii=False)
+
+
+class TestLLMExecutor:
+    @pytest.mark.asyncio
+    async def test_invoke_does_not_block_event_loop(self):
+        executor = LLMExecutor(max_workers=1, max_queue=1)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        result, _ = await asyncio.gather(executor.run(FakeLLM(0.3).invoke, "p"), ticker())
+        assert "Eo Gió" in result
+        assert ticks == 5
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_rejects_beyond_capacity(self):
+        executor = LLMExecutor(max_workers=1, max_queue=1)
+        llm = FakeLLM(0.3)
+        first = asyncio.ensure_future(executor.run(llm.invoke, "a"))
+        second = asyncio.ensure_future(executor.run(llm.invoke, "b"))
+        await asyncio.sleep(0.05)
+        assert executor.stats()["queue_depth"] == 1
+
+        started = time.perf_counter()
+        with pytest.raises(LLMOverloadedError):
+            await executor.run(llm.invoke, "c")
+        assert time.perf_counter() - started < 0.05
+
+        await asyncio.gather(first, second)
+        stats = executor.stats()
+        assert stats["completed"] == 2
+        assert stats["rejected"] == 1
+        assert stats["queue_depth"] == 0
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        executor = LLMExecutor(max_workers=1, max_queue=0, timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run(FakeLLM(0.2).invoke, "p")
+        assert executor.stats()["timed_out"] == 1
+        executor.shutdown()
+
+
+class TestGenerateEndpointOverload:
+    @pytest.mark.asyncio
+    async def test_returns_503_when_queue_full(self, monkeypatch):
+        executor = LLMExecutor(max_workers=1, max_queue=0)
+        monkeypatch.setattr(agent, "OLLAMA_AVAILABLE", True)
+        monkeypatch.setattr(agent, "llm", FakeLLM(0.3))
+        monkeypatch.setattr(agent, "llm_executor", executor)
+        monkeypatch.setattr(geo_utils, "GEOAPIFY_KEY", "")
+
+        payload = {"preferences": {
+            "budget": "Tiết kiệm", "days": 1, "region": "Quy Nhơn",
+            "theme": "biển", "transport": "xe máy", "people": 1,
+        }}
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            ok, busy = await asyncio.gather(
+                client.post("/api/itinerary/generate", json=payload),
+                client.post("/api/itinerary/generate", json=payload),
+            )
+
+        statuses = sorted([ok.status_code, busy.status_code])
+        assert statuses == [200, 503]
+        rejected = ok if ok.status_code == 503 else busy
+        assert rejected.headers["Retry-After"]
+        executor.shutdown()
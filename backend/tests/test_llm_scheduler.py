@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+from datetime import date
+
+import httpx
+import pytest
+import pytest_asyncio
+from openai import AsyncOpenAI
+
+from app.core.llm_executor import LLMOverloadedError
+from app.core.llm_scheduler import BATCH, INTERACTIVE, GenerationScheduler, TokenBucket, parse_rate_limits
+from app.services import ai_service
+
+ITINERARY = {"days": [
+    {"day": d, "activities": [{"name": "Chợ Bến Thành", "type": "attraction", "time": "08:00", "duration": "2h"}]}
+    for d in (1, 2)
+]}
+
+
+def fake_openai(responses):
+    """OpenAI-compatible chat completions endpoint answering with ``responses`` in turn"""
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        status = responses[min(len(requests), len(responses)) - 1]
+        if status != 200:
+            return httpx.Response(status, headers={"retry-after": "0"}, json={"error": {"message": "slow down"}})
+        return httpx.Response(200, json={
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": requests[-1]["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "Here you go:\n" + json.dumps(ITINERARY)}}],
+        })
+
+    client = AsyncOpenAI(
+        api_key="test", base_url="http://fake-openai/v1", max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return client, requests
+
+
+class TestGenerationScheduler:
+    @pytest.mark.asyncio
+    async def test_token_bucket_spaces_requests(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+        started = time.perf_counter()
+        for _ in range(3):
+            await bucket.acquire()
+        assert time.perf_counter() - started >= 0.09
+        assert parse_rate_limits("gpt-4=60, gpt-3.5-turbo=300") == {"gpt-4": 60.0, "gpt-3.5-turbo": 300.0}
+
+    @pytest.mark.asyncio
+    async def test_interactive_lane_goes_first_and_queue_is_bounded(self):
+        scheduler = GenerationScheduler(max_concurrency=1, max_queue=2, default_rpm=60000)
+        gate = asyncio.Event()
+        order = []
+
+        def call(name):
+            async def fn():
+                if name == "first":
+                    await gate.wait()
+                order.append(name)
+            return fn
+
+        first = asyncio.create_task(scheduler.submit("m", call("first")))
+        await asyncio.sleep(0)
+        batch = asyncio.create_task(scheduler.submit("m", call("batch"), priority=BATCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(scheduler.submit("m", call("interactive"), priority=INTERACTIVE))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloadedError):
+            await scheduler.submit("m", call("rejected"))
+
+        gate.set()
+        await asyncio.gather(first, batch, interactive)
+        assert order == ["first", "interactive", "batch"]
+        stats = scheduler.stats()
+        assert stats["rejected"] == 1 and stats["running"] == 0
+        assert stats["lanes"]["batch"]["max_queue_wait"] > 0
+
+
+@pytest_asyncio.fixture
+async def scheduler(monkeypatch):
+    await ai_service.trip_plan_cache.clear()
+    scheduler = GenerationScheduler(max_concurrency=2, default_rpm=60000, retries=2, base_delay=0.01)
+    monkeypatch.setattr(ai_service, "generation_scheduler", scheduler)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    yield scheduler
+    await ai_service.trip_plan_cache.clear()
+
+
+TRIP = {
+    "destination": "Hồ Chí Minh", "start_date": date(2024, 3, 15), "end_date": date(2024, 3, 16),
+    "people": 2, "budget": "medium", "travel_style": "comfort", "interests": ["food"],
+}
+
+
+class TestPlannerAgainstFakeOpenAI:
+    @pytest.mark.asyncio
+    async def test_rate_limited_call_is_retried(self, monkeypatch, scheduler):
+        client, requests = fake_openai([429, 200])
+        monkeypatch.setattr(ai_service, "_openai_client", client)
+
+        itinerary = await ai_service.AITravelPlannerService().generate_itinerary(TRIP, "t1", "en")
+
+        assert itinerary == ITINERARY
+        assert len(requests) == 2 and requests[0]["model"] == "gpt-3.5-turbo"
+        assert scheduler.stats()["retried"] == 1
+
+    @pytest.mark.asyncio
+    async def test_persistent_errors_fall_back_to_mock(self, monkeypatch, scheduler):
+        client, requests = fake_openai([500])
+        monkeypatch.setattr(ai_service, "_openai_client", client)
+
+        itinerary = await ai_service.AITravelPlannerService().generate_itinerary(TRIP, "t1", "en")
+
+        # first try + 2 retries, for each model tier
+        assert [r["model"] for r in requests] == ["gpt-3.5-turbo"] * 3 + ["gpt-4"] * 3
+        assert "summary" in itinerary  # mock itinerary
+        assert scheduler.stats()["failed"] == 2
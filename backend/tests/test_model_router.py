@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from app.core import agent
+from app.core.llm_executor import LLMOverloadedError
+from app.core.model_router import CascadeExhaustedError, ModelRouter, tiers_from_env
+from app.services import ai_service
+
+PREFS = {"days": 1, "region": "Huế", "budget": "Trung bình", "theme": "văn hoá", "transport": "xe máy", "people": 2}
+
+
+def day_plan(n_activities):
+    return {"day": 1, "title": "Cố đô", "activities": [
+        {"time": f"{8 + i:02d}:00", "place": f"Điểm {i}", "desc": ""} for i in range(n_activities)
+    ]}
+
+
+class FakeLLM:
+    def __init__(self, output):
+        self.output = output
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return self.output
+
+
+class TestModelRouter:
+    @pytest.mark.asyncio
+    async def test_escalates_until_output_validates(self):
+        router = ModelRouter("test_cascade", ["small", "medium", "large"])
+        outputs = {"small": "not json", "medium": "{\"ok\": false}", "large": "{\"ok\": true}"}
+
+        async def call(tier):
+            return outputs[tier]
+
+        def validate(raw):
+            data = json.loads(raw)
+            if not data["ok"]:
+                raise ValueError("quality")
+            return data
+
+        assert await router.run(call, validate) == ({"ok": True}, "large")
+        assert await router.run(call, lambda raw: raw) == ("not json", "small")
+
+        stats = router.stats()
+        assert stats["requests"] == 2 and stats["escalations"] == 1 and stats["escalation_rate"] == 0.5
+        assert stats["per_tier"]["small"]["calls"] == 2 and stats["per_tier"]["small"]["acceptance_rate"] == 0.5
+        assert stats["per_tier"]["large"]["accepted"] == 1
+        assert tiers_from_env(" a , b,, ") == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_errors_escalate_but_overload_propagates(self):
+        router = ModelRouter("test_cascade_errors", ["small", "large"])
+
+        async def failing(tier):
+            raise ConnectionError(f"{tier} down")
+
+        with pytest.raises(CascadeExhaustedError) as info:
+            await router.run(failing, lambda raw: raw)
+        assert set(info.value.reasons) == {"small", "large"}
+        assert router.stats()["per_tier"]["large"]["errors"] == 1
+
+        async def busy(tier):
+            raise LLMOverloadedError(3)
+
+        with pytest.raises(LLMOverloadedError):
+            await router.run(busy, lambda raw: raw)
+        assert router.stats()["per_tier"]["large"]["calls"] == 1  # no escalation on overload
+
+
+class TestAgentCascade:
+    @pytest.mark.asyncio
+    async def test_thin_plan_from_small_model_is_regenerated(self, monkeypatch):
+        small = FakeLLM(json.dumps({"overview": "x", "schedule": [day_plan(1)], "total_cost_estimate": "1đ"}))
+        large = FakeLLM(json.dumps({"overview": "ok", "schedule": [day_plan(4)], "total_cost_estimate": "1đ"}))
+        monkeypatch.setattr(agent, "OLLAMA_AVAILABLE", True)
+        monkeypatch.setattr(agent, "tier_llms", {"small": small})
+        monkeypatch.setattr(agent, "llm", large)
+        monkeypatch.setattr(agent, "itinerary_router", ModelRouter("test_agent_cascade", ["small", "mistral"]))
+
+        plan = await agent.generate_itinerary(PREFS, [])
+
+        assert plan["overview"] == "ok" and small.calls == 1 and large.calls == 1
+        assert agent.itinerary_router.stats()["escalations"] == 1
+
+    def test_planner_validation(self):
+        service = ai_service.AITravelPlannerService()
+        good = {"days": [{"day": 1, "activities": [{"name": "a", "type": "attraction", "time": "8:00", "duration": "1h"}]}]}
+        assert service._validate_plan(json.dumps(good), {"total_days": 1}) == good
+        with pytest.raises(ValueError):
+            service._validate_plan(json.dumps(good), {"total_days": 2})
+        del good["days"][0]["activities"][0]["duration"]
+        with pytest.raises(ValueError):
+            service._validate_plan(json.dumps(good), {"total_days": 1})
@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import place_cache, serpapi_service
+from app.services.place_cache import PlaceDetailsCache
+from app.services.serpapi_service import SerpAPIService
+
+HOI_AN = {
+    "title": "Phố cổ Hội An", "rating": 4.7, "reviews": 52000,
+    "gps_coordinates": {"latitude": 15.8775, "longitude": 108.3261},
+}
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    async def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["_id"], {}).update(update["$set"])
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(place_cache, "get_database", lambda: {place_cache.COLLECTION: collection})
+    return collection
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("SERPAPI_KEY", "test")
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params["q"])
+        if request.url.params["q"] == "Không tồn tại":
+            return httpx.Response(200, json={"local_results": []})
+        return httpx.Response(200, json={"local_results": [HOI_AN]})
+
+    svc = SerpAPIService(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    svc.calls = calls
+    return svc
+
+
+def use_cache(monkeypatch, **kwargs):
+    cache = PlaceDetailsCache(**kwargs)
+    monkeypatch.setattr(serpapi_service, "place_details_cache", cache)
+    return cache
+
+
+class TestPlaceDetailsCache:
+    @pytest.mark.asyncio
+    async def test_second_lookup_is_served_from_l1(self, monkeypatch, mongo, service):
+        cache = use_cache(monkeypatch)
+        first = await service.get_place_details("Phố cổ Hội An", 15.8775, 108.3261)
+        # Different diacritics/case, a few meters away: same key
+        second = await service.get_place_details("pho co hoi an", 15.8776, 108.3262)
+
+        assert first["source"] == "serpapi" and second == first
+        assert service.calls == ["Phố cổ Hội An"]
+        assert cache.stats()["l1_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_l2_survives_process_restart(self, monkeypatch, mongo, service):
+        use_cache(monkeypatch)
+        await service.get_place_details("Phố cổ Hội An", 15.8775, 108.3261)
+
+        cache = use_cache(monkeypatch)  # fresh L1, same Mongo collection
+        details = await service.get_place_details("Phố cổ Hội An", 15.8775, 108.3261)
+        assert details["rating"] == 4.7
+        assert len(service.calls) == 1
+        assert cache.stats()["l2_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_negative_caching(self, monkeypatch, mongo, service):
+        cache = use_cache(monkeypatch)
+        for _ in range(3):
+            details = await service.get_place_details("Không tồn tại", 16.0, 108.0)
+            assert details["source"] == "mock"
+        assert service.calls == ["Không tồn tại"]
+        assert cache.stats()["negative_hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_stale_while_revalidate(self, monkeypatch, mongo, service):
+        cache = use_cache(monkeypatch, ttl=0, stale_ttl=60)
+        await service.get_place_details("Phố cổ Hội An", 15.8775, 108.3261)
+
+        stale = await service.get_place_details("Phố cổ Hội An", 15.8775, 108.3261)
+        assert stale["source"] == "serpapi"
+        await asyncio.sleep(0.01)  # let the background refresh finish
+        assert len(service.calls) == 2
+        assert cache.stats()["stale_hits"] == 1
+        assert cache.stats()["refreshes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_call(self, monkeypatch, mongo, service):
+        use_cache(monkeypatch)
+        before = serpapi_service.serpapi_flight.stats()["deduplicated"]
+        results = await asyncio.gather(*[
+            service.get_place_details("Phố cổ Hội An", 15.8775, 108.3261) for _ in range(5)
+        ])
+        assert all(r == results[0] for r in results)
+        assert service.calls == ["Phố cổ Hội An"]
+        assert serpapi_service.serpapi_flight.stats()["deduplicated"] - before == 4
@@ -0,0 +1,44 @@
+import json
+
+from app.core.prompt_codec import encode_places, estimate_tokens, primary_category, select_top_k
+
+
+def geoapify_places(n):
+    return [{
+        "name": f"Địa điểm {i}",
+        "address": f"{i} Nguyễn Huệ, Quy Nhơn, Bình Định",
+        "category": "catering,catering.restaurant" if i % 3 == 0 else "tourism,tourism.sights",
+        "rating": 0,
+        "lat": 13.77 + i * 0.001,
+        "lon": 109.22,
+        "distance_m": 200.0 * i,
+    } for i in range(n)]
+
+
+class TestPromptCodec:
+    def test_table_is_much_smaller_than_indented_json(self):
+        places = geoapify_places(20)
+        table, stats = encode_places(places, ["catering.restaurant"])
+
+        assert table.splitlines()[0] == "Loại: C1=restaurant C2=sights"
+        assert table.splitlines()[1] == "id|tên|loại|km|rating"
+        assert stats["places_out"] == 20
+        assert stats["tokens"] * 4 < estimate_tokens(json.dumps(places, ensure_ascii=False, indent=2))
+
+    def test_top_k_prefers_theme_matches_then_distance(self):
+        places = geoapify_places(9)
+        top = select_top_k(places, 3, ["catering.restaurant"])
+        assert [p["name"] for p in top] == ["Địa điểm 0", "Địa điểm 3", "Địa điểm 6"]
+        assert primary_category({"categories": ["catering", "catering.cafe"]}) == "cafe"
+
+    def test_token_budget_drops_least_relevant_rows(self):
+        places = geoapify_places(40)
+        table, stats = encode_places(places, top_k=40, max_tokens=120)
+        assert stats["tokens"] <= 120
+        assert 0 < stats["places_out"] < 40
+        assert "|Địa điểm 0|" in table
+
+    def test_names_cannot_break_the_table(self):
+        table, _ = encode_places([{"name": "A|B\nC {x}", "rating": 4.5}])
+        assert table.splitlines()[-1] == "1|A/B C {x}|||4.5"
+        assert encode_places([])[0] == "(không có dữ liệu địa điểm)"
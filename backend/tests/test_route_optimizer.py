@@ -0,0 +1,103 @@
+import httpx
+import pytest
+
+from app.core.route_optimizer import (
+    activity_point, is_pinned, optimize_itinerary, places_index, reorder_day, transport_mode,
+)
+from app.routers.itinerary_new import optimize_routes
+from app.services import geoapify_service
+
+# Stops along one road (lon fixed), visited out of order by the generator
+PLACES = [
+    {"name": "Tháp Đôi", "lat": 13.780, "lon": 109.22},
+    {"name": "Ghềnh Ráng", "lat": 13.750, "lon": 109.22},
+    {"name": "Eo Gió", "lat": 13.900, "lon": 109.22},
+    {"name": "Chùa Long Khánh", "lat": 13.770, "lon": 109.22},
+    {"name": "Bánh xèo Tôm Nhảy", "lat": 13.760, "lon": 109.22},
+]
+
+
+def day(*names):
+    times = ["08:00", "09:30", "11:00", "12:30", "14:00", "16:00"]
+    return {"day": 1, "title": "Quy Nhơn", "activities": [
+        {"time": t, "place": n, "desc": ""} for t, n in zip(times, names)
+    ]}
+
+
+class TestRouteOptimizer:
+    def test_activity_points_and_pins(self):
+        by_name = places_index(PLACES)
+        assert activity_point({"place": "Thap Doi"}, by_name) == {"lat": 13.78, "lon": 109.22}
+        assert activity_point({"place": "Tham quan Eo Gió buổi sáng"}, by_name)["lat"] == 13.9
+        assert activity_point({"coordinates": {"lat": 1, "lng": 2}}, {}) == {"lat": 1.0, "lon": 2.0}
+        assert activity_point({"place": "Chợ đêm"}, by_name) is None
+        assert is_pinned({"place": "Bánh xèo", "desc": "Ăn trưa"})
+        assert is_pinned({"type": "restaurant"})
+        assert not is_pinned({"place": "Eo Gió"})
+        assert transport_mode("Xe máy") == "motorcycle" and transport_mode("?") == "drive"
+
+    @pytest.mark.asyncio
+    async def test_zigzag_is_removed_and_slots_kept(self):
+        plan = {"overview": "", "schedule": [day("Eo Gió", "Ghềnh Ráng", "Tháp Đôi", "Chùa Long Khánh")]}
+        optimized, stats = await optimize_itinerary(plan, PLACES)
+
+        acts = optimized["schedule"][0]["activities"]
+        assert [a["place"] for a in acts] == ["Eo Gió", "Tháp Đôi", "Chùa Long Khánh", "Ghềnh Ráng"]
+        assert [a["time"] for a in acts] == ["08:00", "09:30", "11:00", "12:30"]
+        assert stats["travel_after"] < stats["travel_before"]
+        # Input untouched
+        assert plan["schedule"][0]["activities"][1]["place"] == "Ghềnh Ráng"
+
+    @pytest.mark.asyncio
+    async def test_meals_and_unknown_places_stay_in_their_slot(self):
+        plan = {"overview": "", "schedule": [day(
+            "Eo Gió", "Ghềnh Ráng", "Tháp Đôi", "Ăn trưa Bánh xèo Tôm Nhảy", "Chợ đêm", "Chùa Long Khánh",
+        )]}
+        optimized, _ = await optimize_itinerary(plan, PLACES)
+        acts = optimized["schedule"][0]["activities"]
+        assert acts[3]["place"] == "Ăn trưa Bánh xèo Tôm Nhảy" and acts[3]["time"] == "12:30"
+        assert acts[4]["place"] == "Chợ đêm"
+        assert [a["place"] for a in acts[:3]] == ["Eo Gió", "Tháp Đôi", "Ghềnh Ráng"]
+
+    @pytest.mark.asyncio
+    async def test_uses_matrix_service_when_given(self):
+        calls = []
+
+        async def matrix(origins, destinations):
+            calls.append(len(origins))
+            # Asymmetric one-way street: going north is expensive
+            return [[0 if o == d else (10 if d["lat"] < o["lat"] else 100) for d in destinations] for o in origins]
+
+        plan = {"overview": "", "schedule": [day("Chùa Long Khánh", "Eo Gió", "Ghềnh Ráng")]}
+        optimized, stats = await optimize_itinerary(plan, PLACES, matrix)
+        assert calls == [3]
+        assert [a["place"] for a in optimized["schedule"][0]["activities"]] == ["Eo Gió", "Chùa Long Khánh", "Ghềnh Ráng"]
+        assert stats == {"travel_before": 110.0, "travel_after": 20.0}
+
+    def test_keeps_generated_order_when_not_shorter(self):
+        points = [{"lat": 13.75 + i * 0.01, "lon": 109.22} for i in range(4)]
+        cost = [[abs(i - j) for j in range(4)] for i in range(4)]
+        assert reorder_day([{"place": str(i)} for i in range(4)], points, cost) == [0, 1, 2, 3]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("provider", ["no_key", "down"])
+    async def test_provider_unavailable_falls_back_to_estimate(self, provider, monkeypatch):
+        await geoapify_service.matrix_cache.clear()
+        if provider == "no_key":
+            monkeypatch.setenv("GEOAPIFY_KEY", "")
+        else:
+            async def down(self, *args):
+                raise httpx.ConnectError("provider down")
+
+            monkeypatch.setattr(geoapify_service.GeoapifyService, "_fetch_matrix", down)
+
+        plan = {"overview": "", "schedule": [day("Eo Gió", "Ghềnh Ráng", "Tháp Đôi", "Chùa Long Khánh")]}
+        optimized, stats = await optimize_routes(plan, PLACES, {"transport": "Xe máy"})
+        assert "skipped" not in stats
+        acts = optimized["schedule"][0]["activities"]
+        assert [a["place"] for a in acts] == ["Eo Gió", "Tháp Đôi", "Chùa Long Khánh", "Ghềnh Ráng"]
+        assert stats["travel_after"] < stats["travel_before"]
+
+    def test_mock_matrix_has_every_cell(self):
+        matrix = geoapify_service.GeoapifyService()._get_mock_matrix(PLACES[:2], PLACES)
+        assert [len(row) for row in matrix] == [5, 5]
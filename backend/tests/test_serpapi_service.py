@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.serpapi_service import SerpAPIService
+
+
+def make_places(n):
+    return [{"name": f"Quán {i}", "lat": 16.05 + i * 0.001, "lon": 108.2} for i in range(n)]
+
+
+class FakeSerpAPI(SerpAPIService):
+    def __init__(self, delays):
+        super().__init__()
+        self.delays = delays
+        self.active = 0
+        self.peak = 0
+        self.seen_lngs = []
+
+    async def get_place_details(self, place_name, lat, lng, place_id=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.seen_lngs.append(lng)
+        try:
+            await asyncio.sleep(self.delays.get(place_name, 0.05))
+            return {"name": place_name, "rating": 4.6, "source": "serpapi"}
+        finally:
+            self.active -= 1
+
+
+class TestMultiplePlacesDetails:
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency_and_stable_order(self):
+        service = FakeSerpAPI({"Quán 0": 0.15})
+        places = make_places(10)
+
+        started = time.perf_counter()
+        results = await service.get_multiple_places_details(places, concurrency=4, deadline=5)
+        elapsed = time.perf_counter() - started
+
+        assert service.peak == 4
+        assert elapsed < 0.5  # sequential would be ~0.6s
+        assert [r["name"] for r in results] == [p["name"] for p in places]
+        assert all(r["enriched"] for r in results)
+        # Geoapify "lon" is forwarded as lng
+        assert set(service.seen_lngs) == {108.2}
+
+    @pytest.mark.asyncio
+    async def test_deadline_returns_partial_results(self):
+        service = FakeSerpAPI({"Quán 1": 1.0})
+        results = await service.get_multiple_places_details(make_places(3), concurrency=3, deadline=0.2)
+
+        assert [r["enrichment"] for r in results] == ["serpapi", "deadline", "serpapi"]
+        assert results[1]["enriched"] is False
+        assert results[1]["source"] == "mock"
+
+    @pytest.mark.asyncio
+    async def test_errors_fall_back_to_mock(self):
+        service = FakeSerpAPI({})
+
+        async def boom(place_name, lat, lng, place_id=None):
+            raise RuntimeError("quota")
+
+        service.get_place_details = boom
+        results = await service.get_multiple_places_details(make_places(2))
+        assert [r["enrichment"] for r in results] == ["fallback", "fallback"]
+        assert all(r["source"] == "mock" for r in results)
@@ -0,0 +1,127 @@
+from datetime import date, datetime
+
+import pytest
+import pytest_asyncio
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from app.services.trip_store import (
+    COLLECTION, EMBEDDED, days_from_aggregate, embed_days, itinerary_pipeline, load_itinerary, migrate_trip,
+    save_itinerary, summarize,
+)
+from migrate_trip_storage import trips_to_migrate
+
+ITINERARY_DAYS = [
+    {"day": 2, "activities": [
+        {"name": "Bà Nà Hills", "type": "attraction", "time": "08:00", "duration": "4h", "cost": 900000, "rating": 4.5},
+    ]},
+    {"day": 1, "activities": [
+        {"name": "Cầu Rồng", "type": "attraction", "time": "19:00", "duration": "1h", "rating": 4.7},
+        {"name": "Mì Quảng Bà Mua", "type": "restaurant", "time": "12:00", "duration": "1h", "cost": 60000},
+    ]},
+]
+
+
+class TestEmbeddedLayout:
+    def test_days_are_ordered_dated_and_costed(self):
+        days = embed_days(ITINERARY_DAYS, date(2024, 3, 15))
+        assert [(d["day"], d["date"], d["estimatedCost"]) for d in days] == [
+            (1, "2024-03-15", 60000), (2, "2024-03-16", 900000),
+        ]
+        assert [a["id"] for a in days[0]["activities"]] == ["1_1", "1_2"]
+        assert days[0]["activities"][0]["cost"] == 0.0
+
+    def test_summary(self):
+        summary = summarize(embed_days(ITINERARY_DAYS, None))
+        assert summary == {"totalAttractions": 2, "totalRestaurants": 1, "totalHotels": 0, "averageRating": 4.6}
+
+
+
+class TestAggregation:
+    def test_pipeline_output_becomes_response_days(self):
+        result = {
+            "days": [{"_id": 1, "estimatedCost": 60000.0, "activities": [{"id": "a", "name": "Mì Quảng"}]}],
+            "summary": [{"totalAttractions": 0, "totalRestaurants": 1, "totalHotels": 0, "averageRating": None}],
+        }
+        days, summary = days_from_aggregate(result, date(2024, 3, 15))
+        assert days == [{"day": 1, "date": "2024-03-15", "estimatedCost": 60000.0,
+                         "activities": [{"id": "a", "name": "Mì Quảng"}]}]
+        assert summary["totalRestaurants"] == 1 and summary["averageRating"] == 0.0
+
+    def test_trip_without_activities(self):
+        assert days_from_aggregate({"days": [], "summary": []}, None) == ([], {
+            "totalAttractions": 0, "totalRestaurants": 0, "totalHotels": 0, "averageRating": 0.0,
+        })
+        assert itinerary_pipeline("t1")[0] == {"$match": {"trip_id": "t1"}}
+
+
+@pytest_asyncio.fixture
+async def db():
+    return AsyncMongoMockClient()["trip_store_test"]
+
+
+async def stored_trip(db, **fields):
+    trip = {"_id": ObjectId(), "start_date": datetime(2024, 3, 15), "status": "pending", **fields}
+    await db.trips.insert_one(trip)
+    return trip
+
+
+def shape(days):
+    """Layout-independent view of loaded days (activity ids differ between layouts)"""
+    return [
+        (d["day"], d["date"], d["estimatedCost"], [(a["name"], a["cost"], a["rating"]) for a in d["activities"]])
+        for d in days
+    ]
+
+
+EXPECTED_DAYS = [
+    (1, "2024-03-15", 60000, [("Cầu Rồng", 0.0, 4.7), ("Mì Quảng Bà Mua", 60000, None)]),
+    (2, "2024-03-16", 900000, [("Bà Nà Hills", 900000, 4.5)]),
+]
+EXPECTED_SUMMARY = {"totalAttractions": 2, "totalRestaurants": 1, "totalHotels": 0, "averageRating": 4.6}
+
+
+class TestStorage:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("mode", [COLLECTION, EMBEDDED])
+    async def test_save_then_load(self, db, mode):
+        trip = await stored_trip(db)
+        saved = await save_itinerary(db, trip["_id"], {"days": ITINERARY_DAYS}, trip["start_date"], mode=mode)
+        assert saved == {"activities": 3, "total_cost": 960000}
+
+        trip = await db.trips.find_one({"_id": trip["_id"]})
+        assert trip["status"] == "confirmed" and trip["total_cost"] == 960000
+        assert trip.get("storage") == (EMBEDDED if mode == EMBEDDED else None)
+        assert await db.activities.count_documents({}) == (3 if mode == COLLECTION else 0)
+
+        days, summary = await load_itinerary(db, trip)
+        assert shape(days) == EXPECTED_DAYS
+        assert summary == pytest.approx(EXPECTED_SUMMARY)
+
+    @pytest.mark.asyncio
+    async def test_migrate_both_ways(self, db):
+        trip = await stored_trip(db)
+        await save_itinerary(db, trip["_id"], {"days": ITINERARY_DAYS}, trip["start_date"], mode=COLLECTION)
+        trip = await db.trips.find_one({"_id": trip["_id"]})
+
+        assert await migrate_trip(db, trip, EMBEDDED) == 3
+        embedded = await db.trips.find_one({"_id": trip["_id"]})
+        assert embedded["storage"] == EMBEDDED and await db.activities.count_documents({}) == 0
+        assert await migrate_trip(db, embedded, EMBEDDED) == 0  # already there
+        days, summary = await load_itinerary(db, embedded)
+        assert shape(days) == EXPECTED_DAYS and summary == pytest.approx(EXPECTED_SUMMARY)
+
+        assert await migrate_trip(db, embedded, COLLECTION) == 3
+        restored = await db.trips.find_one({"_id": trip["_id"]})
+        assert not {"storage", "days", "summary"} & set(restored)
+        days, summary = await load_itinerary(db, restored)
+        assert shape(days) == EXPECTED_DAYS and summary == pytest.approx(EXPECTED_SUMMARY)
+
+    @pytest.mark.asyncio
+    async def test_migration_skips_unfinished_trips(self, db):
+        finished = await stored_trip(db, status="confirmed")
+        await stored_trip(db, status="pending")
+        await stored_trip(db, status="in_progress")
+        moved = await db.trips.find(trips_to_migrate(EMBEDDED)).to_list(length=None)
+        assert [t["_id"] for t in moved] == [finished["_id"]]
+        assert await db.trips.count_documents(trips_to_migrate(COLLECTION)) == 0